@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+容量估算
+把 non_functional 中的 qps、response_time、users、data_volume 等文本解析为数值，
+按 Little 定律（并发 = 到达率 × 响应时间）估算实例数、连接池、缓存命中率目标和存储增长。
+计算按列进行，一次可对成千上万个假设场景做参数扫描
+"""
+
+import re
+import csv
+import sys
+import json
+import math
+import time
+import argparse
+import itertools
+from typing import Dict, List, Optional, Sequence, TextIO, Tuple
+
+
+# 中文/英文数量单位
+QUANTITY_UNITS = {
+    "": 1,
+    "k": 1e3,
+    "K": 1e3,
+    "千": 1e3,
+    "w": 1e4,
+    "W": 1e4,
+    "万": 1e4,
+    "m": 1e6,
+    "M": 1e6,
+    "百万": 1e6,
+    "千万": 1e7,
+    "亿": 1e8,
+}
+
+DURATION_UNITS = {"ms": 0.001, "毫秒": 0.001, "s": 1, "秒": 1, "min": 60, "分钟": 60}
+
+SIZE_UNITS = {
+    "b": 1,
+    "k": 1024,
+    "m": 1024**2,
+    "g": 1024**3,
+    "t": 1024**4,
+    "p": 1024**5,
+}
+
+# 数据量按周期给出时（如 “1TB/月”）换算为每年的倍数
+PERIODS_PER_YEAR = {
+    "年": 1,
+    "year": 1,
+    "月": 12,
+    "month": 12,
+    "周": 52,
+    "week": 52,
+    "天": 365,
+    "日": 365,
+    "day": 365,
+}
+
+NUMBER = r"(\d+(?:\.\d+)?)"
+# 数字中的千分位分隔符（“10,000”、“1，000，000”），匹配数量前先去掉
+THOUSANDS_SEPARATOR = re.compile(r"(?<=\d)[,，](?=\d{3}(?!\d))")
+QUANTITY_PATTERN = re.compile(NUMBER + r"\s*(百万|千万|亿|万|千|[kKwWmM](?![a-zA-Z]))?")
+DURATION_PATTERN = re.compile(NUMBER + r"\s*(ms|毫秒|min|分钟|s|秒)", re.I)
+SIZE_PATTERN = re.compile(NUMBER + r"\s*([KMGTP]?)(i?B)?", re.I)
+PERIOD_PATTERN = re.compile(r"(?:/|每|per\s*)\s*(年|year|月|month|周|week|天|日|day)", re.I)
+
+# 估算模型的默认假设，均可在 non_functional["capacity"] 中覆盖，或在参数扫描中作为变量
+ASSUMPTIONS: Dict[str, float] = {
+    "response_time": 0.2,  # 未给出响应时间时的默认值（秒）
+    "instance_qps": 1000,  # 单实例可承载的 QPS
+    "threads_per_instance": 200,  # 单实例的并发处理线程数
+    "target_utilization": 0.7,  # 目标资源利用率，预留突发余量
+    "min_instances": 2,  # 高可用所需的最少实例数
+    "queries_per_request": 2,  # 每个请求的平均数据库查询次数
+    "db_query_time": 0.005,  # 单次数据库查询耗时（秒）
+    "db_capacity_qps": 5000,  # 单个数据库主节点可承载的 QPS
+    "min_pool_size": 5,  # 每实例连接池下限
+    "daily_active_ratio": 0.2,  # 仅给出用户数时：日活比例
+    "requests_per_user": 50,  # 仅给出用户数时：每个日活用户每天的请求数
+    "peak_factor": 3,  # 仅给出用户数时：峰值与日均 QPS 之比
+    "data_growth": 0.5,  # 未给出增长速度时数据量的年增长率
+    "replicas": 3,  # 存储副本数
+}
+
+
+def parse_quantity(value) -> Optional[float]:
+    """解析 “5000”、“1.2万”、“10w”、“5k QPS” 等数量"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    m = QUANTITY_PATTERN.search(THOUSANDS_SEPARATOR.sub("", str(value or "")))
+    if not m:
+        return None
+    return float(m.group(1)) * QUANTITY_UNITS[m.group(2) or ""]
+
+
+def parse_duration(value) -> Optional[float]:
+    """解析 “200ms”、“P99<300ms”、“0.5秒” 等时长，返回秒；无单位的数字按毫秒处理"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value) / 1000
+    text = str(value or "")
+    m = DURATION_PATTERN.search(text)
+    if m:
+        return float(m.group(1)) * DURATION_UNITS[m.group(2).lower()]
+    m = re.search(NUMBER, text)
+    return float(m.group(1)) / 1000 if m else None
+
+
+def parse_size(value) -> Optional[float]:
+    """解析 “10TB”、“500G”、“2 PB”、“500B” 等数据量，返回字节；无单位的数字按 GB 处理"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value) * SIZE_UNITS["g"]
+    m = SIZE_PATTERN.search(THOUSANDS_SEPARATOR.sub("", str(value or "")))
+    if not m:
+        return None
+    # 只写 B 时按字节处理，既无数量级也无 B 时才取默认的 GB
+    unit = (m.group(2) or ("b" if m.group(3) else "g")).lower()
+    return float(m.group(1)) * SIZE_UNITS[unit]
+
+
+def parse_nfr(nfr: dict) -> Dict[str, float]:
+    """把 non_functional 解析为估算模型的输入，无法解析的字段取默认假设或 0"""
+    assumptions = dict(ASSUMPTIONS)
+    for key, value in (nfr.get("capacity") or {}).items():
+        if key in assumptions:
+            assumptions[key] = float(value)
+
+    users = parse_quantity(nfr.get("users")) or 0.0
+    qps = parse_quantity(nfr.get("qps"))
+    if qps is None and users:
+        qps = (
+            users
+            * assumptions["daily_active_ratio"]
+            * assumptions["requests_per_user"]
+            / 86400
+            * assumptions["peak_factor"]
+        )
+    response_time = parse_duration(nfr.get("response_time"))
+
+    data_text = str(nfr.get("data_volume") or "")
+    data = parse_size(data_text) if data_text else None
+    period = PERIOD_PATTERN.search(data_text)
+    data_per_year = data * PERIODS_PER_YEAR[period.group(1).lower()] if data and period else 0.0
+
+    columns = dict(assumptions)
+    columns.update(
+        {
+            "qps": qps or 0.0,
+            "response_time": response_time or assumptions["response_time"],
+            "users": users,
+            "data_volume": 0.0 if period else (data or 0.0),
+            "data_per_year": data_per_year,
+        }
+    )
+    return columns
+
+
+def estimate_capacity(columns: Dict[str, Sequence[float]]) -> Dict[str, List[float]]:
+    """按列估算容量：每个输入字段为等长的数值序列，缺省字段取 ASSUMPTIONS 中的默认值
+
+    必需字段为 qps，可选 response_time、data_volume（字节）、data_per_year（字节/年）及各项假设。
+    """
+    size = len(columns["qps"])
+
+    def column(key: str) -> Sequence[float]:
+        values = columns.get(key)
+        if values is None:
+            return [ASSUMPTIONS.get(key, 0.0)] * size
+        return values
+
+    qps = column("qps")
+    response_time = column("response_time")
+    utilization = column("target_utilization")
+
+    # Little 定律：系统内平均并发 = 到达率 × 平均停留时间
+    concurrency = [q * r for q, r in zip(qps, response_time)]
+    instances = [
+        max(m, math.ceil(q / (iq * u)), math.ceil(c / (t * u)))
+        for q, c, iq, t, u, m in zip(
+            qps,
+            concurrency,
+            column("instance_qps"),
+            column("threads_per_instance"),
+            utilization,
+            column("min_instances"),
+        )
+    ]
+
+    # 缓存命中率需把数据库 QPS 压到单主节点容量以内；命中率上限 99%，超出部分需要分库
+    raw_db_qps = [q * n for q, n in zip(qps, column("queries_per_request"))]
+    cache_hit_target = [
+        min(0.99, max(0.0, 1 - cap * u / raw)) if raw else 0.0
+        for raw, cap, u in zip(raw_db_qps, column("db_capacity_qps"), utilization)
+    ]
+    db_qps = [raw * (1 - h) for raw, h in zip(raw_db_qps, cache_hit_target)]
+    db_nodes = [
+        max(1, math.ceil(d / (cap * u) - 1e-9))
+        for d, cap, u in zip(db_qps, column("db_capacity_qps"), utilization)
+    ]
+
+    # 连接池：每实例同时占用的连接数 = 该实例分到的数据库 QPS × 单次查询耗时（同样是 Little 定律）
+    pool_size = [
+        max(p, math.ceil(d / i * t / u))
+        for d, i, t, u, p in zip(
+            db_qps, instances, column("db_query_time"), utilization, column("min_pool_size")
+        )
+    ]
+
+    storage_1y = []
+    storage_3y = []
+    for volume, per_year, growth, replicas in zip(
+        column("data_volume"), column("data_per_year"), column("data_growth"), column("replicas")
+    ):
+        storage_1y.append((volume * (1 + growth) + per_year) * replicas)
+        storage_3y.append((volume * (1 + growth) ** 3 + per_year * 3) * replicas)
+
+    return {
+        "qps": list(qps),
+        "response_time": list(response_time),
+        "concurrency": concurrency,
+        "instances": instances,
+        "pool_size": pool_size,
+        "cache_hit_target": cache_hit_target,
+        "db_qps": db_qps,
+        "db_nodes": db_nodes,
+        "storage_1y": storage_1y,
+        "storage_3y": storage_3y,
+    }
+
+
+def estimate(nfr: dict) -> Dict[str, float]:
+    """估算单个需求的容量"""
+    columns = parse_nfr(nfr)
+    result = estimate_capacity({key: [value] for key, value in columns.items()})
+    return {key: values[0] for key, values in result.items()}
+
+
+def format_size(size: float) -> str:
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if size < 1024:
+            return f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}PB"
+
+
+def capacity_fields(nfr: dict) -> List:
+    """容量估算结果的 (名称, 值) 列表，供文档章节使用；缺少 QPS 与用户数时返回空列表"""
+    columns = parse_nfr(nfr)
+    if not columns["qps"]:
+        return []
+    result = estimate(nfr)
+    pairs = [
+        ("目标QPS", f"{result['qps']:.0f}"),
+        ("响应时间", f"{result['response_time'] * 1000:.0f}ms"),
+        ("平均并发请求数", f"{result['concurrency']:.0f}（Little 定律: QPS × 响应时间）"),
+        ("应用实例数", f"{result['instances']}（目标利用率 {columns['target_utilization']:.0%}）"),
+        ("每实例数据库连接池", f"{result['pool_size']}"),
+        ("缓存命中率目标", f"{result['cache_hit_target']:.1%}"),
+        ("缓存后数据库QPS", f"{result['db_qps']:.0f}（主节点 {result['db_nodes']} 个）"),
+    ]
+    if result["storage_3y"]:
+        pairs.append(
+            (
+                "存储容量（含副本）",
+                f"1年 {format_size(result['storage_1y'])}，3年 {format_size(result['storage_3y'])}",
+            )
+        )
+    return pairs
+
+
+def parse_sweep(spec: str) -> Tuple[str, List[float]]:
+    """解析扫描参数：key=v1,v2,... 或 key=start:stop:step（含 stop）"""
+    key, _, values = spec.partition("=")
+    if not key or not values:
+        raise ValueError(f"无效的扫描参数: {spec}")
+    if ":" in values:
+        start, stop, step = (float(v) for v in values.split(":"))
+        if step <= 0:
+            raise ValueError(f"步长必须为正数: {spec}")
+        count = int(math.floor((stop - start) / step + 1e-9)) + 1
+        return key, [start + i * step for i in range(count)]
+    return key, [float(v) for v in values.split(",")]
+
+
+def sweep(base: Dict[str, float], sweeps: List[Tuple[str, List[float]]]) -> Dict[str, List[float]]:
+    """对扫描参数的笛卡尔积逐列估算，返回输入列与结果列"""
+    keys = [key for key, _ in sweeps]
+    combos = list(itertools.product(*(values for _, values in sweeps))) if sweeps else [()]
+    columns = {key: [value] * len(combos) for key, value in base.items()}
+    for position, key in enumerate(keys):
+        columns[key] = [combo[position] for combo in combos]
+    result = estimate_capacity(columns)
+    return {**{key: columns[key] for key in keys}, **result}
+
+
+def write_csv(result: Dict[str, List[float]], stream: TextIO):
+    writer = csv.writer(stream)
+    writer.writerow(result.keys())
+    writer.writerows(zip(*result.values()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按非功能性需求估算容量，支持参数扫描")
+    parser.add_argument("--requirements", "-r", required=True, help="需求JSON文件路径")
+    parser.add_argument(
+        "--sweep",
+        action="append",
+        default=[],
+        help="扫描参数：key=v1,v2 或 key=start:stop:step，可多次指定（取笛卡尔积）",
+    )
+    parser.add_argument("--output", "-o", help="输出CSV路径（缺省输出单场景估算JSON到标准输出）")
+
+    args = parser.parse_args()
+
+    with open(args.requirements, "r", encoding="utf-8") as f:
+        requirements = json.load(f)
+    base = parse_nfr(requirements.get("non_functional", {}))
+
+    try:
+        sweeps = [parse_sweep(spec) for spec in args.sweep]
+    except ValueError as e:
+        parser.error(str(e))
+    unknown = [key for key, _ in sweeps if key not in base]
+    if unknown:
+        parser.error(f"未知的扫描参数: {', '.join(unknown)}，可选: {', '.join(sorted(base))}")
+
+    started = time.perf_counter()
+    result = sweep(base, sweeps)
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    count = len(result["qps"])
+
+    if count == 1 and not args.output:
+        json.dump({k: v[0] for k, v in result.items()}, sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write("\n")
+        return
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as f:
+            write_csv(result, f)
+    else:
+        write_csv(result, sys.stdout)
+    print(
+        f"容量估算完成: {count} 个场景, 耗时 {elapsed:.3f}s, {count / elapsed:.0f} 场景/s",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
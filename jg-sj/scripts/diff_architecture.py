@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+架构文档版本对比
+结构化比较两版需求/架构决策JSON：模块、风险、演进阶段等列表按名称建立哈希索引后逐项比较，
+嵌套配置按路径展开比较，整体为线性时间；只输出有变化的章节
+"""
+
+import json
+import argparse
+from typing import Dict, Iterable, List, Tuple
+
+from doc_model import BACKENDS, document, fields, output_paths, section
+from generate_architecture_doc import SECTIONS, generate_architecture_doc
+from module_graph import ModuleGraph
+
+
+# 章节标题 -> [(所在文档, 字段, 比较方式)]
+# 比较方式: value 整体比较；set 按元素比较；dict 按路径展开比较；keyed:<键> 按该字段索引逐项比较；
+# graph 只比较模块依赖图（模块与依赖边），架构总览的自动架构图与依赖分析由它生成
+DIFF_FIELDS: Dict[str, List[Tuple[str, str, str]]] = {
+    "需求概述": [
+        ("requirements", "features", "set"),
+        ("requirements", "non_functional", "dict"),
+    ],
+    "架构总览": [
+        ("architecture", "pattern", "value"),
+        ("architecture", "principles", "set"),
+        ("architecture", "mermaid_diagram", "value"),
+        ("architecture", "modules", "graph"),
+    ],
+    "模块设计": [("architecture", "modules", "keyed:name")],
+    "技术选型": [("architecture", "tech_stack", "dict")],
+    "数据设计": [
+        ("architecture", "data_storage", "keyed:type"),
+        ("architecture", "data_flow", "value"),
+    ],
+    "部署架构": [
+        ("architecture", "deployment", "dict"),
+        ("architecture", "deployment_topology", "value"),
+    ],
+    "容量估算": [("requirements", "non_functional", "dict")],
+    "风险评估": [("architecture", "risks", "keyed:name")],
+    "演进路线": [("architecture", "roadmap", "keyed:name")],
+}
+
+MISSING = object()
+
+
+def _change(path: str, old, new) -> Dict:
+    if old is MISSING:
+        return {"path": path, "kind": "added", "new": new}
+    if new is MISSING:
+        return {"path": path, "kind": "removed", "old": old}
+    return {"path": path, "kind": "changed", "old": old, "new": new}
+
+
+def flatten(value, prefix: str = "") -> Dict[str, object]:
+    """把嵌套 dict 展开为 {路径: 值}，列表等非 dict 值作为整体"""
+    if not isinstance(value, dict):
+        return {prefix: value}
+    flat = {}
+    for key, child in value.items():
+        path = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(child, dict) and child:
+            flat.update(flatten(child, path))
+        else:
+            flat[path] = child
+    return flat
+
+
+def diff_dict(old: dict, new: dict, prefix: str) -> List[Dict]:
+    """按路径比较两个嵌套 dict"""
+    old_flat = flatten(old or {})
+    new_flat = flatten(new or {})
+    changes = []
+    for path, value in new_flat.items():
+        before = old_flat.get(path, MISSING)
+        if before != value:
+            changes.append(_change(f"{prefix}.{path}", before, value))
+    for path, value in old_flat.items():
+        if path not in new_flat:
+            changes.append(_change(f"{prefix}.{path}", value, MISSING))
+    return changes
+
+
+def diff_set(old: Iterable, new: Iterable, prefix: str) -> List[Dict]:
+    """按元素比较两个列表（忽略顺序）"""
+
+    def keyed(values):
+        return {json.dumps(v, sort_keys=True, ensure_ascii=False): v for v in values or []}
+
+    old_keys = keyed(old)
+    new_keys = keyed(new)
+    changes = [_change(prefix, MISSING, v) for k, v in new_keys.items() if k not in old_keys]
+    changes.extend(_change(prefix, v, MISSING) for k, v in old_keys.items() if k not in new_keys)
+    return changes
+
+
+def index_by(entries: Iterable[dict], key: str) -> Dict[str, dict]:
+    """按 key 字段建立索引；缺少该字段时用序号，重名时追加序号区分"""
+    index = {}
+    for position, entry in enumerate(entries or [], 1):
+        name = str(entry.get(key, f"#{position}")) if isinstance(entry, dict) else f"#{position}"
+        if name in index:
+            suffix = 2
+            while f"{name}({suffix})" in index:
+                suffix += 1
+            name = f"{name}({suffix})"
+        index[name] = entry
+    return index
+
+
+def diff_keyed(old: Iterable[dict], new: Iterable[dict], key: str, prefix: str) -> List[Dict]:
+    """按名称索引比较两个对象列表，变化的条目再按字段比较"""
+    old_index = index_by(old, key)
+    new_index = index_by(new, key)
+    changes = []
+    for name, entry in new_index.items():
+        before = old_index.get(name, MISSING)
+        path = f"{prefix}[{name}]"
+        if before is MISSING:
+            changes.append(_change(path, MISSING, entry))
+        elif before != entry:
+            if isinstance(before, dict) and isinstance(entry, dict):
+                changes.extend(diff_dict(before, entry, path))
+            else:
+                changes.append(_change(path, before, entry))
+    for name, entry in old_index.items():
+        if name not in new_index:
+            changes.append(_change(f"{prefix}[{name}]", entry, MISSING))
+    return changes
+
+
+def dependency_graph(modules: Iterable[dict]) -> List[str]:
+    """模块依赖图的节点与边: ["模块", "模块 -> 依赖", ...]"""
+    graph = ModuleGraph(module for module in modules or [] if isinstance(module, dict))
+    items = [name for name, external in zip(graph.names, graph.external) if not external]
+    for node, targets in enumerate(graph.adjacency):
+        items.extend(f"{graph.names[node]} -> {graph.names[target]}" for target in targets)
+    return items
+
+
+def diff_architecture(
+    old_requirements: dict, old_architecture: dict, requirements: dict, architecture: dict
+) -> Dict[str, List[Dict]]:
+    """比较两版输入，返回 {章节标题: 变更列表}，只包含有变化的章节，按文档顺序排列"""
+    old_docs = {"requirements": old_requirements, "architecture": old_architecture}
+    new_docs = {"requirements": requirements, "architecture": architecture}
+    result = {}
+    for title, specs in DIFF_FIELDS.items():
+        changes = []
+        for source, field, mode in specs:
+            old = old_docs[source].get(field, MISSING)
+            new = new_docs[source].get(field, MISSING)
+            if old == new:
+                continue
+            # 列表/配置类字段缺失时视为空，新增或删除整块内容时也能逐项列出
+            if mode != "value":
+                empty = {} if mode == "dict" else []
+                old = empty if old is MISSING else old
+                new = empty if new is MISSING else new
+            if mode == "dict" and isinstance(old, dict) and isinstance(new, dict):
+                changes.extend(diff_dict(old, new, field))
+            elif mode == "set" and isinstance(old, list) and isinstance(new, list):
+                changes.extend(diff_set(old, new, field))
+            elif mode == "graph" and isinstance(old, list) and isinstance(new, list):
+                changes.extend(
+                    diff_set(dependency_graph(old), dependency_graph(new), f"{field}.dependencies")
+                )
+            elif mode.startswith("keyed:") and isinstance(old, list) and isinstance(new, list):
+                changes.extend(diff_keyed(old, new, mode[6:], field))
+            else:
+                changes.append(_change(field, old, new))
+        if changes:
+            result[title] = changes
+    return result
+
+
+def _format_value(value) -> str:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def build_diff_doc(diff: Dict[str, List[Dict]], name: str, old_label: str, new_label: str) -> Dict:
+    """把对比结果构建为文档模型，只包含有变化的章节"""
+    labels = {"added": "新增", "removed": "删除", "changed": "修改"}
+    sections = []
+    for number, (title, changes) in enumerate(diff.items(), 1):
+        counts = {kind: sum(1 for c in changes if c["kind"] == kind) for kind in labels}
+        summary = "，".join(f"{labels[k]} {n}" for k, n in counts.items() if n)
+        entries = []
+        for change in changes:
+            if change["kind"] == "added":
+                value = f"新增 {_format_value(change['new'])}"
+            elif change["kind"] == "removed":
+                value = f"删除 {_format_value(change['old'])}"
+            else:
+                value = f"{_format_value(change['old'])} → {_format_value(change['new'])}"
+            entries.append((change["path"], value))
+        sections.append(
+            section(number, title, [fields([("变更", summary)], bullet=False), fields(entries)])
+        )
+
+    total = sum(len(changes) for changes in diff.values())
+    return document(
+        f"{name} 架构变更对比",
+        [("旧版本", old_label), ("新版本", new_label), ("变更项", total)],
+        sections,
+    )
+
+
+def _load(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比两版架构设计输入，只输出有变化的章节")
+    parser.add_argument("--old-requirements", required=True, help="旧版需求JSON文件路径")
+    parser.add_argument("--old-architecture", required=True, help="旧版架构决策JSON文件路径")
+    parser.add_argument("--requirements", "-r", required=True, help="新版需求JSON文件路径")
+    parser.add_argument("--architecture", "-a", required=True, help="新版架构决策JSON文件路径")
+    parser.add_argument(
+        "--output", "-o", required=True, help="输出文件路径（多种格式时第一种写到该路径，其余按扩展名替换后写到同一目录）"
+    )
+    parser.add_argument(
+        "--format",
+        "-f",
+        default="markdown",
+        help=f"输出格式，逗号分隔可一次输出多种（可选: {'、'.join(BACKENDS)}）",
+    )
+    parser.add_argument(
+        "--sections-output", help="另外输出新版架构文档中仅包含变化章节的 Markdown 文件路径"
+    )
+
+    args = parser.parse_args()
+
+    formats = [fmt.strip() for fmt in args.format.split(",") if fmt.strip()]
+    unknown = [fmt for fmt in formats if fmt not in BACKENDS]
+    if unknown or not formats:
+        parser.error(f"未知的输出格式: {', '.join(unknown)}，可选: {', '.join(BACKENDS)}")
+    try:
+        outputs = output_paths(args.output, formats)
+    except ValueError as e:
+        parser.error(str(e))
+
+    old_requirements = _load(args.old_requirements)
+    old_architecture = _load(args.old_architecture)
+    requirements = _load(args.requirements)
+    architecture = _load(args.architecture)
+
+    diff = diff_architecture(old_requirements, old_architecture, requirements, architecture)
+    doc = build_diff_doc(
+        diff,
+        requirements.get("name", "系统"),
+        f"{args.old_requirements}, {args.old_architecture}",
+        f"{args.requirements}, {args.architecture}",
+    )
+    for fmt, output in outputs.items():
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(BACKENDS[fmt][1](doc))
+        print(f"架构变更对比已生成: {output}")
+
+    if args.sections_output:
+        changed = [title for title in diff if title in SECTIONS]
+        with open(args.sections_output, "w", encoding="utf-8") as f:
+            if changed:
+                f.write(generate_architecture_doc(requirements, architecture, sections=changed))
+        print(f"变化章节已生成: {args.sections_output}（{len(changed)} 个章节）")
+
+    print(f"共 {len(diff)} 个章节有变化，{sum(len(c) for c in diff.values())} 项变更")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+文档模型
+生成器先构建与格式无关的文档结构（章节 + 块），再由各后端序列化为 Markdown、HTML 或 JSON，
+一次构建即可输出多种格式
+
+文档结构（均为可直接序列化为 JSON 的 dict/list）:
+  document: {"title", "meta": [字段], "sections": [section]}
+  section:  {"number", "title", "blocks": [block]}
+  block:    {"type": "heading", "text"}
+            {"type": "list", "bullet": bool, "items": [item]}
+  item:     文本、{"label", "value", "marker"?} 字段，或在同一行列出的字段列表
+            {"type": "code", "language", "text"}
+"""
+
+import json
+from html import escape
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+
+def heading(text: str) -> Dict:
+    """小节标题"""
+    return {"type": "heading", "text": str(text)}
+
+
+def items(values: Iterable, bullet: bool = True) -> Dict:
+    """文本列表"""
+    return {"type": "list", "bullet": bullet, "items": [str(v) for v in values]}
+
+
+def field(label: str, value, marker: str = "") -> Dict:
+    """单个“名称: 值”条目，marker 为标签前的提示符号（如 ⚠️）"""
+    item = {"label": str(label), "value": str(value)}
+    if marker:
+        item["marker"] = marker
+    return item
+
+
+def fields(pairs: Iterable[Tuple[str, object]], bullet: bool = True) -> Dict:
+    """“名称: 值”列表"""
+    return {
+        "type": "list",
+        "bullet": bullet,
+        "items": [field(label, value) for label, value in pairs],
+    }
+
+
+def entries(values: Iterable, bullet: bool = True) -> Dict:
+    """混合列表：每项为文本、field() 或同一行列出的多个 field()"""
+    return {
+        "type": "list",
+        "bullet": bullet,
+        "items": [v if isinstance(v, (dict, list)) else str(v) for v in values],
+    }
+
+
+def code(text: str, language: str = "") -> Dict:
+    """代码块（含 Mermaid 图）"""
+    text = str(text)
+    if not text.endswith("\n"):
+        text += "\n"
+    return {"type": "code", "language": language, "text": text}
+
+
+def section(number: int, title: str, blocks: List[Dict]) -> Dict:
+    return {"number": number, "title": title, "blocks": blocks}
+
+
+def document(title: str, meta: Iterable[Tuple[str, object]], sections: List[Dict]) -> Dict:
+    return {
+        "title": title,
+        "meta": [{"label": str(label), "value": str(value)} for label, value in meta],
+        "sections": sections,
+    }
+
+
+def anchor(sec: Dict) -> str:
+    """章节锚点，与 Markdown 渲染器生成的锚点一致"""
+    return f"{sec['number']}-{sec['title']}"
+
+
+def _markdown_item(item) -> str:
+    if isinstance(item, list):
+        return ", ".join(_markdown_item(part) for part in item)
+    if isinstance(item, dict):
+        marker = f"{item['marker']} " if item.get("marker") else ""
+        return f"{marker}**{item['label']}**: {item['value']}"
+    return item
+
+
+def iter_markdown_blocks(blocks: List[Dict]) -> Iterator[str]:
+    for block in blocks:
+        kind = block["type"]
+        if kind == "heading":
+            yield f"### {block['text']}\n"
+        elif kind == "list":
+            prefix = "- " if block["bullet"] else ""
+            for item in block["items"]:
+                yield f"{prefix}{_markdown_item(item)}\n"
+            yield "\n"
+        elif kind == "code":
+            yield f"```{block['language']}\n"
+            yield block["text"]
+            yield "```\n\n"
+
+
+def markdown_header(doc: Dict) -> str:
+    """标题、元信息与目录"""
+    parts = [f"# {doc['title']}\n"]
+    for item in doc["meta"]:
+        parts.append(f"{_markdown_item(item)}\n")
+    parts.append("\n")
+    parts.append("## 目录\n")
+    for sec in doc["sections"]:
+        parts.append(f"- [{sec['number']}. {sec['title']}](#{anchor(sec)})\n")
+    parts.append("\n")
+    return "".join(parts)
+
+
+def markdown_section(sec: Dict) -> str:
+    return f"## {sec['number']}. {sec['title']}\n\n" + "".join(iter_markdown_blocks(sec["blocks"]))
+
+
+def to_markdown(doc: Dict) -> str:
+    return markdown_header(doc) + "".join(markdown_section(sec) for sec in doc["sections"])
+
+
+def _html_item(item) -> str:
+    if isinstance(item, list):
+        return ", ".join(_html_item(part) for part in item)
+    if isinstance(item, dict):
+        marker = f"{escape(item['marker'])} " if item.get("marker") else ""
+        return f"{marker}<strong>{escape(item['label'])}</strong>: {escape(item['value'])}"
+    return escape(item)
+
+
+def iter_html_blocks(blocks: List[Dict]) -> Iterator[str]:
+    for block in blocks:
+        kind = block["type"]
+        if kind == "heading":
+            yield f"<h3>{escape(block['text'])}</h3>\n"
+        elif kind == "list":
+            if not block["items"]:
+                continue
+            if block["bullet"]:
+                yield "<ul>\n"
+                for item in block["items"]:
+                    yield f"<li>{_html_item(item)}</li>\n"
+                yield "</ul>\n"
+            else:
+                yield "<p>" + "<br>\n".join(_html_item(item) for item in block["items"]) + "</p>\n"
+        elif kind == "code":
+            if block["language"] == "mermaid":
+                yield f'<pre class="mermaid">\n{escape(block["text"])}</pre>\n'
+            else:
+                language = escape(block["language"])
+                css = f' class="language-{language}"' if language else ""
+                yield f"<pre><code{css}>{escape(block['text'])}</code></pre>\n"
+
+
+def to_html(doc: Dict) -> str:
+    """生成独立的 HTML 页面，Mermaid 图使用 mermaid.js 约定的 <pre class="mermaid">"""
+    parts = [
+        "<!DOCTYPE html>\n",
+        '<html lang="zh-CN">\n<head>\n<meta charset="utf-8">\n',
+        f"<title>{escape(doc['title'])}</title>\n",
+        "</head>\n<body>\n",
+        f"<h1>{escape(doc['title'])}</h1>\n",
+    ]
+    if doc["meta"]:
+        parts.append("<p>" + "<br>\n".join(_html_item(item) for item in doc["meta"]) + "</p>\n")
+    parts.append('<nav>\n<h2>目录</h2>\n<ul>\n')
+    for sec in doc["sections"]:
+        title = f"{sec['number']}. {escape(sec['title'])}"
+        parts.append(f'<li><a href="#{escape(anchor(sec))}">{title}</a></li>\n')
+    parts.append("</ul>\n</nav>\n")
+    for sec in doc["sections"]:
+        title = f"{sec['number']}. {escape(sec['title'])}"
+        parts.append(f'<section>\n<h2 id="{escape(anchor(sec))}">{title}</h2>\n')
+        parts.extend(iter_html_blocks(sec["blocks"]))
+        parts.append("</section>\n")
+    parts.append("</body>\n</html>\n")
+    return "".join(parts)
+
+
+def to_json(doc: Dict) -> str:
+    return json.dumps(doc, ensure_ascii=False, indent=2)
+
+
+# 格式名 -> (文件扩展名, 序列化函数)
+BACKENDS: Dict[str, Tuple[str, Callable[[Dict], str]]] = {
+    "markdown": (".md", to_markdown),
+    "html": (".html", to_html),
+    "json": (".json", to_json),
+}
+
+
+def output_paths(output: str, formats: List[str]) -> Dict[str, str]:
+    """{格式: 输出路径}：第一种格式原样写到 output，其余格式按扩展名替换后写到同一目录
+
+    替换后与其他格式的路径相同时抛出 ValueError。
+    """
+    paths = {}
+    for fmt in formats:
+        path = output if not paths else str(Path(output).with_suffix(BACKENDS[fmt][0]))
+        if path in paths.values():
+            raise ValueError(f"{fmt} 格式的输出路径与其他格式重复: {path}")
+        paths[fmt] = path
+    return paths
@@ -6,159 +6,359 @@
 
 import json
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from pathlib import Path
-
-
-def generate_architecture_doc(requirements: dict, architecture: dict) -> str:
-    """生成完整的架构设计文档"""
-
-    sections = []
-
-    # 标题
-    sections.append(f"# {requirements.get('name', '系统')} 架构设计文档\n")
-    sections.append(f"**版本**: 1.0\n")
-    sections.append(f"**生成时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-    sections.append(f"**架构师**: AI Assistant\n\n")
-
-    # 目录
-    sections.append("## 目录\n")
-    sections.append("- [1. 需求概述](#1-需求概述)\n")
-    sections.append("- [2. 架构总览](#2-架构总览)\n")
-    sections.append("- [3. 模块设计](#3-模块设计)\n")
-    sections.append("- [4. 技术选型](#4-技术选型)\n")
-    sections.append("- [5. 数据设计](#5-数据设计)\n")
-    sections.append("- [6. 部署架构](#6-部署架构)\n")
-    sections.append("- [7. 风险评估](#7-风险评估)\n")
-    sections.append("- [8. 演进路线](#8-演进路线)\n\n")
-
-    # 1. 需求概述
-    sections.append("## 1. 需求概述\n\n")
-    sections.append("### 1.1 功能性需求\n")
-    for feature in requirements.get("features", []):
-        sections.append(f"- {feature}\n")
-    sections.append("\n")
-    sections.append("### 1.2 非功能性需求\n")
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+import capacity_planner
+import doc_model
+import module_graph
+import output_cache
+from capacity_planner import capacity_fields
+from doc_model import (
+    BACKENDS,
+    code,
+    document,
+    entries,
+    field,
+    fields,
+    heading,
+    items,
+    markdown_header,
+    markdown_section,
+    output_paths,
+    section,
+)
+from module_graph import ModuleGraph
+from output_cache import DEFAULT_CACHE_DIR, OutputCache, file_version, resolve_timestamp
+
+
+def _build_requirements(number: int, requirements: dict, architecture: dict) -> List[Dict]:
     nfr = requirements.get("non_functional", {})
-    sections.append(
-        f"- **性能指标**: QPS目标 {nfr.get('qps', '待定')}, 响应时间 {nfr.get('response_time', '待定')}\n"
-    )
-    sections.append(
-        f"- **可用性要求**: SLA {nfr.get('sla', '待定')}, 容灾目标 {nfr.get('disaster_recovery', '待定')}\n"
-    )
-    sections.append(
-        f"- **扩展性需求**: 支持用户数 {nfr.get('users', '待定')}, 数据量 {nfr.get('data_volume', '待定')}\n"
-    )
-    sections.append(f"- **安全性要求**: {nfr.get('security', '待定')}\n")
-    sections.append(f"- **成本预算**: {nfr.get('budget', '待定')}\n")
-    sections.append(f"- **时间约束**: {nfr.get('timeline', '待定')}\n\n")
-
-    # 2. 架构总览
-    sections.append("## 2. 架构总览\n\n")
-    sections.append(f"**架构模式**: {architecture.get('pattern', '待定')}\n\n")
-    sections.append("### 2.1 架构图\n")
-    sections.append("```mermaid\n")
-    sections.append(
-        architecture.get(
-            "mermaid_diagram", "graph TD\n    A[用户] --> B[网关]\n    B --> C[服务]\n"
-        )
-    )
-    sections.append("```\n\n")
-    sections.append("### 2.2 设计原则\n")
-    for principle in architecture.get("principles", []):
-        sections.append(f"- {principle}\n")
-    sections.append("\n")
-
-    # 3. 模块设计
-    sections.append("## 3. 模块设计\n\n")
+    return [
+        heading(f"{number}.1 功能性需求"),
+        items(requirements.get("features", [])),
+        heading(f"{number}.2 非功能性需求"),
+        fields(
+            [
+                (
+                    "性能指标",
+                    f"QPS目标 {nfr.get('qps', '待定')}, 响应时间 {nfr.get('response_time', '待定')}",
+                ),
+                (
+                    "可用性要求",
+                    f"SLA {nfr.get('sla', '待定')}, 容灾目标 {nfr.get('disaster_recovery', '待定')}",
+                ),
+                (
+                    "扩展性需求",
+                    f"支持用户数 {nfr.get('users', '待定')}, 数据量 {nfr.get('data_volume', '待定')}",
+                ),
+                ("安全性要求", nfr.get("security", "待定")),
+                ("成本预算", nfr.get("budget", "待定")),
+                ("时间约束", nfr.get("timeline", "待定")),
+            ]
+        ),
+    ]
+
+
+def _build_overview(number: int, requirements: dict, architecture: dict) -> List[Dict]:
+    blocks = [fields([("架构模式", architecture.get("pattern", "待定"))], bullet=False)]
+
+    # 未提供架构图时由模块依赖自动生成
     modules = architecture.get("modules", [])
-    for idx, module in enumerate(modules, 1):
-        sections.append(f"### 3.{idx} {module.get('name', '模块')}\n")
-        sections.append(f"- **职责**: {module.get('responsibility', '待定')}\n")
-        sections.append(f"- **接口**: {module.get('interfaces', '待定')}\n")
-        sections.append(f"- **依赖**: {module.get('dependencies', '无')}\n\n")
-
-    # 4. 技术选型
-    sections.append("## 4. 技术选型\n\n")
+    graph = ModuleGraph(modules) if modules else None
+    diagram = architecture.get("mermaid_diagram")
+    if diagram is None:
+        if graph is not None:
+            diagram = graph.to_mermaid()
+        else:
+            diagram = "graph TD\n    A[用户] --> B[网关]\n    B --> C[服务]\n"
+    blocks.append(heading(f"{number}.1 架构图"))
+    blocks.append(code(diagram, "mermaid"))
+    blocks.append(heading(f"{number}.2 设计原则"))
+    blocks.append(items(architecture.get("principles", [])))
+
+    if graph is not None:
+        external = sum(graph.external)
+        analysis = [
+            [
+                field("模块数", len(graph.names) - external),
+                field("外部依赖", external),
+                field("依赖关系", graph.edge_count),
+                field("层数", max(graph.layers()) + 1),
+            ]
+        ]
+        cycles = graph.cycles()
+        analysis.extend(field("循环依赖", "、".join(cycle), marker="⚠️") for cycle in cycles)
+        if not cycles:
+            analysis.append("未发现循环依赖")
+        blocks.append(heading(f"{number}.3 依赖分析"))
+        blocks.append(entries(analysis))
+    return blocks
+
+
+def _build_modules(number: int, requirements: dict, architecture: dict) -> List[Dict]:
+    blocks = []
+    for idx, module in enumerate(architecture.get("modules", []), 1):
+        blocks.append(heading(f"{number}.{idx} {module.get('name', '模块')}"))
+        blocks.append(
+            fields(
+                [
+                    ("职责", module.get("responsibility", "待定")),
+                    ("接口", module.get("interfaces", "待定")),
+                    ("依赖", module.get("dependencies", "无")),
+                ]
+            )
+        )
+    return blocks
+
+
+def _build_tech_stack(number: int, requirements: dict, architecture: dict) -> List[Dict]:
     tech_stack = architecture.get("tech_stack", {})
-    sections.append("### 4.1 前端技术\n")
-    sections.append(
-        f"- **框架**: {tech_stack.get('frontend', {}).get('framework', '待定')}\n"
-    )
-    sections.append(
-        f"- **状态管理**: {tech_stack.get('frontend', {}).get('state_management', '待定')}\n"
-    )
-    sections.append(
-        f"- **UI库**: {tech_stack.get('frontend', {}).get('ui_library', '待定')}\n\n"
-    )
-    sections.append("### 4.2 后端技术\n")
-    sections.append(
-        f"- **语言**: {tech_stack.get('backend', {}).get('language', '待定')}\n"
-    )
-    sections.append(
-        f"- **框架**: {tech_stack.get('backend', {}).get('framework', '待定')}\n"
-    )
-    sections.append(
-        f"- **运行时**: {tech_stack.get('backend', {}).get('runtime', '待定')}\n\n"
-    )
-    sections.append("### 4.3 中间件选型\n")
+    frontend = tech_stack.get("frontend", {})
+    backend = tech_stack.get("backend", {})
     middleware = tech_stack.get("middleware", {})
-    sections.append(f"- **数据库**: {middleware.get('database', '待定')}\n")
-    sections.append(f"- **缓存**: {middleware.get('cache', '待定')}\n")
-    sections.append(f"- **消息队列**: {middleware.get('mq', '待定')}\n")
-    sections.append(f"- **搜索引擎**: {middleware.get('search', '待定')}\n")
-    sections.append(f"- **服务治理**: {middleware.get('governance', '待定')}\n\n")
-
-    # 5. 数据设计
-    sections.append("## 5. 数据设计\n\n")
-    sections.append("### 5.1 数据存储方案\n")
-    for ds in architecture.get("data_storage", []):
-        sections.append(
-            f"- **{ds.get('type', '类型')}**: {ds.get('description', '描述')}\n"
+    return [
+        heading(f"{number}.1 前端技术"),
+        fields(
+            [
+                ("框架", frontend.get("framework", "待定")),
+                ("状态管理", frontend.get("state_management", "待定")),
+                ("UI库", frontend.get("ui_library", "待定")),
+            ]
+        ),
+        heading(f"{number}.2 后端技术"),
+        fields(
+            [
+                ("语言", backend.get("language", "待定")),
+                ("框架", backend.get("framework", "待定")),
+                ("运行时", backend.get("runtime", "待定")),
+            ]
+        ),
+        heading(f"{number}.3 中间件选型"),
+        fields(
+            [
+                ("数据库", middleware.get("database", "待定")),
+                ("缓存", middleware.get("cache", "待定")),
+                ("消息队列", middleware.get("mq", "待定")),
+                ("搜索引擎", middleware.get("search", "待定")),
+                ("服务治理", middleware.get("governance", "待定")),
+            ]
+        ),
+    ]
+
+
+def _build_data(number: int, requirements: dict, architecture: dict) -> List[Dict]:
+    return [
+        heading(f"{number}.1 数据存储方案"),
+        fields(
+            (ds.get("type", "类型"), ds.get("description", "描述"))
+            for ds in architecture.get("data_storage", [])
+        ),
+        heading(f"{number}.2 数据流转"),
+        code(architecture.get("data_flow", "用户请求 -> 网关 -> 服务 -> 数据库\n")),
+    ]
+
+
+def _build_deployment(number: int, requirements: dict, architecture: dict) -> List[Dict]:
+    deployment = architecture.get("deployment", {})
+    return [
+        fields(
+            [
+                ("部署环境", deployment.get("environment", "待定")),
+                ("容器编排", deployment.get("orchestration", "待定")),
+                ("CI/CD", deployment.get("cicd", "待定")),
+            ],
+            bullet=False,
+        ),
+        heading(f"{number}.1 部署拓扑"),
+        code(architecture.get("deployment_topology", "负载均衡 -> 多实例服务\n")),
+    ]
+
+
+def _build_capacity(number: int, requirements: dict, architecture: dict) -> List[Dict]:
+    pairs = capacity_fields(requirements.get("non_functional", {}))
+    if not pairs:
+        return [items(["未提供 QPS 或用户规模，无法估算容量"])]
+    return [
+        fields(pairs),
+        items(
+            [
+                "按 Little 定律估算：并发 = QPS × 响应时间；"
+                "默认假设可在 non_functional.capacity 中覆盖，参数扫描见 capacity_planner.py"
+            ]
+        ),
+    ]
+
+
+def _build_risks(number: int, requirements: dict, architecture: dict) -> List[Dict]:
+    blocks = []
+    for risk in architecture.get("risks", []):
+        blocks.append(heading(risk.get("name", "风险")))
+        blocks.append(
+            fields(
+                [
+                    ("等级", risk.get("level", "待定")),
+                    ("描述", risk.get("description", "待定")),
+                    ("应对措施", risk.get("mitigation", "待定")),
+                ]
+            )
         )
-    sections.append("\n")
-    sections.append("### 5.2 数据流转\n")
-    sections.append("```\n")
-    sections.append(
-        architecture.get("data_flow", "用户请求 -> 网关 -> 服务 -> 数据库\n")
-    )
-    sections.append("```\n\n")
+    return blocks
 
-    # 6. 部署架构
-    sections.append("## 6. 部署架构\n\n")
-    sections.append(
-        f"**部署环境**: {architecture.get('deployment', {}).get('environment', '待定')}\n"
-    )
-    sections.append(
-        f"**容器编排**: {architecture.get('deployment', {}).get('orchestration', '待定')}\n"
+
+def _build_roadmap(number: int, requirements: dict, architecture: dict) -> List[Dict]:
+    blocks = []
+    for idx, phase in enumerate(architecture.get("roadmap", []), 1):
+        blocks.append(heading(f"阶段{idx}: {phase.get('name', '待定')}"))
+        blocks.append(
+            fields(
+                [
+                    ("时间", phase.get("timeline", "待定")),
+                    ("目标", phase.get("goal", "待定")),
+                    ("交付物", phase.get("deliverables", "待定")),
+                ]
+            )
+        )
+    return blocks
+
+
+# 章节标题 -> 构建函数 (章节序号, 需求, 架构决策) -> 块列表（见 doc_model），按文档顺序排列
+SECTIONS: Dict[str, Callable[[int, dict, dict], List[Dict]]] = {
+    "需求概述": _build_requirements,
+    "架构总览": _build_overview,
+    "模块设计": _build_modules,
+    "技术选型": _build_tech_stack,
+    "数据设计": _build_data,
+    "部署架构": _build_deployment,
+    "容量估算": _build_capacity,
+    "风险评估": _build_risks,
+    "演进路线": _build_roadmap,
+}
+
+
+def register_section(
+    title: str, build: Callable[[int, dict, dict], List[Dict]], before: str = None
+):
+    """注册自定义章节，缺省追加到文档末尾，也可插入到 before 指定的章节之前"""
+    if before is None:
+        SECTIONS[title] = build
+        return
+    if before not in SECTIONS:
+        raise KeyError(f"未知章节: {before}")
+    entries = [(t, b) for t, b in SECTIONS.items() if t != title]
+    index = next(i for i, (t, _) in enumerate(entries) if t == before)
+    entries.insert(index, (title, build))
+    SECTIONS.clear()
+    SECTIONS.update(entries)
+
+
+def select_sections(sections: Iterable[str] = None) -> List[str]:
+    """按文档顺序返回要生成的章节标题，sections 为空时返回全部章节"""
+    if not sections:
+        return list(SECTIONS)
+    wanted = set(sections)
+    unknown = wanted - set(SECTIONS)
+    if unknown:
+        raise KeyError(f"未知章节: {', '.join(sorted(unknown))}，可选: {', '.join(SECTIONS)}")
+    return [title for title in SECTIONS if title in wanted]
+
+
+def _build_section(args: Tuple[str, int, dict, dict]) -> Dict:
+    """进程池任务：构建单个章节"""
+    title, number, requirements, architecture = args
+    return section(number, title, SECTIONS[title](number, requirements, architecture))
+
+
+def _document_header(
+    requirements: dict, architecture: dict, generated_at: datetime, titles: List[str]
+) -> Dict:
+    """不含章节内容的文档骨架（标题、元信息、章节列表）"""
+    generated_at = generated_at or resolve_timestamp(requirements, architecture) or datetime.now()
+    return document(
+        f"{requirements.get('name', '系统')} 架构设计文档",
+        [
+            ("版本", "1.0"),
+            ("生成时间", generated_at.strftime("%Y-%m-%d %H:%M:%S")),
+            ("架构师", "AI Assistant"),
+        ],
+        [section(number, title, []) for number, title in enumerate(titles, 1)],
     )
-    sections.append(
-        f"**CI/CD**: {architecture.get('deployment', {}).get('cicd', '待定')}\n\n"
+
+
+def iter_sections(
+    requirements: dict, architecture: dict, titles: List[str], workers: int = 0
+) -> Iterator[Dict]:
+    """按顺序构建选中的章节
+
+    workers 大于 1 时各章节在进程池中并行构建（适合模块、风险、阶段很多的大型文档），
+    否则在迭代到该章节时才构建。
+    """
+    tasks = [(title, number, requirements, architecture) for number, title in enumerate(titles, 1)]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            yield from executor.map(_build_section, tasks)
+    else:
+        for task in tasks:
+            yield _build_section(task)
+
+
+def build_architecture_doc(
+    requirements: dict,
+    architecture: dict,
+    generated_at: datetime = None,
+    sections: Iterable[str] = None,
+    workers: int = 0,
+) -> Dict:
+    """构建架构设计文档模型，可交给 doc_model 中的任一后端输出
+
+    sections 指定要包含的章节（缺省为全部），章节按选中后的顺序重新编号。generated_at 缺省时
+    依次取输入中的 generated_at、SOURCE_DATE_EPOCH，都没有时使用当前时间。
+    """
+    titles = select_sections(sections)
+    doc = _document_header(requirements, architecture, generated_at, titles)
+    doc["sections"] = list(iter_sections(requirements, architecture, titles, workers))
+    return doc
+
+
+def iter_architecture_doc(
+    requirements: dict,
+    architecture: dict,
+    generated_at: datetime = None,
+    sections: Iterable[str] = None,
+    workers: int = 0,
+) -> Iterator[str]:
+    """逐章节生成 Markdown 架构设计文档，只构建选中的章节"""
+    titles = select_sections(sections)
+    yield markdown_header(_document_header(requirements, architecture, generated_at, titles))
+    for sec in iter_sections(requirements, architecture, titles, workers):
+        yield markdown_section(sec)
+
+
+def generate_architecture_doc(
+    requirements: dict,
+    architecture: dict,
+    generated_at: datetime = None,
+    sections: Iterable[str] = None,
+    workers: int = 0,
+) -> str:
+    """生成 Markdown 架构设计文档，sections 指定要包含的章节（缺省为全部）"""
+    return "".join(
+        iter_architecture_doc(requirements, architecture, generated_at, sections, workers)
     )
-    sections.append("### 6.1 部署拓扑\n")
-    sections.append("```\n")
-    sections.append(architecture.get("deployment_topology", "负载均衡 -> 多实例服务\n"))
-    sections.append("```\n\n")
-
-    # 7. 风险评估
-    sections.append("## 7. 风险评估\n\n")
-    risks = architecture.get("risks", [])
-    for risk in risks:
-        sections.append(f"### {risk.get('name', '风险')}\n")
-        sections.append(f"- **等级**: {risk.get('level', '待定')}\n")
-        sections.append(f"- **描述**: {risk.get('description', '待定')}\n")
-        sections.append(f"- **应对措施**: {risk.get('mitigation', '待定')}\n\n")
-
-    # 8. 演进路线
-    sections.append("## 8. 演进路线\n\n")
-    roadmap = architecture.get("roadmap", [])
-    for idx, phase in enumerate(roadmap, 1):
-        sections.append(f"### 阶段{idx}: {phase.get('name', '待定')}\n")
-        sections.append(f"- **时间**: {phase.get('timeline', '待定')}\n")
-        sections.append(f"- **目标**: {phase.get('goal', '待定')}\n")
-        sections.append(f"- **交付物**: {phase.get('deliverables', '待定')}\n\n")
-
-    return "".join(sections)
+
+
+def render_architecture_doc(
+    requirements: dict,
+    architecture: dict,
+    formats: Iterable[str] = ("markdown",),
+    generated_at: datetime = None,
+    sections: Iterable[str] = None,
+    workers: int = 0,
+) -> Dict[str, str]:
+    """构建一次文档模型并输出为多种格式，返回 {格式: 文本}"""
+    doc = build_architecture_doc(requirements, architecture, generated_at, sections, workers)
+    return {fmt: BACKENDS[fmt][1](doc) for fmt in formats}
 
 
 def main():
@@ -167,7 +367,28 @@ def main():
     parser.add_argument(
         "--architecture", "-a", required=True, help="架构决策JSON文件路径"
     )
-    parser.add_argument("--output", "-o", required=True, help="输出Markdown文件路径")
+    parser.add_argument(
+        "--output", "-o", required=True, help="输出文件路径（多种格式时第一种写到该路径，其余按扩展名替换后写到同一目录）"
+    )
+    parser.add_argument(
+        "--format",
+        "-f",
+        default="markdown",
+        help=f"输出格式，逗号分隔可一次输出多种（可选: {'、'.join(BACKENDS)}）",
+    )
+    parser.add_argument(
+        "--sections", "-s", help=f"只生成指定章节（逗号分隔，可选: {'、'.join(SECTIONS)}）"
+    )
+    parser.add_argument(
+        "--workers", "-w", type=int, default=0, help="并行渲染章节的进程数（缺省串行）"
+    )
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="输出缓存目录")
+    parser.add_argument("--no-cache", action="store_true", help="禁用输出缓存，总是重新生成")
+    parser.add_argument(
+        "--deterministic",
+        action="store_true",
+        help="可复现模式：输入与 SOURCE_DATE_EPOCH 均未给出生成时间时，取输入文件的修改时间",
+    )
 
     args = parser.parse_args()
 
@@ -177,14 +398,58 @@ def main():
     with open(args.architecture, "r", encoding="utf-8") as f:
         architecture = json.load(f)
 
-    # 生成文档
-    doc = generate_architecture_doc(requirements, architecture)
+    try:
+        generated_at = resolve_timestamp(
+            requirements,
+            architecture,
+            fallback_paths=[args.requirements, args.architecture] if args.deterministic else (),
+        )
+    except ValueError as e:
+        parser.error(f"无效的生成时间: {e}")
+    try:
+        titles = select_sections(
+            [t.strip() for t in args.sections.split(",") if t.strip()] if args.sections else None
+        )
+    except KeyError as e:
+        parser.error(e.args[0])
+    formats = [fmt.strip() for fmt in args.format.split(",") if fmt.strip()]
+    unknown = [fmt for fmt in formats if fmt not in BACKENDS]
+    if unknown or not formats:
+        parser.error(f"未知的输出格式: {', '.join(unknown)}，可选: {', '.join(BACKENDS)}")
+    try:
+        outputs = output_paths(args.output, formats)
+    except ValueError as e:
+        parser.error(str(e))
 
-    # 输出文档
-    with open(args.output, "w", encoding="utf-8") as f:
-        f.write(doc)
+    # 生成并输出文档，输入未变化时复用缓存；生成时间取当前时间时每次输出都不同，不使用缓存
+    cache = OutputCache(args.cache_dir, enabled=not args.no_cache and generated_at is not None)
+    key = cache.key(
+        "generate_architecture_doc",
+        file_version(
+            __file__,
+            capacity_planner.__file__,
+            doc_model.__file__,
+            module_graph.__file__,
+            output_cache.__file__,
+        ),
+        requirements,
+        architecture,
+        generated_at.isoformat() if generated_at else None,
+        titles,
+    )
+    status = cache.write_outputs(
+        key,
+        outputs,
+        lambda: render_architecture_doc(
+            requirements, architecture, formats, generated_at, titles, args.workers
+        ),
+    )
 
-    print(f"架构设计文档已生成: {args.output}")
+    for output in outputs.values():
+        if status == "unchanged":
+            print(f"架构设计文档已是最新，跳过生成: {output}")
+        else:
+            print(f"架构设计文档已生成: {output}")
 
 
 if __name__ == "__main__":
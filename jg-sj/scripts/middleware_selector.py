@@ -1,297 +1,869 @@
 #!/usr/bin/env python3
 """
 中间件智能选型工具
-根据场景需求自动推荐合适的中间件
+根据场景需求自动推荐合适的中间件；候选中间件及其特性来自 assets/catalogs/middleware.json
 """
 
+import io
+import os
+import sys
+import csv
 import json
+import heapq
+import pickle
+import hashlib
 import argparse
-from typing import Dict, List
+from concurrent.futures import ProcessPoolExecutor
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, Optional, TextIO, Tuple
 from pathlib import Path
 
+import capacity_planner
+import middleware_sizing
+import output_cache
+from batch_items import iter_batch_items
+from middleware_sizing import (
+    DEFAULT_LOAD_SHARE,
+    LOAD_SHARES,
+    format_sizing,
+    format_targets,
+    load_targets,
+    size_candidate,
+)
+from output_cache import DEFAULT_CACHE_DIR, OutputCache, file_version, write_if_changed
+
+
+# 内置中间件目录（特性矩阵），可用 --catalog 换成扩展后的目录文件
+DEFAULT_CATALOG = str(
+    Path(__file__).resolve().parents[1] / "assets" / "catalogs" / "middleware.json"
+)
+
+# 编译索引的缓存格式版本，索引结构变化时递增
+INDEX_CACHE_VERSION = 3
+
+
+# 需求开关 -> 相关的特性词条（命中优势/适用场景加分，命中劣势扣分）
+FEATURE_TERMS: Dict[str, Tuple[str, ...]] = {
+    "need_transaction": ("事务支持", "事务消息", "分布式事务", "OLTP", "金融交易", "事务限制"),
+    "need_complex_query": ("复杂查询", "高级特性", "JSON支持"),
+    "need_geo": ("GIS地理",),
+    "high_throughput": ("高吞吐", "高性能", "极速性能", "吞吐有限"),
+    "need_order": ("顺序消息", "订单系统"),
+    "need_complex_data": ("丰富数据结构", "数据结构丰富", "功能单一"),
+    "need_persistence": ("持久化", "无持久化"),
+    "need_fulltext": ("全文检索", "全文搜索", "实时搜索"),
+    "need_log_analysis": ("日志分析", "聚合分析", "监控可视化"),
+    "need_plugins": ("插件丰富",),
+    "need_config_center": ("配置中心",),
+    "multi_datacenter": ("多数据中心", "跨数据中心"),
+}
 
-# 中间件特性矩阵
-MIDDLEWARE_MATRIX = {
-    "database": {
-        "mysql": {
-            "name": "MySQL",
-            "strengths": ["事务支持", "复杂查询", "成熟稳定", "生态丰富"],
-            "weaknesses": ["水平扩展难", "大数据量有限"],
-            "use_cases": ["OLTP", "电商订单", "用户系统", "金融交易"],
-            "scale": "百万级用户",
-            "performance": "高",
-            "difficulty": "低",
-        },
-        "postgresql": {
-            "name": "PostgreSQL",
-            "strengths": ["高级特性", "JSON支持", "扩展性强", "标准兼容"],
-            "weaknesses": ["写入性能", "生态"],
-            "use_cases": ["GIS地理", "数据分析", "复杂查询", "企业应用"],
-            "scale": "百万级用户",
-            "performance": "高",
-            "difficulty": "中",
-        },
-        "mongodb": {
-            "name": "MongoDB",
-            "strengths": ["文档模型", "水平扩展", "灵活 schema", "易上手"],
-            "weaknesses": ["事务限制", "内存占用"],
-            "use_cases": ["内容管理", "日志存储", "实时分析", "IoT数据"],
-            "scale": "千万级用户",
-            "performance": "高",
-            "difficulty": "低",
-        },
-        "redis": {
-            "name": "Redis",
-            "strengths": ["极速性能", "丰富数据结构", "持久化", "集群成熟"],
-            "weaknesses": ["单线程", "内存成本"],
-            "use_cases": ["缓存", "会话", "排行榜", "实时计算"],
-            "scale": "亿级用户",
-            "performance": "极高",
-            "difficulty": "低",
-        },
-    },
-    "mq": {
-        "kafka": {
-            "name": "Kafka",
-            "strengths": ["高吞吐", "持久化", "流处理", "生态完善"],
-            "weaknesses": ["延迟", "复杂度"],
-            "use_cases": ["日志收集", "事件流", "数据管道", "实时分析"],
-            "scale": "亿级消息",
-            "performance": "极高",
-            "difficulty": "高",
-        },
-        "rabbitmq": {
-            "name": "RabbitMQ",
-            "strengths": ["灵活路由", "消息确认", "管理友好", "协议支持广"],
-            "weaknesses": ["吞吐有限", "集群复杂"],
-            "use_cases": ["任务队列", "复杂路由", "企业集成", "微服务通信"],
-            "scale": "百万级消息",
-            "performance": "高",
-            "difficulty": "中",
-        },
-        "rocketmq": {
-            "name": "RocketMQ",
-            "strengths": ["事务消息", "顺序消息", "阿里背书", "中文友好"],
-            "weaknesses": ["生态较小", "国际影响力有限"],
-            "use_cases": ["订单系统", "金融交易", "电商场景", "分布式事务"],
-            "scale": "千万级消息",
-            "performance": "高",
-            "difficulty": "中",
-        },
-    },
-    "cache": {
-        "redis": {
-            "name": "Redis",
-            "strengths": ["数据结构丰富", "持久化", "集群成熟"],
-            "weaknesses": ["内存成本", "单线程"],
-            "use_cases": ["页面缓存", "会话", "分布式锁"],
-            "scale": "亿级",
-            "performance": "极高",
-            "difficulty": "低",
-        },
-        "memcached": {
-            "name": "Memcached",
-            "strengths": ["简单高效", "内存利用率高"],
-            "weaknesses": ["无持久化", "功能单一"],
-            "use_cases": ["简单缓存", "页面缓存"],
-            "scale": "千万级",
-            "performance": "高",
-            "difficulty": "低",
-        },
-    },
-    "search": {
-        "elasticsearch": {
-            "name": "Elasticsearch",
-            "strengths": ["全文检索", "聚合分析", "实时搜索", "生态完善"],
-            "weaknesses": ["资源消耗大", "复杂度"],
-            "use_cases": ["全文搜索", "日志分析", "监控可视化"],
-            "scale": "PB级数据",
-            "performance": "高",
-            "difficulty": "中",
-        },
-        "meilisearch": {
-            "name": "Meilisearch",
-            "strengths": ["简单易用", "搜索快", "开箱即用"],
-            "weaknesses": ["功能有限", "新项目"],
-            "use_cases": ["嵌入式搜索", "中小型应用"],
-            "scale": "TB级数据",
-            "performance": "高",
-            "difficulty": "低",
-        },
-    },
-    "gateway": {
-        "kong": {
-            "name": "Kong",
-            "strengths": ["插件丰富", "性能好", "社区活跃"],
-            "weaknesses": ["配置复杂", "学习曲线"],
-            "use_cases": ["API网关", "认证鉴权", "流量控制"],
-            "scale": "百万级QPS",
-            "performance": "高",
-            "difficulty": "中",
-        },
-        "apisix": {
-            "name": "APISIX",
-            "strengths": ["高性能", "国产开源", "动态配置"],
-            "weaknesses": ["相对新", "生态建设中"],
-            "use_cases": ["API网关", "服务网格"],
-            "scale": "百万级QPS",
-            "performance": "极高",
-            "difficulty": "中",
-        },
-    },
+# 需求开关只作用于相关的类别（例如 need_persistence 是对缓存的要求，不应让数据库选 Redis）；
+# 未列出的开关作用于全部类别
+FEATURE_CATEGORIES: Dict[str, Tuple[str, ...]] = {
+    "need_transaction": ("database", "mq"),
+    "need_complex_query": ("database",),
+    "need_geo": ("database",),
+    "high_throughput": ("mq",),
+    "need_order": ("mq",),
+    "need_complex_data": ("cache",),
+    "need_persistence": ("cache",),
+    "need_fulltext": ("search",),
+    "need_log_analysis": ("search",),
+    "need_plugins": ("gateway",),
+    "need_config_center": ("registry",),
 }
 
+# use_cases 中的场景标签 -> 相关词条；未列出的标签按原文与矩阵词条匹配
+USE_CASE_TERMS: Dict[str, Tuple[str, ...]] = {
+    "content": ("内容管理", "文档模型", "灵活 schema"),
+    "log": ("日志收集", "日志存储", "日志分析"),
+    "iot": ("IoT数据", "水平扩展"),
+    "stream": ("事件流", "流处理"),
+    "order": ("订单系统", "电商订单"),
+    "ecommerce": ("电商订单", "电商场景"),
+    "finance": ("金融交易",),
+    "user": ("用户系统",),
+    "session": ("会话",),
+    "task": ("任务队列",),
+    "search": ("全文搜索",),
+    "analytics": ("数据分析", "实时分析"),
+    "microservice": ("微服务通信", "服务网格"),
+    "java": ("Java微服务", "Spring生态", "Spring Cloud微服务"),
+}
 
-def select_database(requirements: dict) -> Dict:
-    """根据需求选择数据库"""
-    use_cases = requirements.get("use_cases", [])
-    scale = requirements.get("scale", "medium")
-    need_transaction = requirements.get("need_transaction", False)
-    need_complex_query = requirements.get("need_complex_query", False)
-    need_geo = requirements.get("need_geo", False)
+# 矩阵字段 -> (报告中的名称, 命中词条的分值)；需求开关在每个字段中只计命中的最高加分，
+# use_cases 标签在所有字段中只计一次最高加分，扣分全部计入
+TERM_SOURCES: Dict[str, Tuple[str, float]] = {
+    "strengths": ("优势", 3.0),
+    "use_cases": ("适用场景", 2.0),
+    "weaknesses": ("劣势", -3.0),
+}
 
-    # 交易系统优先选关系型
-    if need_transaction:
-        if need_geo:
-            return {"type": "postgresql", "reason": "需要事务+地理信息功能"}
-        return {"type": "mysql", "reason": "事务支持好，适合OLTP场景"}
+PERFORMANCE_POINTS = {"极高": 2.0, "高": 1.0, "中": 0.0, "低": -1.0}
+DIFFICULTY_POINTS = {"低": 0.0, "中": -1.0, "高": -2.0}
 
-    # 需要复杂查询
-    if need_complex_query:
-        return {"type": "postgresql", "reason": "复杂查询能力强，JSON支持好"}
+# 需求规模 -> 要求的规模等级；规模描述按关键字识别等级（先匹配先生效）
+SCALE_LEVELS = {"small": 0, "medium": 1, "large": 2}
+SCALE_KEYWORDS = (
+    ("亿", 3), ("PB", 3), ("千万", 2), ("百万", 1), ("TB", 1), ("十万", 0), ("万", 0), ("GB", 0)
+)
 
-    # 大数据量+灵活schema
-    if "content" in use_cases or "log" in use_cases or "iot" in use_cases:
-        return {"type": "mongodb", "reason": "文档模型灵活，适合非结构化数据"}
+# 目录中 defaults 指定的各类别首选（无明确需求时的选择，可按规模区分）的加分，作为同分时的倾向
+DEFAULT_BONUS = 1.0
 
-    # 默认选择
-    return {"type": "mysql", "reason": "通用场景，稳定可靠"}
+# 规模每低于需求一个等级的扣分
+SCALE_PENALTY = 0.5
 
+# 没有候选满足需求时的说明
+NO_CANDIDATE_REASON = "没有候选同时满足需求与目标负载"
 
-def select_mq(requirements: dict) -> Dict:
-    """根据需求选择消息队列"""
-    use_cases = requirements.get("use_cases", [])
-    need_transaction = requirements.get("need_transaction", False)
-    high_throughput = requirements.get("high_throughput", False)
-    need_order = requirements.get("need_order", False)
 
-    # 交易系统需要事务消息
-    if need_transaction:
-        return {"type": "rocketmq", "reason": "支持分布式事务消息，顺序消息"}
+def freeze_product(product: dict) -> Dict:
+    """列表字段转为元组，条目内容不再被修改（对外只以只读映射提供）"""
+    return {
+        field: tuple(value) if isinstance(value, list) else value
+        for field, value in product.items()
+    }
 
-    # 高吞吐日志场景
-    if "log" in use_cases or "stream" in use_cases or high_throughput:
-        return {"type": "kafka", "reason": "高吞吐，适合日志和流处理"}
 
-    # 通用场景
-    return {"type": "rabbitmq", "reason": "灵活路由，消息确认机制完善"}
+def scale_level(text: str) -> int:
+    """把“千万级用户”“PB级数据”等规模描述折算为等级"""
+    for keyword, level in SCALE_KEYWORDS:
+        if keyword in text:
+            return level
+    return 1
 
 
-def select_cache(requirements: dict) -> Dict:
-    """根据需求选择缓存"""
-    need_complex_data = requirements.get("need_complex_data", False)
-    need_persistence = requirements.get("need_persistence", False)
+def requirement_terms(requirements: dict) -> Dict[str, str]:
+    """把需求开关与 use_cases 展开为 {特性词条: 来源需求}"""
+    terms: Dict[str, str] = {}
+    for feature, feature_terms in FEATURE_TERMS.items():
+        if requirements.get(feature):
+            for term in feature_terms:
+                terms.setdefault(term, feature)
+    for use_case in requirements.get("use_cases", []):
+        for term in USE_CASE_TERMS.get(use_case, (use_case,)):
+            terms.setdefault(term, use_case)
+    return terms
 
-    # 需要复杂数据结构或持久化
-    if need_complex_data or need_persistence:
-        return {"type": "redis", "reason": "数据结构丰富，支持持久化"}
 
-    # 简单缓存
-    return {"type": "memcached", "reason": "简单高效，内存利用率高"}
+def requirement_weights(requirements: dict) -> Tuple[float, float, int]:
+    """按需求确定属性权重：(性能权重, 上手难度权重, 要求的规模等级)"""
+    scale = requirements.get("scale", "medium")
+    performance = 0.5 if requirements.get("high_throughput") or scale == "large" else 0.25
+    difficulty = 1.0 if scale == "small" else 0.5
+    return performance, difficulty, SCALE_LEVELS.get(scale, 1)
+
+
+class MiddlewareIndex:
+    """由特性矩阵建立的选型索引
+
+    每个类别维护“词条 -> 命中的候选”倒排索引与按候选排列的数值属性；查询时只遍历需求词条
+    命中的条目，再对属性做一次线性累加，候选数量较多时仍保持亚毫秒级。
+    """
+
+    def __init__(self, matrix: Dict, defaults: Dict = None, pairs: Iterable[Dict] = ()):
+        self.keys: Dict[str, List[str]] = {}
+        self.info: Dict[str, List[Dict]] = {}
+        self.terms: Dict[str, Dict[str, List[Tuple[int, str, float]]]] = {}
+        self.attributes: Dict[str, Tuple[List[float], List[float], List[int]]] = {}
+        # 参与推荐的候选序号；auxiliary 的条目只用于对比，不会被推荐
+        self.candidates: Dict[str, List[int]] = {}
+        # 类别 -> {规模等级: 首选序号}
+        self.defaults: Dict[str, Dict[int, int]] = {}
+        # (类别, 序号) -> [(另一类别, 序号, 协同得分, 说明)]，两个方向各记录一次
+        self.pairs: Dict[Tuple[str, int], List[Tuple[str, int, float, str]]] = {}
+        self.fingerprint = ""  # 目录内容指纹，由 load_middleware_index 设置
+        self._positions: Optional[Dict[str, Dict[str, int]]] = None
+
+        for category, products in matrix.items():
+            keys = list(products)
+            infos = [freeze_product(products[key]) for key in keys]
+            self.keys[category] = keys
+            self.info[category] = infos
+            self.candidates[category] = [
+                position for position, info in enumerate(infos) if not info.get("auxiliary")
+            ]
+
+            terms: Dict[str, List[Tuple[int, str, float]]] = {}
+            for position, info in enumerate(infos):
+                for source, (_, weight) in TERM_SOURCES.items():
+                    for term in info.get(source, []):
+                        terms.setdefault(term, []).append((position, source, weight))
+            self.terms[category] = terms
+
+            self.attributes[category] = (
+                [PERFORMANCE_POINTS.get(info.get("performance"), 0.0) for info in infos],
+                [DIFFICULTY_POINTS.get(info.get("difficulty"), 0.0) for info in infos],
+                [scale_level(info.get("scale", "")) for info in infos],
+            )
+            default = (defaults or {}).get(category)
+            if not isinstance(default, dict):
+                default = dict.fromkeys(SCALE_LEVELS, default)
+            self.defaults[category] = {
+                SCALE_LEVELS[scale]: keys.index(key)
+                for scale, key in default.items()
+                if scale in SCALE_LEVELS and key in products
+            }
+
+        positions = self._product_positions()
+        for pair in pairs:
+            ends = []
+            for item in pair.get("items", []):
+                category, _, key = str(item).partition(":")
+                position = positions.get(category, {}).get(key)
+                if position is not None:
+                    ends.append((category, position))
+            # 引用了目录中不存在的产品（例如自定义目录删掉了它）时忽略该条
+            if len(ends) != 2 or ends[0][0] == ends[1][0]:
+                continue
+            score = float(pair.get("score", 0))
+            reason = pair.get("reason", "")
+            self.pairs.setdefault(ends[0], []).append((*ends[1], score, reason))
+            self.pairs.setdefault(ends[1], []).append((*ends[0], score, reason))
+
+    def dump_compiled(self) -> Tuple:
+        """导出编译结果，用于写入磁盘缓存"""
+        return (
+            self.keys,
+            self.info,
+            self.candidates,
+            self.terms,
+            self.attributes,
+            self.defaults,
+            self.pairs,
+            self.fingerprint,
+        )
+
+    @classmethod
+    def from_compiled(cls, compiled: Tuple) -> "MiddlewareIndex":
+        """由 dump_compiled 的结果恢复索引，跳过词条与属性的重新计算"""
+        index = cls.__new__(cls)
+        (
+            index.keys,
+            index.info,
+            index.candidates,
+            index.terms,
+            index.attributes,
+            index.defaults,
+            index.pairs,
+            index.fingerprint,
+        ) = compiled
+        index._positions = None
+        return index
+
+    @property
+    def categories(self) -> List[str]:
+        return list(self.keys)
+
+    def product(self, category: str, key: str) -> Mapping:
+        """查询目录中的中间件条目（只读），不存在时返回空映射"""
+        if self._positions is None:
+            self._positions = self._product_positions()
+        position = self._positions.get(category, {}).get(key)
+        if position is None:
+            return MappingProxyType({})
+        return MappingProxyType(self.info[category][position])
+
+    def _product_positions(self) -> Dict[str, Dict[str, int]]:
+        return {
+            category: {key: position for position, key in enumerate(keys)}
+            for category, keys in self.keys.items()
+        }
+
+    @property
+    def matrix(self) -> Mapping[str, Mapping[str, Mapping]]:
+        """只读的特性矩阵视图 {类别: {标识: 条目}}"""
+        return MappingProxyType(
+            {
+                category: MappingProxyType(
+                    {key: MappingProxyType(info) for key, info in zip(keys, self.info[category])}
+                )
+                for category, keys in self.keys.items()
+            }
+        )
+
+    def rank(self, category: str, requirements: dict, limit: Optional[int] = None) -> List[Dict]:
+        """为一个类别的全部候选打分，返回按得分降序的 [{type, name, score, breakdown}]"""
+        return self._rank(
+            category, requirement_terms(requirements), requirement_weights(requirements), limit
+        )
+
+    def recommend(self, requirements: dict, limit: Optional[int] = 3) -> Dict[str, List[Dict]]:
+        """为所有类别排序，需求只解析一次"""
+        terms = requirement_terms(requirements)
+        weights = requirement_weights(requirements)
+        return {category: self._rank(category, terms, weights, limit) for category in self.keys}
+
+    def score(
+        self, category: str, terms: Dict[str, str], weights: Tuple[float, float, int]
+    ) -> Tuple[List[float], Dict[int, List[Tuple[str, str, float]]]]:
+        """按候选顺序返回得分列表，以及 {候选序号: 计分的词条命中}
+
+        terms、weights 分别由 requirement_terms、requirement_weights 得到。
+        """
+        performance, difficulty, scale = self.attributes[category]
+        performance_weight, difficulty_weight, required_scale = weights
+
+        scores = [
+            performance_weight * p
+            + difficulty_weight * d
+            - SCALE_PENALTY * max(0, required_scale - s)
+            for p, d, s in zip(performance, difficulty, scale)
+        ]
+        # 候选 -> {计分键: 最高加分命中}，以及全部扣分命中；需求开关按 (开关, 字段) 计分，
+        # 场景标签按标签计分
+        best: Dict[int, Dict[object, Tuple[str, str, float]]] = {}
+        hits: Dict[int, List[Tuple[str, str, float]]] = {}
+        index = self.terms[category]
+        for term, need in terms.items():
+            if category not in FEATURE_CATEGORIES.get(need, (category,)):
+                continue
+            flag = need in FEATURE_TERMS
+            for position, source, weight in index.get(term, ()):
+                if weight < 0:
+                    scores[position] += weight
+                    hits.setdefault(position, []).append((term, source, weight))
+                    continue
+                matched = best.setdefault(position, {})
+                key = (need, source) if flag else need
+                previous = matched.get(key)
+                if previous is None or weight > previous[2]:
+                    scores[position] += weight - (previous[2] if previous else 0.0)
+                    matched[key] = (term, source, weight)
+        for position, matched in best.items():
+            hits.setdefault(position, []).extend(matched.values())
+
+        default = self.default_position(category, hits, required_scale)
+        if default is not None:
+            scores[default] += DEFAULT_BONUS
+        return scores, hits
+
+    def default_position(
+        self, category: str, hits: Dict[int, List[Tuple[str, str, float]]], required_scale: int
+    ) -> Optional[int]:
+        """需求在该类别没有命中任何加分词条时的首选序号，否则为 None"""
+        if any(weight > 0 for matched in hits.values() for _, _, weight in matched):
+            return None
+        return self.defaults.get(category, {}).get(required_scale)
+
+    def _rank(
+        self,
+        category: str,
+        terms: Dict[str, str],
+        weights: Tuple[float, float, int],
+        limit: Optional[int],
+    ) -> List[Dict]:
+        keys = self.keys.get(category)
+        candidates = self.candidates.get(category)
+        if not candidates:
+            return []
+        scores, hits = self.score(category, terms, weights)
+        default = self.default_position(category, hits, weights[2])
+
+        # 同分时保持矩阵中的顺序
+        if limit is None or limit >= len(candidates):
+            order = sorted(candidates, key=lambda i: -scores[i])
+        else:
+            order = heapq.nsmallest(limit, candidates, key=lambda i: -scores[i])
+
+        ranking = []
+        for position in order:
+            ranking.append(
+                {
+                    "type": keys[position],
+                    "name": self.info[category][position].get("name", keys[position]),
+                    "score": round(scores[position], 2),
+                    "breakdown": self._breakdown(
+                        category, position, hits.get(position, []), terms, weights, default
+                    ),
+                }
+            )
+        return ranking
+
+    def _breakdown(
+        self,
+        category: str,
+        position: int,
+        hits: List[Tuple[str, str, float]],
+        terms: Dict[str, str],
+        weights: Tuple[float, float, int],
+        default: Optional[int] = None,
+    ) -> List[Dict]:
+        """得分明细：词条命中、性能、上手难度、规模与默认首选，按分值绝对值降序"""
+        info = self.info[category][position]
+        performance, difficulty, scale = self.attributes[category]
+        performance_weight, difficulty_weight, required_scale = weights
+
+        items = [
+            {"factor": f"{TERM_SOURCES[source][0]}: {term}", "need": terms[term], "score": weight}
+            for term, source, weight in hits
+        ]
+        attribute_items = [
+            (f"性能: {info.get('performance', '待定')}", performance_weight * performance[position]),
+            (f"上手难度: {info.get('difficulty', '待定')}", difficulty_weight * difficulty[position]),
+            (
+                f"规模不足: {info.get('scale', '待定')}",
+                -SCALE_PENALTY * max(0, required_scale - scale[position]),
+            ),
+        ]
+        if default == position:
+            attribute_items.append(("通用场景首选", DEFAULT_BONUS))
+        items.extend(
+            {"factor": factor, "score": score} for factor, score in attribute_items if score
+        )
+        items.sort(key=lambda item: -abs(item["score"]))
+        return items
+
+
+def parse_middleware_catalog(
+    data: dict, source: str = ""
+) -> Tuple[Dict, Dict, List[Dict]]:
+    """解析中间件目录，返回 (特性矩阵, 各类别首选, 组件协同)
+
+    目录格式: {"defaults": {类别: 首选}, "categories": {类别: {标识: 特性}}, "pairs": [...]}，
+    首选为产品标识，或按需求规模区分的 {"small"/"medium"/"large": 标识}；
+    特性包括 name、strengths、weaknesses、use_cases、scale、performance、difficulty、auxiliary
+    （为 true 时只用于对比，不参与推荐），以及容量模拟使用的 profile（qps_per_node、p99_ms、
+    memory_gb、storage_gb、replicas、min_nodes、max_nodes）；
+    pairs 中每项为 {"items": ["类别:标识", "类别:标识"], "score": 协同得分, "reason": 说明}，
+    负分表示两者不宜同时选用。
+    """
+    categories = data.get("categories") if isinstance(data, dict) else None
+    if not isinstance(categories, dict) or not all(
+        isinstance(products, dict) for products in categories.values()
+    ):
+        raise ValueError(f"中间件目录格式错误，缺少 categories: {source}")
+    pairs = data.get("pairs", [])
+    if not isinstance(pairs, list):
+        raise ValueError(f"中间件目录格式错误，pairs 应为列表: {source}")
+    return categories, data.get("defaults", {}), pairs
+
+
+def load_middleware_index(
+    catalog: str = DEFAULT_CATALOG, cache_dir: str = DEFAULT_CACHE_DIR
+) -> MiddlewareIndex:
+    """读取中间件目录并建立索引，编译结果按目录内容哈希缓存到 cache_dir
+
+    cache_dir 为空时不使用缓存。
+    """
+    with open(catalog, "rb") as f:
+        content = f.read()
+    digest = hashlib.sha256()
+    digest.update(f"{INDEX_CACHE_VERSION}:{sys.version_info[:2]}".encode())
+    # 打分表参与索引计算，变化时缓存随之失效
+    scoring = (TERM_SOURCES, PERFORMANCE_POINTS, DIFFICULTY_POINTS, SCALE_KEYWORDS)
+    digest.update(repr(scoring).encode("utf-8"))
+    digest.update(content)
+    fingerprint = digest.hexdigest()
+
+    cache_file = None
+    if cache_dir:
+        cache_file = Path(cache_dir) / f"middleware-index-{fingerprint[:16]}.pickle"
+        try:
+            with open(cache_file, "rb") as f:
+                return MiddlewareIndex.from_compiled(pickle.load(f))
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            pass
+
+    matrix, defaults, pairs = parse_middleware_catalog(
+        json.loads(content.decode("utf-8")), catalog
+    )
+    index = MiddlewareIndex(matrix, defaults, pairs)
+    index.fingerprint = fingerprint
+
+    if cache_file is not None:
+        # 先写临时文件再替换，避免并发进程读到写了一半的缓存
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_file, "wb") as f:
+            pickle.dump(index.dump_compiled(), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+
+    return index
+
+
+_default_index: Optional[MiddlewareIndex] = None
+
+
+def configure_middleware_index(catalog: str = None, cache_dir: str = DEFAULT_CACHE_DIR):
+    """设置默认索引使用的目录文件（缺省为内置目录）"""
+    global _default_index
+    _default_index = load_middleware_index(catalog or DEFAULT_CATALOG, cache_dir)
+
+
+def get_middleware_index() -> MiddlewareIndex:
+    """获取默认索引（未配置时基于内置目录，首次调用时加载）"""
+    global _default_index
+    if _default_index is None:
+        _default_index = load_middleware_index(DEFAULT_CATALOG)
+    return _default_index
+
+
+def recommendation_reason(candidate: Dict) -> str:
+    """由得分明细中的加分项生成推荐理由"""
+    reasons = [item["factor"] for item in candidate["breakdown"] if item["score"] > 0]
+    return "；".join(reasons[:3]) if reasons else "综合得分最高"
+
+
+def candidate_conflicts(candidate: Dict) -> List[str]:
+    """候选不能被推荐的原因：劣势命中了需求开关（如要求事务时的“事务限制”），以及容量模拟
+    判定的负载不足"""
+    reasons = [
+        f"{item['factor']}（{item['need']}）"
+        for item in candidate["breakdown"]
+        if item["score"] < 0 and item.get("need") in FEATURE_TERMS
+    ]
+    sizing = candidate.get("sizing")
+    if sizing and not sizing["feasible"]:
+        reasons.extend(sizing["rejections"])
+    return reasons
+
+
+def _recommendation(candidate: Optional[Dict]) -> Dict:
+    if candidate is None:
+        return {"type": None, "reason": NO_CANDIDATE_REASON, "score": None, "breakdown": []}
+    return {
+        "type": candidate["type"],
+        "reason": recommendation_reason(candidate),
+        "score": candidate["score"],
+        "breakdown": candidate["breakdown"],
+    }
 
 
-def select_search(requirements: dict) -> Dict:
-    """根据需求选择搜索引擎"""
-    need_fulltext = requirements.get("need_fulltext", False)
-    need_log_analysis = requirements.get("need_log_analysis", False)
+def select_middleware(category: str, requirements: dict) -> Dict:
+    """为一个类别选出得分最高、且与需求没有冲突的中间件；没有这样的候选时 type 为 None"""
+    index = get_middleware_index()
+    if category not in index.keys:
+        raise KeyError(f"未知的中间件类别: {category}")
+    ranking = index.rank(category, requirements)
+    return _recommendation(next((c for c in ranking if not candidate_conflicts(c)), None))
 
-    if need_log_analysis:
-        return {"type": "elasticsearch", "reason": "ELK生态完善，适合日志分析"}
 
-    if need_fulltext:
-        return {"type": "elasticsearch", "reason": "全文检索能力强，生态完善"}
+def select_database(requirements: dict) -> Dict:
+    """根据需求选择数据库"""
+    return select_middleware("database", requirements)
 
-    return {"type": "elasticsearch", "reason": "通用搜索场景"}
 
+def select_mq(requirements: dict) -> Dict:
+    """根据需求选择消息队列"""
+    return select_middleware("mq", requirements)
 
-def select_gateway(requirements: dict) -> Dict:
-    """根据需求选择网关"""
-    scale = requirements.get("scale", "medium")
-    need_plugins = requirements.get("need_plugins", False)
 
-    # 大规模或需要丰富插件
-    if scale == "large" or need_plugins:
-        return {"type": "kong", "reason": "插件丰富，社区活跃"}
+def select_cache(requirements: dict) -> Dict:
+    """根据需求选择缓存"""
+    return select_middleware("cache", requirements)
 
-    # 国产优先或追求高性能
-    return {"type": "apisix", "reason": "高性能，动态配置能力强"}
 
+def select_search(requirements: dict) -> Dict:
+    """根据需求选择搜索引擎"""
+    return select_middleware("search", requirements)
 
-def generate_recommendation(requirements: dict):
-    """生成中间件选型推荐"""
-
-    recommendations = {
-        "database": select_database(requirements),
-        "mq": select_mq(requirements),
-        "cache": select_cache(requirements),
-        "search": select_search(requirements),
-        "gateway": select_gateway(requirements),
-    }
 
-    # 生成报告
+def select_gateway(requirements: dict) -> Dict:
+    """根据需求选择网关"""
+    return select_middleware("gateway", requirements)
+
+
+def _format_breakdown(breakdown: List[Dict]) -> str:
+    return "，".join(f"{item['factor']} {item['score']:+g}" for item in breakdown)
+
+
+def size_ranking(
+    index: MiddlewareIndex, category: str, ranking: List[Dict], targets: Dict[str, float]
+) -> List[Dict]:
+    """为排序中的每个候选模拟目标负载下的容量，结果记入候选的 sizing（无 profile 时为 None）"""
+    share = LOAD_SHARES.get(category, DEFAULT_LOAD_SHARE)
+    for candidate in ranking:
+        profile = index.product(category, candidate["type"]).get("profile") or {}
+        candidate["sizing"] = size_candidate(profile, targets, share)
+    return ranking
+
+
+def recommend_middleware(requirements: dict, index: Optional[MiddlewareIndex] = None) -> Dict:
+    """每个类别的全部候选按需求打分排序，取得分最高者，返回 {类别: 推荐结果}
+
+    劣势命中需求开关的候选不予推荐；需求给出目标 QPS 或数据量时，容量模拟判定无法满足负载的
+    候选同样不予推荐，推荐结果附带所需节点数与余量。这些候选及原因记入 rejected；没有候选
+    满足要求时 type 为 None，不会退而推荐不满足要求的候选。
+    """
+    index = index or get_middleware_index()
+    targets = load_targets(requirements)
+    limit = None if targets else 3
+    rankings = index.recommend(requirements, limit=limit)
+    recommendations = {}
+    for category, ranking in rankings.items():
+        if not ranking:
+            continue
+        # 前几名都与需求冲突时再看全部候选
+        if limit and all(candidate_conflicts(c) for c in ranking):
+            ranking = index.rank(category, requirements)
+        if targets:
+            size_ranking(index, category, ranking, targets)
+
+        qualified, rejected = [], []
+        for candidate in ranking:
+            reasons = candidate_conflicts(candidate)
+            if not reasons:
+                qualified.append(candidate)
+                continue
+            entry = {
+                "type": candidate["type"],
+                "name": candidate["name"],
+                "score": candidate["score"],
+                "reasons": reasons,
+            }
+            if targets:
+                entry["sizing"] = candidate["sizing"]
+            rejected.append(entry)
+        qualified = qualified[:3]
+
+        recommendation = _recommendation(qualified[0] if qualified else None)
+        recommendation["ranking"] = [
+            {"type": c["type"], "name": c["name"], "score": c["score"]} for c in qualified
+        ]
+        if targets:
+            recommendation["sizing"] = qualified[0]["sizing"] if qualified else None
+            for entry, candidate in zip(recommendation["ranking"], qualified):
+                entry["sizing"] = candidate["sizing"]
+        if targets or rejected:
+            recommendation["rejected"] = rejected
+        recommendations[category] = recommendation
+    return recommendations
+
+
+def format_recommendation_report(
+    recommendations: Dict,
+    index: Optional[MiddlewareIndex] = None,
+    targets: Optional[Dict[str, float]] = None,
+) -> str:
+    """生成中间件选型推荐报告，传入 targets（load_targets 的结果）时说明目标负载"""
+    index = index or get_middleware_index()
     report = []
     report.append("# 中间件选型推荐报告\n\n")
+    if targets:
+        report.append(f"**目标负载**: {format_targets(targets)}\n\n")
 
     report.append("## 推荐方案\n\n")
     for category, rec in recommendations.items():
-        mw_info = MIDDLEWARE_MATRIX.get(category, {}).get(rec["type"], {})
         report.append(f"### {category.upper()}\n")
+        if rec["type"] is None:
+            report.append(f"- **推荐选择**: 无（{rec['reason']}）\n")
+            for candidate in rec.get("rejected", []):
+                reasons = "；".join(candidate["reasons"])
+                report.append(f"- **{candidate['name']}**: {reasons}\n")
+            report.append("\n")
+            continue
+        mw_info = index.product(category, rec["type"])
         report.append(f"- **推荐选择**: {mw_info.get('name', rec['type'])}\n")
         report.append(f"- **推荐理由**: {rec['reason']}\n")
+        report.append(f"- **匹配得分**: {rec['score']:g}（{_format_breakdown(rec['breakdown'])}）\n")
         if mw_info:
             report.append(f"- **适用规模**: {mw_info.get('scale', '待定')}\n")
             report.append(f"- **性能评级**: {mw_info.get('performance', '待定')}\n")
             report.append(f"- **上手难度**: {mw_info.get('difficulty', '待定')}\n")
+        if rec.get("sizing"):
+            report.append(f"- **容量估算**: {format_sizing(rec['sizing'])}\n")
         report.append("\n")
 
     report.append("## 备选方案\n\n")
     for category, rec in recommendations.items():
-        mw_info = MIDDLEWARE_MATRIX.get(category, {}).get(rec["type"], {})
-        alternatives = []
-        for key, info in MIDDLEWARE_MATRIX.get(category, {}).items():
-            if key != rec["type"]:
-                alternatives.append(info.get("name", key))
+        alternatives = [f"{c['name']}（{c['score']:g}）" for c in rec["ranking"][1:]]
         if alternatives:
-            report.append(
-                f"- **{category.upper()}备选**: {', '.join(alternatives[:2])}\n"
+            report.append(f"- **{category.upper()}备选**: {', '.join(alternatives)}\n")
+        excluded = [
+            f"{c['name']}（{'；'.join(c['reasons'])}）"
+            for c in rec.get("rejected", [])
+            if rec["type"] is not None
+        ]
+        if excluded:
+            report.append(f"- **{category.upper()}排除**: {', '.join(excluded)}\n")
+
+    if targets:
+        report.append("\n## 容量模拟\n\n")
+        for category, rec in recommendations.items():
+            lines = []
+            for candidate in rec["ranking"]:
+                sizing = candidate.get("sizing")
+                if sizing:
+                    lines.append(f"- **{candidate['name']}**: {format_sizing(sizing)}\n")
+            for candidate in rec.get("rejected", []):
+                sizing = candidate.get("sizing")
+                if sizing and not sizing["feasible"]:
+                    shortfall = "；".join(sizing["rejections"])
+                    lines.append(
+                        f"- **{candidate['name']}**: {format_sizing(sizing)}；不满足: {shortfall}\n"
+                    )
+            if lines:
+                report.append(f"### {category.upper()}\n")
+                report.extend(lines)
+                report.append("\n")
+
+    return "".join(report)
+
+
+def generate_recommendation(requirements: dict):
+    """生成中间件选型推荐，返回 (推荐结果, Markdown 报告)"""
+    recommendations = recommend_middleware(requirements)
+    return recommendations, format_recommendation_report(
+        recommendations, targets=load_targets(requirements)
+    )
+
+
+def select_batch_item(item: Tuple[str, str, str], reports_dir: Optional[str] = None) -> Dict:
+    """为单个批量条目选型（传入 reports_dir 时写出该条目的报告），返回汇总记录"""
+    name, kind, payload = item
+    try:
+        if kind == "file":
+            with open(payload, "r", encoding="utf-8") as f:
+                requirements = json.load(f)
+        else:
+            requirements = json.loads(payload)
+        recommendations = recommend_middleware(requirements)
+        if reports_dir:
+            output = os.path.join(reports_dir, f"{name}.md")
+            report = format_recommendation_report(
+                recommendations, targets=load_targets(requirements)
             )
+            write_if_changed(output, report.encode("utf-8"))
+    except (OSError, ValueError, AttributeError) as e:
+        return {"name": name, "error": str(e)}
+
+    return {
+        "name": name,
+        "requirement": requirements.get("name", "未命名"),
+        "recommendations": {
+            category: {"type": rec["type"], "score": rec["score"], "reason": rec["reason"]}
+            for category, rec in recommendations.items()
+        },
+    }
+
 
-    return recommendations, "".join(report)
+def _select_batch_chunk(args: Tuple[List[Tuple[str, str, str]], Optional[str]]) -> List[Dict]:
+    """进程池任务：为一组条目选型（每个进程只建立一次索引）"""
+    items, reports_dir = args
+    return [select_batch_item(item, reports_dir) for item in items]
+
+
+def select_batch(
+    source: str,
+    reports_dir: Optional[str] = None,
+    workers: int = 0,
+    catalog: str = None,
+    cache_dir: str = DEFAULT_CACHE_DIR,
+) -> List[Dict]:
+    """批量选型，返回与输入顺序一致的汇总记录列表"""
+    configure_middleware_index(catalog, cache_dir)
+    if reports_dir:
+        os.makedirs(reports_dir, exist_ok=True)
+    items = list(iter_batch_items(source))
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(items) <= 1:
+        return [select_batch_item(item, reports_dir) for item in items]
+
+    # 按块分发，减少进程间通信次数
+    chunk_size = max(1, len(items) // (workers * 4))
+    chunks = [(items[i : i + chunk_size], reports_dir) for i in range(0, len(items), chunk_size)]
+    results = []
+    # 工作进程从磁盘缓存加载编译好的索引
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=configure_middleware_index,
+        initargs=(catalog, cache_dir),
+    ) as executor:
+        for chunk_result in executor.map(_select_batch_chunk, chunks):
+            results.extend(chunk_result)
+    return results
+
+
+def write_batch_csv(results: List[Dict], stream: TextIO):
+    """每个条目一行：各类别的推荐与得分，失败的条目记录错误信息"""
+    categories = get_middleware_index().categories
+    writer = csv.writer(stream)
+    header = ["name", "requirement"]
+    for category in categories:
+        header.extend([category, f"{category}_score"])
+    writer.writerow(header + ["error"])
+    for result in results:
+        row = [result["name"], result.get("requirement", "")]
+        recommendations = result.get("recommendations", {})
+        for category in categories:
+            rec = recommendations.get(category, {})
+            row.extend([rec.get("type", ""), rec.get("score", "")])
+        writer.writerow(row + [result.get("error", "")])
 
 
 def main():
     parser = argparse.ArgumentParser(description="中间件智能选型")
-    parser.add_argument("--input", "-i", required=True, help="需求JSON文件路径")
-    parser.add_argument("--output", "-o", required=True, help="输出Markdown文件路径")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--input", "-i", help="需求JSON文件路径")
+    group.add_argument(
+        "--batch", "-b", help="批量输入：目录、glob模式、JSONL文件或 - （标准输入JSONL）"
+    )
+    parser.add_argument(
+        "--output",
+        "-o",
+        required=True,
+        help="输出Markdown文件路径（批量模式下为汇总文件，扩展名 .csv 输出CSV，否则输出JSON）",
+    )
+    parser.add_argument("--reports-dir", help="批量模式下逐条写出选型报告的目录")
+    parser.add_argument("--catalog", help="中间件目录JSON文件路径（缺省使用内置目录）")
+    parser.add_argument(
+        "--workers", "-w", type=int, default=0, help="批量模式的进程数（默认CPU核数）"
+    )
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="输出缓存目录")
+    parser.add_argument("--no-cache", action="store_true", help="禁用输出缓存，总是重新生成")
 
     args = parser.parse_args()
 
+    try:
+        configure_middleware_index(args.catalog, args.cache_dir)
+    except (OSError, ValueError) as e:
+        parser.error(f"无法加载中间件目录: {e}")
+
+    if args.batch:
+        results = select_batch(
+            args.batch, args.reports_dir, args.workers, args.catalog, args.cache_dir
+        )
+        if Path(args.output).suffix == ".csv":
+            buffer = io.StringIO(newline="")
+            write_batch_csv(results, buffer)
+            summary = buffer.getvalue()
+        else:
+            summary = json.dumps(results, ensure_ascii=False, indent=2)
+        write_if_changed(args.output, summary.encode("utf-8"))
+        failed = sum(1 for r in results if "error" in r)
+        print(f"批量选型完成: {len(results)} 条，失败 {failed} 条，汇总: {args.output}")
+        return
+
     # 读取需求
     with open(args.input, "r", encoding="utf-8") as f:
         requirements = json.load(f)
 
-    # 生成推荐
-    recommendation_json, recommendation_report = generate_recommendation(requirements)
-
-    # 输出JSON（用于后续处理）
-    with open(args.output.replace(".md", ".json"), "w", encoding="utf-8") as f:
-        json.dump(recommendation_json, f, ensure_ascii=False, indent=2)
-
-    # 输出报告
-    with open(args.output, "w", encoding="utf-8") as f:
-        f.write(recommendation_report)
-
-    print(f"中间件选型报告已生成: {args.output}")
+    # 生成推荐：JSON（用于后续处理）与报告，输入未变化时复用缓存
+    def render() -> Dict[str, str]:
+        recommendation_json, recommendation_report = generate_recommendation(requirements)
+        return {
+            "json": json.dumps(recommendation_json, ensure_ascii=False, indent=2),
+            "md": recommendation_report,
+        }
+
+    cache = OutputCache(args.cache_dir, enabled=not args.no_cache)
+    fingerprint = get_middleware_index().fingerprint
+    version = file_version(
+        __file__, middleware_sizing.__file__, capacity_planner.__file__, output_cache.__file__
+    )
+    key = cache.key("middleware_selector", version, fingerprint, requirements)
+    status = cache.write_outputs(
+        key, {"json": args.output.replace(".md", ".json"), "md": args.output}, render
+    )
+
+    if status == "unchanged":
+        print(f"中间件选型报告已是最新，跳过生成: {args.output}")
+    else:
+        print(f"中间件选型报告已生成: {args.output}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+中间件容量模拟
+目录中每个产品的 profile 给出单节点的吞吐、P99 延迟、内存与可用存储，以及集群规模上限；
+按需求的目标 QPS 与数据量估算每个候选所需的节点数与余量，节点数超过上限或延迟超过响应时间
+目标的候选判为无法满足负载；支持分库分表的产品（profile 中 sharding 为 true）超过上限时
+按分片数给出建议，不判为无法满足
+"""
+
+import math
+from typing import Dict, Mapping, Optional, Tuple
+
+from capacity_planner import SIZE_UNITS, format_size, parse_duration, parse_nfr
+
+
+# 类别 -> (承担的请求 QPS 比例, 存放的数据量比例)，未列出的类别按 (1.0, 0.0) 计
+LOAD_SHARES: Dict[str, Tuple[float, float]] = {
+    "database": (1.0, 1.0),  # 缓存未命中的读与全部写，存放全部数据
+    "cache": (2.0, 0.2),  # 每个请求约两次缓存读写，只存放热点数据
+    "mq": (0.5, 0.1),  # 约半数请求产生消息，保留期内的消息
+    "search": (0.2, 1.0),  # 搜索类请求，全量建索引
+    "gateway": (1.0, 0.0),  # 全部请求经过网关，无状态
+    "registry": (0.0, 0.0),  # 负载来自服务实例而不是用户请求，按最少节点部署
+}
+DEFAULT_LOAD_SHARE = (1.0, 0.0)
+
+
+def load_targets(requirements: dict) -> Optional[Dict[str, float]]:
+    """读取目标负载，返回 {qps, data_gb, response_ms, utilization}
+
+    qps、users、data_volume、response_time 可写在需求顶层或 non_functional 中（顶层优先），
+    解析规则与容量估算相同；数据量按一年后的规模计。既无 QPS 也无数据量时返回 None。
+    """
+    nfr = dict(requirements.get("non_functional") or {})
+    for key in ("qps", "users", "data_volume", "response_time"):
+        if requirements.get(key) is not None:
+            nfr[key] = requirements[key]
+    columns = parse_nfr(nfr)
+    data = columns["data_volume"] * (1 + columns["data_growth"]) + columns["data_per_year"]
+    if not columns["qps"] and not data:
+        return None
+    response_time = parse_duration(nfr.get("response_time"))
+    return {
+        "qps": columns["qps"],
+        "data_gb": data / SIZE_UNITS["g"],
+        "response_ms": response_time * 1000 if response_time else None,
+        "utilization": columns["target_utilization"],
+    }
+
+
+def size_candidate(
+    profile: Mapping, targets: Dict[str, float], share: Tuple[float, float] = DEFAULT_LOAD_SHARE
+) -> Optional[Dict]:
+    """估算一个候选承载目标负载所需的节点数与余量，profile 缺少单节点吞吐时返回 None
+
+    节点数取满足吞吐、满足存储（含副本）与高可用最少节点数三者的最大值，各项按目标利用率
+    预留突发余量；headroom 为按该节点数（不超过上限）部署时剩余容量的比例，负数表示过载。
+    shards 为可分片产品需要的分片（每片不超过 max_nodes 个节点）数。
+    """
+    qps_per_node = profile.get("qps_per_node")
+    if not qps_per_node:
+        return None
+    utilization = targets["utilization"]
+    qps = targets["qps"] * share[0]
+    storage = profile.get("storage_gb") or 0
+    data = targets["data_gb"] * share[1] * profile.get("replicas", 1) if storage else 0.0
+
+    # 至少部署 1 个节点，min_nodes 为 0 且没有负载时也不会按 0 个节点计算余量
+    nodes = max(
+        1,
+        profile.get("min_nodes", 1),
+        math.ceil(qps / (qps_per_node * utilization) - 1e-9),
+        math.ceil(data / (storage * utilization) - 1e-9) if data else 0,
+    )
+    max_nodes = profile.get("max_nodes")
+    sharding = bool(profile.get("sharding"))
+    shards = math.ceil(nodes / max_nodes) if max_nodes and sharding else 1
+    deployed = min(nodes, max_nodes) if max_nodes and not sharding else nodes
+    usage = max(qps / (deployed * qps_per_node), data / (deployed * storage) if data else 0.0)
+
+    rejections = []
+    if max_nodes and nodes > max_nodes and not sharding:
+        rejections.append(f"需要 {nodes} 个节点，超过集群上限 {max_nodes}")
+    p99 = profile.get("p99_ms")
+    if p99 and targets["response_ms"] and p99 > targets["response_ms"]:
+        rejections.append(f"P99 延迟 {p99:g}ms 超过响应时间目标 {targets['response_ms']:g}ms")
+
+    return {
+        "nodes": nodes,
+        "shards": shards,
+        "qps": round(qps),
+        "capacity_qps": deployed * qps_per_node,
+        "data_gb": round(data, 1),
+        "memory_gb": deployed * profile.get("memory_gb", 0),
+        "p99_ms": p99,
+        "headroom": round(1 - usage, 3),
+        "feasible": not rejections,
+        "rejections": rejections,
+    }
+
+
+def format_sizing(sizing: Dict) -> str:
+    """节点数、承载能力与余量的一行说明"""
+    parts = [f"承载 {sizing['capacity_qps']:.0f} QPS（目标 {sizing['qps']:.0f}）"]
+    if sizing["data_gb"]:
+        parts.append(f"数据 {format_size(sizing['data_gb'] * SIZE_UNITS['g'])}（含副本）")
+    if sizing["memory_gb"]:
+        parts.append(f"内存 {sizing['memory_gb']:g}GB")
+    if sizing["p99_ms"]:
+        parts.append(f"P99 {sizing['p99_ms']:g}ms")
+    parts.append(f"余量 {sizing['headroom']:.0%}")
+    nodes = f"{sizing['nodes']} 个节点"
+    if sizing["shards"] > 1:
+        nodes += f"（需分库分表，约 {sizing['shards']} 个分片）"
+    return f"{nodes}，" + "，".join(parts)
+
+
+def format_targets(targets: Dict[str, float]) -> str:
+    """目标负载的一行说明"""
+    parts = [f"QPS {targets['qps']:.0f}"]
+    if targets["data_gb"]:
+        parts.append(f"一年数据量 {format_size(targets['data_gb'] * SIZE_UNITS['g'])}")
+    if targets["response_ms"]:
+        parts.append(f"响应时间 {targets['response_ms']:g}ms")
+    parts.append(f"目标利用率 {targets['utilization']:.0%}")
+    return "，".join(parts)
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+模块依赖图
+把 architecture["modules"] 中的依赖关系解析为邻接表，以 O(V+E) 完成循环依赖检测
+（Tarjan 强连通分量）与分层，并生成 Mermaid 架构图
+"""
+
+import re
+import sys
+import json
+import argparse
+from typing import Dict, Iterable, List
+
+
+# 依赖字段为字符串时的分隔符；空格与斜杠属于模块名（如 "User Service"、"auth/session"）
+DEPENDENCY_SEPARATORS = re.compile(r"[,，、;；|]+")
+
+# 表示“没有依赖”的写法
+NO_DEPENDENCY = frozenset(["", "无", "none", "None", "-", "待定"])
+
+
+def parse_dependencies(value) -> List[str]:
+    """把依赖字段（列表或分隔符分隔的字符串）解析为模块名列表"""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        items = DEPENDENCY_SEPARATORS.split(value)
+    elif isinstance(value, (list, tuple)):
+        items = [item.get("name", "") if isinstance(item, dict) else str(item) for item in value]
+    else:
+        items = [str(value)]
+    return [item.strip() for item in items if item.strip() not in NO_DEPENDENCY]
+
+
+class ModuleGraph:
+    """模块依赖图，边从模块指向其依赖"""
+
+    def __init__(self, modules: Iterable[dict]):
+        self.names: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.adjacency: List[List[int]] = []
+        self.external: List[bool] = []  # 只出现在依赖中、未在 modules 中定义的节点
+
+        dependencies = []
+        for module in modules:
+            node = self._node(str(module.get("name", f"模块{len(self.names) + 1}")))
+            self.external[node] = False
+            dependencies.append((node, parse_dependencies(module.get("dependencies"))))
+
+        for node, names in dependencies:
+            targets = self.adjacency[node]
+            seen = set(targets)
+            for name in names:
+                target = self._node(name, external=True)
+                if target not in seen:
+                    seen.add(target)
+                    targets.append(target)
+
+        self.components = self._strongly_connected_components()
+
+    def _node(self, name: str, external: bool = False) -> int:
+        node = self.index.get(name)
+        if node is None:
+            node = self.index[name] = len(self.names)
+            self.names.append(name)
+            self.adjacency.append([])
+            self.external.append(external)
+        return node
+
+    @property
+    def edge_count(self) -> int:
+        return sum(len(targets) for targets in self.adjacency)
+
+    def _strongly_connected_components(self) -> List[int]:
+        """迭代版 Tarjan 算法，返回每个节点所属的分量编号
+
+        分量按逆拓扑序编号：依赖所在的分量编号总是小于依赖方（同一分量除外）。
+        """
+        count = len(self.names)
+        order = [-1] * count
+        low = [0] * count
+        component = [-1] * count
+        on_stack = [False] * count
+        stack = []
+        counter = 0
+        components = 0
+
+        for root in range(count):
+            if order[root] != -1:
+                continue
+            work = [(root, 0)]
+            order[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+            while work:
+                node, i = work[-1]
+                targets = self.adjacency[node]
+                if i < len(targets):
+                    work[-1] = (node, i + 1)
+                    target = targets[i]
+                    if order[target] == -1:
+                        order[target] = low[target] = counter
+                        counter += 1
+                        stack.append(target)
+                        on_stack[target] = True
+                        work.append((target, 0))
+                    elif on_stack[target]:
+                        low[node] = min(low[node], order[target])
+                    continue
+
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == order[node]:
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component[member] = components
+                        if member == node:
+                            break
+                    components += 1
+        return component
+
+    def cycles(self) -> List[List[str]]:
+        """返回所有循环依赖（节点数大于 1 的强连通分量及自依赖），按首次出现的顺序"""
+        members: Dict[int, List[int]] = {}
+        for node, comp in enumerate(self.components):
+            members.setdefault(comp, []).append(node)
+        result = []
+        for nodes in members.values():
+            if len(nodes) > 1 or nodes[0] in self.adjacency[nodes[0]]:
+                result.append([self.names[node] for node in nodes])
+        return result
+
+    def layers(self) -> List[int]:
+        """计算每个节点的层级：无依赖的模块为第 0 层，其余为其依赖的最高层级 + 1
+
+        同一循环依赖中的模块位于同一层。
+        """
+        # 分量编号即逆拓扑序，按编号递增处理时依赖分量已经计算完毕
+        component_count = max(self.components, default=-1) + 1
+        component_nodes: List[List[int]] = [[] for _ in range(component_count)]
+        for node, comp in enumerate(self.components):
+            component_nodes[comp].append(node)
+
+        component_layer = [0] * component_count
+        for comp, nodes in enumerate(component_nodes):
+            layer = 0
+            for node in nodes:
+                for target in self.adjacency[node]:
+                    target_comp = self.components[target]
+                    if target_comp != comp:
+                        layer = max(layer, component_layer[target_comp] + 1)
+            component_layer[comp] = layer
+        return [component_layer[comp] for comp in self.components]
+
+    def to_mermaid(self, direction: str = "TD") -> str:
+        """生成按层分组的 Mermaid 流程图，循环依赖中的节点与边高亮显示"""
+        layers = self.layers()
+        by_layer: Dict[int, List[int]] = {}
+        for node, layer in enumerate(layers):
+            by_layer.setdefault(layer, []).append(node)
+
+        cyclic = [False] * len(self.names)
+        for node, targets in enumerate(self.adjacency):
+            for target in targets:
+                if self.components[target] == self.components[node]:
+                    cyclic[node] = True
+
+        lines = [f"graph {direction}\n"]
+        for layer in sorted(by_layer, reverse=True):
+            lines.append(f'    subgraph L{layer}["第{layer}层"]\n')
+            for node in by_layer[layer]:
+                label = self.names[node].replace('"', "#quot;")
+                shape = f'(["{label}"])' if self.external[node] else f'["{label}"]'
+                lines.append(f"        n{node}{shape}\n")
+            lines.append("    end\n")
+
+        cycle_edges = []
+        edge = 0
+        for node, targets in enumerate(self.adjacency):
+            for target in targets:
+                lines.append(f"    n{node} --> n{target}\n")
+                if self.components[target] == self.components[node]:
+                    cycle_edges.append(str(edge))
+                edge += 1
+
+        cyclic_nodes = [f"n{node}" for node, flag in enumerate(cyclic) if flag]
+        if cyclic_nodes:
+            lines.append("    classDef cycle fill:#fdd,stroke:#c00\n")
+            lines.append(f"    class {','.join(cyclic_nodes)} cycle\n")
+            lines.append(f"    linkStyle {','.join(cycle_edges)} stroke:#c00\n")
+        return "".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="由模块依赖生成 Mermaid 架构图")
+    parser.add_argument("--architecture", "-a", required=True, help="架构决策JSON文件路径")
+    parser.add_argument("--output", "-o", help="输出文件路径（缺省输出到标准输出）")
+    parser.add_argument(
+        "--direction", default="TD", choices=["TD", "LR", "BT", "RL"], help="布局方向"
+    )
+
+    args = parser.parse_args()
+
+    with open(args.architecture, "r", encoding="utf-8") as f:
+        architecture = json.load(f)
+
+    graph = ModuleGraph(architecture.get("modules", []))
+    diagram = graph.to_mermaid(args.direction)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(diagram)
+        print(
+            f"Mermaid 架构图已生成: {args.output}"
+            f"（{len(graph.names)} 个模块, {graph.edge_count} 条依赖）"
+        )
+    else:
+        sys.stdout.write(diagram)
+    for cycle in graph.cycles():
+        print(f"循环依赖: {'、'.join(cycle)}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+报告输出缓存
+以输入JSON的规范化哈希加生成器版本为键缓存渲染结果，输出已是最新时跳过渲染和写盘；
+缓存目录按总大小做 LRU 淘汰。另提供可复现的生成时间，使相同输入得到逐字节相同的报告
+"""
+
+import os
+import json
+import shutil
+import filecmp
+import hashlib
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, Optional, TextIO
+from pathlib import Path
+
+
+DEFAULT_CACHE_DIR = ".cache"
+
+# 输出缓存总大小上限，超过后按最近使用时间淘汰
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def canonical_hash(*parts) -> str:
+    """计算任意 JSON 兼容数据的规范化哈希（键排序、紧凑分隔）"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(
+            json.dumps(part, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        )
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def file_version(*paths: str) -> str:
+    """以脚本文件内容作为生成器版本，代码变化后缓存自动失效
+
+    应传入入口脚本及其导入的所有参与渲染的模块，任一文件变化都会得到新的版本。
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def parse_timestamp(value) -> datetime:
+    """解析 Unix 时间戳（秒）或 ISO 8601 格式的时间"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return datetime.fromtimestamp(value, timezone.utc)
+    text = str(value).strip()
+    if text.isdigit():
+        return datetime.fromtimestamp(int(text), timezone.utc)
+    return datetime.fromisoformat(text)
+
+
+def resolve_timestamp(*records: dict, fallback_paths: Iterable[str] = ()) -> Optional[datetime]:
+    """确定报告的生成时间
+
+    依次取输入中的 generated_at 字段、SOURCE_DATE_EPOCH 环境变量；都没有时，
+    若给出 fallback_paths 则取这些文件中最晚的修改时间，否则返回 None（表示使用当前时间）。
+    """
+    for record in records:
+        if isinstance(record, dict) and record.get("generated_at") not in (None, ""):
+            return parse_timestamp(record["generated_at"])
+    epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    if epoch:
+        return parse_timestamp(epoch)
+    mtimes = [os.path.getmtime(path) for path in fallback_paths]
+    if mtimes:
+        return datetime.fromtimestamp(int(max(mtimes)), timezone.utc)
+    return None
+
+
+class OutputCache:
+    """内容寻址的输出缓存"""
+
+    def __init__(
+        self,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        enabled: bool = True,
+    ):
+        self.enabled = enabled and bool(cache_dir)
+        self.root = Path(cache_dir or DEFAULT_CACHE_DIR) / "outputs"
+        self.max_bytes = max_bytes
+
+    def key(self, generator: str, version: str, *inputs) -> str:
+        """生成缓存键：生成器名 + 版本 + 输入"""
+        return canonical_hash(generator, version, *inputs)
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.out"
+
+    def get(self, key: str) -> Optional[bytes]:
+        """读取缓存的输出，未命中时返回 None"""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # 更新最近使用时间
+        except OSError:
+            return None
+        return data
+
+    def put(self, key: str, data: bytes):
+        """写入缓存并按需淘汰"""
+        if not self.enabled:
+            return
+        path = self._path(key)
+        os.makedirs(path.parent, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def put_file(self, key: str, source: str):
+        """按文件复制写入缓存，不把内容读入内存"""
+        if not self.enabled:
+            return
+        path = self._path(key)
+        os.makedirs(path.parent, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        """总大小超过上限时，从最久未使用的条目开始删除"""
+        entries = []
+        total = 0
+        for path in self.root.glob("*/*.out"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+
+    def write_outputs(
+        self, key: str, outputs: Dict[str, str], render: Callable[[], Dict[str, str]]
+    ) -> str:
+        """按缓存写出一组文件
+
+        outputs 为 {格式: 输出路径}，render 返回 {格式: 文本}，仅在缓存未命中时调用一次。
+        返回 "unchanged"（输出已是最新，未写盘）、"cached"（缓存命中）或 "rendered"（重新渲染）。
+        """
+        contents = {fmt: self.get(f"{key}-{fmt}") for fmt in outputs}
+        status = "cached"
+        if any(data is None for data in contents.values()):
+            rendered = render()
+            contents = {fmt: rendered[fmt].encode("utf-8") for fmt in outputs}
+            for fmt, data in contents.items():
+                self.put(f"{key}-{fmt}", data)
+            status = "rendered"
+
+        written = False
+        for fmt, output in outputs.items():
+            written |= write_if_changed(output, contents[fmt])
+        if status == "cached" and not written:
+            return "unchanged"
+        return status
+
+    def write_output(self, key: str, output: str, render: Callable[[], str]) -> str:
+        """按缓存写出单个文件，返回值同 write_outputs"""
+        return self.write_outputs(key, {"out": output}, lambda: {"out": render()})
+
+    def write_stream(self, key: str, output: str, render: Callable[[TextIO], None]) -> str:
+        """按缓存流式写出单个文件，返回值同 write_outputs
+
+        render 把文本逐段写入给定的文件对象，仅在缓存未命中时调用；渲染结果先写入输出旁的
+        临时文件，与现有文件逐块比较后再替换，缓存的读写也按文件复制，全程不在内存中拼接全文。
+        与 write_output 使用相同的缓存条目。
+        """
+        cached = self._path(f"{key}-out")
+        if self.enabled and cached.exists():
+            os.utime(cached)  # 更新最近使用时间
+            if os.path.exists(output) and filecmp.cmp(cached, output, shallow=False):
+                return "unchanged"
+            status = "cached"
+        else:
+            status = "rendered"
+
+        tmp_output = f"{output}.{os.getpid()}.tmp"
+        try:
+            if status == "cached":
+                shutil.copyfile(cached, tmp_output)
+            else:
+                with open(tmp_output, "w", encoding="utf-8") as f:
+                    render(f)
+                self.put_file(f"{key}-out", tmp_output)
+            # 内容与现有文件相同时保留原文件，不改变其修改时间
+            if os.path.exists(output) and filecmp.cmp(tmp_output, output, shallow=False):
+                os.remove(tmp_output)
+            else:
+                os.replace(tmp_output, output)
+        except BaseException:
+            if os.path.exists(tmp_output):
+                os.remove(tmp_output)
+            raise
+        return status
+
+
+def write_if_changed(output: str, data: bytes) -> bool:
+    """内容不同时才原子地写入文件，返回是否写入"""
+    try:
+        if os.path.getsize(output) == len(data):
+            with open(output, "rb") as f:
+                if f.read() == data:
+                    return False
+    except OSError:
+        pass
+
+    tmp_output = f"{output}.{os.getpid()}.tmp"
+    with open(tmp_output, "wb") as f:
+        f.write(data)
+    os.replace(tmp_output, output)
+    return True
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+中间件整体选型
+逐类别独立选型可能选出彼此冲突的组合，也不考虑整体运维负担。这里把数据库、消息队列、缓存、
+搜索、网关作为一个组合求解：目标为各组件匹配得分与组件间协同得分（目录中的 pairs）之和，
+约束为单个组件的上手难度上限、整体难度预算和必须具备的特性，团队熟悉的产品加分且按低难度计。
+分支定界搜索，得分上界不超过当前最优、难度预算或必备特性已无法满足的分支直接剪掉
+"""
+
+import json
+import argparse
+from typing import Dict, Iterable, List, Optional, Tuple
+from pathlib import Path
+
+from middleware_selector import (
+    MiddlewareIndex,
+    candidate_conflicts,
+    configure_middleware_index,
+    get_middleware_index,
+    requirement_terms,
+    requirement_weights,
+)
+from middleware_sizing import DEFAULT_LOAD_SHARE, LOAD_SHARES, load_targets, size_candidate
+from output_cache import DEFAULT_CACHE_DIR, write_if_changed
+
+
+# 参与整体选型的类别
+STACK_CATEGORIES = ("database", "mq", "cache", "search", "gateway")
+
+# 上手难度 -> 计入难度预算的等级
+DIFFICULTY_LEVELS = {"低": 1, "中": 2, "高": 3}
+
+# 团队熟悉的产品的加分
+FAMILIARITY_BONUS = 1.5
+
+
+def stack_constraints(requirements: dict) -> Dict:
+    """读取需求中的 constraints：max_difficulty、difficulty_budget、required_features、familiar"""
+    constraints = requirements.get("constraints", {})
+    return {
+        "max_difficulty": constraints.get("max_difficulty"),
+        "difficulty_budget": constraints.get("difficulty_budget"),
+        "required_features": list(constraints.get("required_features", [])),
+        "familiar": list(constraints.get("familiar", [])),
+    }
+
+
+def _pareto_options(
+    index: MiddlewareIndex, category: str, options: List[Tuple], selected: set
+) -> List[Tuple]:
+    """去掉被支配的可选项
+
+    与组合内其他类别没有协同关系的可选项之间可以直接比较：得分不低、难度不高、覆盖的必备特性
+    不少的一方更优；只有负协同的可选项同样可以被它们支配。大目录中这类同质候选很多，先行去掉
+    能显著缩小搜索空间。
+    """
+
+    def pair_scores(position: int) -> List[float]:
+        return [
+            score
+            for other, _, score, _ in index.pairs.get((category, position), ())
+            if other in selected
+        ]
+
+    kept = []
+    dominators = []  # 已保留的无协同可选项: (难度等级, 特性位图)，得分均不低于后续可选项
+    for option in sorted(options, key=lambda option: (-option[0], option[2])):
+        _, position, level, mask, _ = option
+        pairs = pair_scores(position)
+        if not any(pair > 0 for pair in pairs) and any(
+            level >= other_level and other_mask | mask == other_mask
+            for other_level, other_mask in dominators
+        ):
+            continue
+        kept.append(option)
+        if not pairs:
+            dominators.append((level, mask))
+    return kept
+
+
+def optimize_stack(
+    requirements: dict,
+    categories: Iterable[str] = STACK_CATEGORIES,
+    max_difficulty: Optional[str] = None,
+    difficulty_budget: Optional[int] = None,
+    required_features: Iterable[str] = (),
+    familiar: Iterable[str] = (),
+    index: Optional[MiddlewareIndex] = None,
+) -> Optional[Dict]:
+    """求解得分最高的整套组合，没有满足约束的组合时返回 None
+
+    required_features 中的每个特性须出现在某个选中组件的优势或适用场景中；familiar 为团队熟悉的
+    产品标识或名称（不区分大小写）。与 recommend_middleware 一致，劣势命中需求开关的产品（如要求
+    事务时的 MongoDB）不参与组合；需求给出目标 QPS 或数据量时，容量模拟判定无法满足负载的产品
+    同样不参与。
+    """
+    index = index or get_middleware_index()
+    categories = list(categories)
+    unknown = [category for category in categories if category not in index.keys]
+    if unknown:
+        raise KeyError(f"未知的中间件类别: {', '.join(unknown)}")
+    if max_difficulty is not None and max_difficulty not in DIFFICULTY_LEVELS:
+        raise ValueError(f"未知的难度: {max_difficulty}，可选: {'、'.join(DIFFICULTY_LEVELS)}")
+    cap = DIFFICULTY_LEVELS.get(max_difficulty, max(DIFFICULTY_LEVELS.values()))
+    budget = float("inf") if difficulty_budget is None else difficulty_budget
+
+    required = list(dict.fromkeys(required_features))
+    bits = {feature: 1 << i for i, feature in enumerate(required)}
+    full_mask = (1 << len(required)) - 1
+    familiar_names = {name.lower() for name in familiar}
+    terms = requirement_terms(requirements)
+    weights = requirement_weights(requirements)
+    targets = load_targets(requirements)
+
+    # 每个类别的可选项: (得分, 序号, 难度等级, 特性位图, 是否熟悉)
+    levels: List[Tuple[str, List[Tuple[float, int, int, int, bool]]]] = []
+    for category in categories:
+        scores, hits = index.score(category, terms, weights)
+        options = []
+        for position in index.candidates[category]:
+            info = index.info[category][position]
+            key = index.keys[category][position]
+            known = key.lower() in familiar_names or info.get("name", "").lower() in familiar_names
+            level = 1 if known else DIFFICULTY_LEVELS.get(info.get("difficulty"), 2)
+            if level > cap:
+                continue
+            # 与 recommend_middleware 相同：劣势命中需求开关或无法承载目标负载的候选不参与组合
+            candidate = {
+                "breakdown": index._breakdown(
+                    category, position, hits.get(position, []), terms, weights
+                )
+            }
+            if targets:
+                share = LOAD_SHARES.get(category, DEFAULT_LOAD_SHARE)
+                candidate["sizing"] = size_candidate(info.get("profile") or {}, targets, share)
+            if candidate_conflicts(candidate):
+                continue
+            mask = 0
+            for term in (*info.get("strengths", ()), *info.get("use_cases", ())):
+                mask |= bits.get(term, 0)
+            score = scores[position] + (FAMILIARITY_BONUS if known else 0.0)
+            options.append((score, position, level, mask, known))
+        if not options:
+            return None
+        levels.append((category, _pareto_options(index, category, options, set(categories))))
+
+    # 可选项少的类别先搜索，分支更早收窄
+    levels.sort(key=lambda level: len(level[1]))
+    depth_count = len(levels)
+    depth_of = {category: depth for depth, (category, _) in enumerate(levels)}
+
+    def earlier_pairs(depth: int, position: int) -> Dict[int, Tuple[Dict[int, float], float]]:
+        """协同得分归到搜索顺序靠后的一端: {更早的层级: ({对方序号: 协同得分}, 最大正协同得分)}"""
+        partners: Dict[int, Dict[int, float]] = {}
+        for other, other_position, score, _ in index.pairs.get((levels[depth][0], position), ()):
+            other_depth = depth_of.get(other, depth_count)
+            if other_depth < depth:
+                by_position = partners.setdefault(other_depth, {})
+                by_position[other_position] = by_position.get(other_position, 0.0) + score
+        return {
+            other_depth: (by_position, max(0.0, *by_position.values()))
+            for other_depth, by_position in partners.items()
+        }
+
+    # 可选项附上“得分 + 协同上界”并按其降序:
+    # (上界, 得分, 序号, 难度等级, 特性位图, 是否熟悉, 与更早层级的协同)
+    ranked_levels = []
+    pairless_best = []  # 每层没有协同关系的可选项的最高得分
+    paired = []  # 每层有协同关系的可选项: [(得分, 与更早层级的协同)]
+    for depth, (category, options) in enumerate(levels):
+        ranked = []
+        for option in options:
+            partners = earlier_pairs(depth, option[1])
+            upper = option[0] + sum(top for _, top in partners.values())
+            ranked.append((upper, *option, partners))
+        ranked.sort(key=lambda option: -option[0])
+        ranked_levels.append((category, ranked))
+        pairless_best.append(
+            max((option[1] for option in ranked if not option[6]), default=float("-inf"))
+        )
+        paired.append([(option[1], option[6]) for option in ranked if option[6]])
+
+    # 从第 depth 层到最后一层的：上界之和、最低难度之和、特性位图并集
+    bound_rest = [0.0] * (depth_count + 1)
+    level_rest = [0] * (depth_count + 1)
+    mask_rest = [0] * (depth_count + 1)
+    for depth in range(depth_count - 1, -1, -1):
+        _, options = ranked_levels[depth]
+        bound_rest[depth] = bound_rest[depth + 1] + options[0][0]
+        level_rest[depth] = level_rest[depth + 1] + min(option[3] for option in options)
+        mask = 0
+        for option in options:
+            mask |= option[4]
+        mask_rest[depth] = mask_rest[depth + 1] | mask
+
+    chosen: List[Tuple] = [None] * depth_count
+    positions = [-1] * depth_count
+    best = {"score": float("-inf"), "choice": None}
+    explored = 0
+
+    def child_bounds(depth: int) -> Tuple[float, Dict[int, float]]:
+        """第 depth 层之后各层的得分上界：与已选组件的协同按实际值，与未选组件的按最大正协同
+
+        返回 (与第 depth 层选择无关的部分, {第 depth 层可选项序号: 因正协同增加的上界})，
+        每个节点计算一次，各可选项只需再加上自己的增量。
+        """
+        fixed = 0.0
+        extra: Dict[int, float] = {}
+        for later in range(depth + 1, depth_count):
+            level_best = pairless_best[later]
+            boosts: Dict[int, float] = {}
+            for option_score, partners in paired[later]:
+                upper = option_score
+                for other_depth, (by_position, top) in partners.items():
+                    if other_depth < depth:
+                        upper += by_position.get(positions[other_depth], 0.0)
+                    elif other_depth > depth:
+                        upper += top
+                if upper > level_best:
+                    level_best = upper
+                if depth in partners:
+                    for position, pair_score in partners[depth][0].items():
+                        if pair_score > 0 and upper + pair_score > boosts.get(position, upper):
+                            boosts[position] = upper + pair_score
+            fixed += level_best
+            for position, value in boosts.items():
+                if value > level_best:
+                    extra[position] = extra.get(position, 0.0) + value - level_best
+        return fixed, extra
+
+    def search(depth: int, score: float, difficulty: int, mask: int):
+        nonlocal explored
+        explored += 1
+        if depth == depth_count:
+            if mask == full_mask and score > best["score"]:
+                best["score"] = score
+                best["choice"] = list(chosen)
+            return
+        if mask | mask_rest[depth] != full_mask:
+            return
+        if difficulty + level_rest[depth] > budget:
+            return
+
+        _, options = ranked_levels[depth]
+        bounds = None
+        for option in options:
+            upper, option_score, position, level, option_mask, _, partners = option
+            # 可选项按上界降序，上界不超过当前最优时后面的也不会超过
+            if score + upper + bound_rest[depth + 1] <= best["score"]:
+                break
+            if difficulty + level + level_rest[depth + 1] > budget:
+                continue
+            total = score + option_score
+            for other_depth, (by_position, _) in partners.items():
+                total += by_position.get(positions[other_depth], 0.0)
+            if total + bound_rest[depth + 1] <= best["score"]:
+                continue
+            # 静态上界未能剪枝时，再按已选组件计算更紧的上界
+            if bounds is None:
+                bounds = child_bounds(depth)
+            fixed, extra = bounds
+            if total + fixed + extra.get(position, 0.0) <= best["score"]:
+                continue
+            chosen[depth] = option
+            positions[depth] = position
+            search(depth + 1, total, difficulty + level, mask | option_mask)
+
+    search(0, 0.0, 0, 0)
+    if best["choice"] is None:
+        return None
+
+    picked = {category: option[1:6] for (category, _), option in zip(levels, best["choice"])}
+    stack = {}
+    for category in categories:
+        score, position, level, _, known = picked[category]
+        key = index.keys[category][position]
+        stack[category] = {
+            "type": key,
+            "name": index.info[category][position].get("name", key),
+            "score": round(score, 2),
+            "difficulty": level,
+            "familiar": known,
+        }
+
+    synergies = []
+    for i, category in enumerate(categories):
+        position = picked[category][1]
+        for other, other_position, score, reason in index.pairs.get((category, position), ()):
+            # 每对只记录一次（另一端在后面的类别中）
+            if other in categories[i + 1 :] and picked[other][1] == other_position:
+                synergies.append(
+                    {
+                        "items": [stack[category]["type"], stack[other]["type"]],
+                        "score": score,
+                        "reason": reason,
+                    }
+                )
+
+    return {
+        "score": round(best["score"], 2),
+        "difficulty": sum(item["difficulty"] for item in stack.values()),
+        "stack": stack,
+        "synergies": synergies,
+        "required_features": required,
+        "explored": explored,
+    }
+
+
+def format_stack_report(result: Optional[Dict], constraints: Dict) -> str:
+    """生成整体选型报告"""
+    report = ["# 中间件整体选型报告\n\n"]
+
+    report.append("## 约束条件\n\n")
+    report.append(f"- **单组件难度上限**: {constraints.get('max_difficulty') or '不限'}\n")
+    report.append(f"- **整体难度预算**: {constraints.get('difficulty_budget') or '不限'}\n")
+    required = "、".join(constraints.get("required_features", [])) or "无"
+    report.append(f"- **必备特性**: {required}\n")
+    report.append(f"- **团队熟悉**: {'、'.join(constraints.get('familiar', [])) or '无'}\n\n")
+
+    if result is None:
+        report.append("## 结论\n\n没有满足全部约束的组合，请放宽难度限制、必备特性或目标负载。\n")
+        return "".join(report)
+
+    report.append("## 推荐组合\n\n")
+    report.append(f"**总得分**: {result['score']:g}　**难度合计**: {result['difficulty']}\n\n")
+    report.append("| 类别 | 选择 | 匹配得分 | 难度等级 | 团队熟悉 |\n")
+    report.append("|------|------|----------|----------|----------|\n")
+    for category, item in result["stack"].items():
+        familiar = "是" if item["familiar"] else "否"
+        report.append(
+            f"| {category.upper()} | {item['name']} | {item['score']:g} "
+            f"| {item['difficulty']} | {familiar} |\n"
+        )
+    report.append("\n")
+
+    if result["synergies"]:
+        report.append("## 组件协同\n\n")
+        for synergy in result["synergies"]:
+            report.append(
+                f"- {' + '.join(synergy['items'])}（{synergy['score']:+g}）：{synergy['reason']}\n"
+            )
+        report.append("\n")
+
+    return "".join(report)
+
+
+def _split(value: Optional[str]) -> List[str]:
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="在约束下求解整套中间件组合")
+    parser.add_argument("--input", "-i", required=True, help="需求JSON文件路径")
+    parser.add_argument("--output", "-o", required=True, help="输出Markdown文件路径（同名 .json 为结果）")
+    parser.add_argument(
+        "--categories", default=",".join(STACK_CATEGORIES), help="参与组合的类别，逗号分隔"
+    )
+    parser.add_argument(
+        "--max-difficulty", choices=list(DIFFICULTY_LEVELS), help="单个组件的上手难度上限"
+    )
+    parser.add_argument("--difficulty-budget", type=int, help="整体难度预算（低=1，中=2，高=3）")
+    parser.add_argument("--require", help="必须具备的特性，逗号分隔（如 事务消息,全文检索）")
+    parser.add_argument("--familiar", help="团队熟悉的产品，逗号分隔（如 mysql,redis）")
+    parser.add_argument("--catalog", help="中间件目录JSON文件路径（缺省使用内置目录）")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="索引缓存目录")
+
+    args = parser.parse_args()
+
+    json_output = str(Path(args.output).with_suffix(".json"))
+    if Path(json_output).resolve() == Path(args.input).resolve():
+        parser.error(f"结果文件 {json_output} 会覆盖输入文件，请换一个输出路径")
+
+    with open(args.input, "r", encoding="utf-8") as f:
+        requirements = json.load(f)
+
+    try:
+        configure_middleware_index(args.catalog, args.cache_dir)
+    except (OSError, ValueError) as e:
+        parser.error(f"无法加载中间件目录: {e}")
+
+    # 命令行参数覆盖需求中的 constraints
+    constraints = stack_constraints(requirements)
+    if args.max_difficulty:
+        constraints["max_difficulty"] = args.max_difficulty
+    if args.difficulty_budget is not None:
+        constraints["difficulty_budget"] = args.difficulty_budget
+    if args.require:
+        constraints["required_features"] = _split(args.require)
+    if args.familiar:
+        constraints["familiar"] = _split(args.familiar)
+
+    try:
+        result = optimize_stack(requirements, _split(args.categories), **constraints)
+    except (KeyError, ValueError) as e:
+        parser.error(str(e).strip("'\""))
+
+    write_if_changed(args.output, format_stack_report(result, constraints).encode("utf-8"))
+    payload = {"constraints": constraints, "result": result}
+    write_if_changed(json_output, json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8"))
+
+    if result is None:
+        print(f"没有满足约束的组合: {args.output}")
+    else:
+        stack = "、".join(item["name"] for item in result["stack"].values())
+        print(f"整体选型已生成: {args.output}（{stack}，搜索 {result['explored']} 个节点）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+容量估算测试
+数量与数据量的文本解析：千分位分隔符、单位与默认单位
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from capacity_planner import parse_quantity, parse_size  # noqa: E402
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("10,000 QPS", 10000),
+        ("1，000，000", 1000000),
+        ("1.2万", 12000),
+        ("5k QPS", 5000),
+    ],
+)
+def test_parse_quantity(text, expected):
+    assert parse_quantity(text) == expected
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("500B", 500),
+        ("500", 500 * 1024**3),
+        ("500G", 500 * 1024**3),
+        ("1.5 GiB", 1.5 * 1024**3),
+        ("2,048 MB", 2048 * 1024**2),
+    ],
+)
+def test_parse_size(text, expected):
+    assert parse_size(text) == expected
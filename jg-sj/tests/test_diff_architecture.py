@@ -0,0 +1,47 @@
+"""
+架构文档版本对比测试
+架构总览的自动架构图与依赖分析由模块依赖生成，只改模块依赖时该章节也要列为有变化
+"""
+
+import copy
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from diff_architecture import diff_architecture  # noqa: E402
+from generate_architecture_doc import generate_architecture_doc  # noqa: E402
+
+
+REQUIREMENTS = {"project_name": "订单系统", "features": ["下单", "支付"]}
+ARCHITECTURE = {
+    "pattern": "微服务",
+    "modules": [
+        {"name": "订单服务", "responsibility": "处理订单", "dependencies": ["用户服务"]},
+        {"name": "用户服务", "responsibility": "用户管理", "dependencies": []},
+        {"name": "支付服务", "responsibility": "处理支付", "dependencies": []},
+    ],
+}
+
+
+def test_dependency_change_marks_overview():
+    architecture = copy.deepcopy(ARCHITECTURE)
+    architecture["modules"][0]["dependencies"] = ["用户服务", "支付服务"]
+
+    diff = diff_architecture(REQUIREMENTS, ARCHITECTURE, REQUIREMENTS, architecture)
+
+    assert diff["架构总览"] == [
+        {"path": "modules.dependencies", "kind": "added", "new": "订单服务 -> 支付服务"}
+    ]
+    assert "模块设计" in diff
+    regenerated = generate_architecture_doc(REQUIREMENTS, architecture, sections=list(diff))
+    assert "**依赖关系**: 2" in regenerated
+
+
+def test_responsibility_change_leaves_overview():
+    architecture = copy.deepcopy(ARCHITECTURE)
+    architecture["modules"][0]["responsibility"] = "处理订单与售后"
+
+    diff = diff_architecture(REQUIREMENTS, ARCHITECTURE, REQUIREMENTS, architecture)
+
+    assert list(diff) == ["模块设计"]
@@ -0,0 +1,108 @@
+"""
+中间件选型回归测试
+打分引擎取代原来的 if 链后，逐个需求开关的推荐结果须与原实现一致；有意改变的选择单独列出
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from middleware_selector import load_middleware_index, recommend_middleware  # noqa: E402
+
+
+CATEGORIES = ("database", "mq", "cache", "search", "gateway")
+
+# 原 if 链实现对每个需求开关的选择: (database, mq, cache, search, gateway)
+BASELINE_PICKS = [
+    ({}, ("mysql", "rabbitmq", "memcached", "elasticsearch", "apisix")),
+    ({"need_transaction": True}, ("mysql", "rocketmq", "memcached", "elasticsearch", "apisix")),
+    (
+        {"need_complex_query": True},
+        ("postgresql", "rabbitmq", "memcached", "elasticsearch", "apisix"),
+    ),
+    ({"high_throughput": True}, ("mysql", "kafka", "memcached", "elasticsearch", "apisix")),
+    ({"need_complex_data": True}, ("mysql", "rabbitmq", "redis", "elasticsearch", "apisix")),
+    ({"need_persistence": True}, ("mysql", "rabbitmq", "redis", "elasticsearch", "apisix")),
+    ({"need_fulltext": True}, ("mysql", "rabbitmq", "memcached", "elasticsearch", "apisix")),
+    ({"need_log_analysis": True}, ("mysql", "rabbitmq", "memcached", "elasticsearch", "apisix")),
+    ({"need_plugins": True}, ("mysql", "rabbitmq", "memcached", "elasticsearch", "kong")),
+    ({"use_cases": ["content"]}, ("mongodb", "rabbitmq", "memcached", "elasticsearch", "apisix")),
+    ({"use_cases": ["log"]}, ("mongodb", "kafka", "memcached", "elasticsearch", "apisix")),
+    ({"use_cases": ["iot"]}, ("mongodb", "rabbitmq", "memcached", "elasticsearch", "apisix")),
+    ({"use_cases": ["stream"]}, ("mysql", "kafka", "memcached", "elasticsearch", "apisix")),
+    ({"scale": "small"}, ("mysql", "rabbitmq", "memcached", "elasticsearch", "apisix")),
+    ({"scale": "large"}, ("mysql", "rabbitmq", "memcached", "elasticsearch", "kong")),
+    (
+        {"need_transaction": True, "need_geo": True},
+        ("postgresql", "rocketmq", "memcached", "elasticsearch", "apisix"),
+    ),
+]
+
+# 有意改变的选择：原实现只在 need_transaction 时看 need_geo，且从未使用 need_order
+INTENDED_CHANGES = [
+    ({"need_geo": True}, "database", "postgresql"),
+    ({"need_order": True}, "mq", "rocketmq"),
+]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return load_middleware_index(cache_dir="")
+
+
+def picks(requirements, index):
+    recommendations = recommend_middleware(requirements, index)
+    return tuple(recommendations[category]["type"] for category in CATEGORIES)
+
+
+@pytest.mark.parametrize("requirements, expected", BASELINE_PICKS)
+def test_baseline_picks(requirements, expected, index):
+    assert picks(requirements, index) == expected
+
+
+@pytest.mark.parametrize("requirements, category, expected", INTENDED_CHANGES)
+def test_intended_changes(requirements, category, expected, index):
+    assert recommend_middleware(requirements, index)[category]["type"] == expected
+
+
+@pytest.mark.parametrize(
+    "requirements",
+    [
+        {"high_throughput": True, "scale": "large"},
+        {"need_complex_data": True, "need_persistence": True},
+        {"use_cases": ["session"]},
+    ],
+)
+def test_cache_store_never_primary_database(requirements, index):
+    recommendation = recommend_middleware(requirements, index)["database"]
+    assert recommendation["type"] != "redis"
+    assert all(candidate["type"] != "redis" for candidate in recommendation["ranking"])
+
+
+LOAD = {"need_transaction": True, "non_functional": {"qps": "8万", "data_volume": "20TB"}}
+
+
+def test_relational_database_shards_instead_of_rejecting(index):
+    recommendation = recommend_middleware(LOAD, index)["database"]
+    assert recommendation["type"] == "mysql"
+    assert recommendation["sizing"]["feasible"]
+    assert recommendation["sizing"]["shards"] > 1
+
+
+def test_weakness_on_required_feature_is_never_promoted(index):
+    for requirements in (LOAD, {"need_transaction": True}):
+        recommendation = recommend_middleware(requirements, index)["database"]
+        ranked = {candidate["type"] for candidate in recommendation["ranking"]}
+        assert "mongodb" not in ranked
+        assert "mongodb" in {candidate["type"] for candidate in recommendation["rejected"]}
+
+
+def test_no_candidate_fits(index):
+    requirements = dict(LOAD, non_functional=dict(LOAD["non_functional"], response_time="80ms"))
+    recommendation = recommend_middleware(requirements, index)["search"]
+    assert recommendation["type"] is None
+    assert recommendation["ranking"] == []
+    assert all(candidate["reasons"] for candidate in recommendation["rejected"])
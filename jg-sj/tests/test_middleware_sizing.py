@@ -0,0 +1,21 @@
+"""
+中间件容量估算测试
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from middleware_sizing import size_candidate  # noqa: E402
+
+
+def test_zero_min_nodes_without_load_deploys_one_node():
+    targets = {"qps": 0.0, "data_gb": 0.0, "response_ms": None, "utilization": 0.7}
+
+    sizing = size_candidate({"qps_per_node": 1000, "min_nodes": 0}, targets)
+
+    assert sizing["nodes"] == 1
+    assert sizing["capacity_qps"] == 1000
+    assert sizing["headroom"] == 1
+    assert sizing["feasible"]
@@ -0,0 +1,36 @@
+"""
+中间件整体选型测试
+整体选型与逐类别推荐遵循同一条规则：劣势命中需求开关的候选不会被选中
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from middleware_selector import load_middleware_index  # noqa: E402
+from stack_optimizer import optimize_stack  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def index():
+    return load_middleware_index(cache_dir="")
+
+
+def test_transaction_never_picks_mongodb(index):
+    stack = optimize_stack({"need_transaction": True}, index=index)
+    assert stack["stack"]["database"]["type"] != "mongodb"
+
+
+@pytest.mark.parametrize("familiar", [(), ("mongodb",)])
+def test_required_feature_cannot_force_conflicting_candidate(familiar, index):
+    # 文档模型只有 MongoDB 具备，而 MongoDB 的事务限制与 need_transaction 冲突
+    stack = optimize_stack(
+        {"need_transaction": True},
+        required_features=["文档模型"],
+        familiar=familiar,
+        index=index,
+    )
+    assert stack is None
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+技能脚本常驻服务
+以 asyncio 常驻进程提供 analyze_risk、评审报告、架构文档和中间件选型的 HTTP 接口，
+关键词匹配器等编译结果常驻内存；附带客户端，服务不可用时回退为进程内执行
+"""
+
+import os
+import sys
+import json
+import socket
+import asyncio
+import argparse
+import http.client
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Tuple
+from urllib.parse import parse_qs, urlsplit
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+for scripts_dir in (
+    ROOT / "scripts",
+    ROOT / "xm-jl" / "scripts",
+    ROOT / "jg-sj" / "scripts",
+):
+    if str(scripts_dir) not in sys.path:
+        sys.path.insert(0, str(scripts_dir))
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# 单个请求体的大小上限
+MAX_BODY_SIZE = 64 * 1024 * 1024
+
+
+def _analyze_risk(payload: dict, fmt: str):
+    from analyze_risk import evaluate_risk, generate_risk_json, generate_risk_report
+
+    risks, score = evaluate_risk(payload.get("description", ""))
+    if fmt == "json":
+        return generate_risk_json(score, payload)
+    return generate_risk_report(risks, payload)
+
+
+def _review_report(payload: dict, fmt: str):
+    from generate_review_report import generate_review_report
+
+    return generate_review_report(payload)
+
+
+def _architecture_doc(payload: dict, fmt: str):
+    from doc_model import to_markdown
+    from generate_architecture_doc import build_architecture_doc
+
+    doc = build_architecture_doc(
+        payload.get("requirements", {}),
+        payload.get("architecture", {}),
+        sections=payload.get("sections"),
+    )
+    return doc if fmt == "json" else to_markdown(doc)
+
+
+def _middleware(payload: dict, fmt: str):
+    from middleware_selector import generate_recommendation
+
+    recommendations, report = generate_recommendation(payload)
+    return recommendations if fmt == "json" else report
+
+
+def _render_template(payload: dict, fmt: str):
+    from template_engine import load_template
+
+    # 只允许渲染仓库内的模板文件
+    path = (ROOT / payload.get("template", "")).resolve()
+    if ROOT not in path.parents or not path.is_file():
+        raise ValueError(f"模板不存在: {payload.get('template')}")
+    return load_template(str(path)).render(payload.get("context", {}))
+
+
+# 工具名 -> 处理函数，处理函数返回 Markdown 文本或（format=json 时）可序列化对象
+TOOLS: Dict[str, Callable[[dict, str], object]] = {
+    "analyze_risk": _analyze_risk,
+    "review_report": _review_report,
+    "architecture_doc": _architecture_doc,
+    "middleware": _middleware,
+    "render_template": _render_template,
+}
+
+# 工具名 -> 支持的输出格式，评审报告和模板渲染只有 Markdown 输出
+FORMATS: Dict[str, Tuple[str, ...]] = {
+    "analyze_risk": ("markdown", "json"),
+    "review_report": ("markdown",),
+    "architecture_doc": ("markdown", "json"),
+    "middleware": ("markdown", "json"),
+    "render_template": ("markdown",),
+}
+
+
+def warm_up():
+    """预先导入各脚本，编译关键词匹配器、中间件索引和仓库内的 .tpl 模板"""
+    from analyze_risk import get_risk_matcher
+    from template_engine import load_template
+    import generate_review_report  # noqa: F401
+    import generate_architecture_doc  # noqa: F401
+    from middleware_selector import get_middleware_index
+
+    get_risk_matcher()
+    get_middleware_index()
+    for template in ROOT.glob("*/assets/*/*.tpl"):
+        load_template(str(template))
+
+
+def dispatch(tool: str, payload: dict, fmt: str = "markdown") -> Tuple[str, str]:
+    """执行工具，返回 (content_type, 响应正文)；工具不支持该格式时抛出 ValueError"""
+    if fmt not in FORMATS[tool]:
+        raise ValueError(f"{tool} 不支持 {fmt} 格式，可选: {', '.join(FORMATS[tool])}")
+    result = TOOLS[tool](payload, fmt)
+    if isinstance(result, str):
+        return "text/markdown; charset=utf-8", result
+    return "application/json; charset=utf-8", json.dumps(result, ensure_ascii=False)
+
+
+class SkillServer:
+    """最小化的 HTTP/1.1 服务，支持 keep-alive，可监听本地端口或 Unix socket"""
+
+    def __init__(self, workers: int = 0):
+        # workers 为 0 时在单个线程中执行（仍不阻塞事件循环），否则使用进程池并行
+        if workers > 0:
+            self.executor = ProcessPoolExecutor(max_workers=workers, initializer=warm_up)
+        else:
+            warm_up()
+            self.executor = ThreadPoolExecutor(max_workers=1)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """处理一个连接上的若干请求"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY_SIZE:
+                    await self.respond(writer, 413, "text/plain; charset=utf-8", "请求体过大", False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                status, content_type, content = await self.route(method, target, body)
+                keep_alive = (
+                    version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                )
+                await self.respond(writer, status, content_type, content, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method: str, target: str, body: bytes) -> Tuple[int, str, str]:
+        """根据请求路径分发到对应工具"""
+        url = urlsplit(target)
+        tool = url.path.strip("/")
+
+        if method == "GET" and tool == "health":
+            content = json.dumps({"status": "ok", "tools": sorted(TOOLS)})
+            return 200, "application/json; charset=utf-8", content
+        if method != "POST":
+            return 405, "text/plain; charset=utf-8", "仅支持 POST"
+        if tool not in TOOLS:
+            return 404, "text/plain; charset=utf-8", f"未知工具: {tool}"
+
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError as e:
+            return 400, "text/plain; charset=utf-8", f"请求体不是合法JSON: {e}"
+        fmt = parse_qs(url.query).get("format", ["markdown"])[0]
+        if fmt not in FORMATS[tool]:
+            supported = ", ".join(FORMATS[tool])
+            return 400, "text/plain; charset=utf-8", f"{tool} 不支持 {fmt} 格式，可选: {supported}"
+
+        loop = asyncio.get_running_loop()
+        try:
+            content_type, content = await loop.run_in_executor(
+                self.executor, dispatch, tool, payload, fmt
+            )
+        except Exception as e:  # 工具内部错误返回 500，不影响服务继续运行
+            return 500, "text/plain; charset=utf-8", f"{type(e).__name__}: {e}"
+        return 200, content_type, content
+
+    @staticmethod
+    async def respond(writer, status: int, content_type: str, content: str, keep_alive: bool):
+        data = content.encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {http.client.responses.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + data)
+        await writer.drain()
+
+
+async def serve(host: str, port: int, unix_path: str = None, workers: int = 0):
+    """启动服务直到进程被终止"""
+    server = SkillServer(workers)
+    if unix_path:
+        if os.path.exists(unix_path):
+            os.unlink(unix_path)
+        listener = await asyncio.start_unix_server(server.handle, path=unix_path)
+        print(f"技能服务已启动: unix:{unix_path}")
+    else:
+        listener = await asyncio.start_server(server.handle, host, port)
+        print(f"技能服务已启动: http://{host}:{port}")
+    async with listener:
+        await listener.serve_forever()
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """通过 Unix socket 发送 HTTP 请求"""
+
+    def __init__(self, path: str, timeout: float = None):
+        super().__init__("localhost", timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+def call(
+    tool: str,
+    payload: dict,
+    fmt: str = "markdown",
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    unix_path: str = None,
+    timeout: float = 60.0,
+) -> Tuple[str, bool]:
+    """调用常驻服务，服务未启动时回退为进程内执行；返回 (响应正文, 是否来自服务)
+
+    只有连接被拒绝或 socket 文件不存在时才回退；请求发出后的超时、连接重置等错误直接报错，
+    以免服务端已执行的请求在本地再执行一次。
+    """
+    if unix_path:
+        conn = UnixHTTPConnection(unix_path, timeout=timeout)
+    else:
+        conn = http.client.HTTPConnection(host, port, timeout=timeout)
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    try:
+        try:
+            conn.connect()
+        except (ConnectionRefusedError, FileNotFoundError):
+            return dispatch(tool, payload, fmt)[1], False
+        conn.request(
+            "POST",
+            f"/{tool}?format={fmt}",
+            body=body,
+            headers={"Content-Type": "application/json"},
+        )
+        response = conn.getresponse()
+        content = response.read().decode("utf-8")
+    except OSError as e:
+        raise RuntimeError(f"服务请求失败: {e}") from e
+    finally:
+        conn.close()
+
+    if response.status != 200:
+        raise RuntimeError(f"服务返回 {response.status}: {content}")
+    return content, True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="技能脚本常驻服务")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_address(sub):
+        sub.add_argument("--host", default=DEFAULT_HOST, help="监听/连接地址")
+        sub.add_argument("--port", type=int, default=DEFAULT_PORT, help="监听/连接端口")
+        sub.add_argument("--unix", help="Unix socket 路径（指定后忽略 host/port）")
+
+    serve_parser = subparsers.add_parser("serve", help="启动常驻服务")
+    add_address(serve_parser)
+    serve_parser.add_argument(
+        "--workers", "-w", type=int, default=0, help="工作进程数（0 表示单线程执行）"
+    )
+
+    call_parser = subparsers.add_parser("call", help="调用服务（不可用时进程内执行）")
+    add_address(call_parser)
+    call_parser.add_argument("tool", choices=sorted(TOOLS), help="工具名")
+    call_parser.add_argument(
+        "--input", "-i", required=True, help="输入JSON文件路径（render_template 时为模板上下文）"
+    )
+    call_parser.add_argument("--template", "-t", help="仓库内的模板路径（仅 render_template）")
+    call_parser.add_argument(
+        "--architecture", "-a", help="架构决策JSON文件路径（仅 architecture_doc）"
+    )
+    call_parser.add_argument("--output", "-o", help="输出文件路径（缺省输出到标准输出）")
+    call_parser.add_argument(
+        "--format", "-f", choices=["markdown", "json"], default="markdown", help="输出格式"
+    )
+
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        try:
+            asyncio.run(serve(args.host, args.port, args.unix, args.workers))
+        except KeyboardInterrupt:
+            pass
+        return
+    if args.format not in FORMATS[args.tool]:
+        parser.error(f"{args.tool} 不支持 {args.format} 格式，可选: {', '.join(FORMATS[args.tool])}")
+
+    with open(args.input, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    if args.tool == "architecture_doc":
+        architecture = {}
+        if args.architecture:
+            with open(args.architecture, "r", encoding="utf-8") as f:
+                architecture = json.load(f)
+        payload = {"requirements": payload, "architecture": architecture}
+    elif args.tool == "render_template":
+        payload = {"template": args.template, "context": payload}
+
+    content, remote = call(args.tool, payload, args.format, args.host, args.port, args.unix)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(content)
+        print(f"{'服务' if remote else '本地'}执行完成: {args.output}", file=sys.stderr)
+    else:
+        sys.stdout.write(content)
+
+
+if __name__ == "__main__":
+    main()
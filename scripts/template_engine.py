@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+模板引擎
+把 {{placeholder}} 风格的模板（如 qz-nm/assets 下的 .tpl）编译为 Python 渲染函数，
+编译结果按文件修改时间缓存在内存和磁盘上
+
+支持的语法:
+  {{name}} / {{a.b}}              变量（缺失时输出空串）
+  {{helper arg ...}}              调用辅助函数，如 {{kebabCase componentName}}
+  {{#each items}}...{{/each}}     循环，块内可用 {{this}}、{{@index}} 及元素字段
+  {{#if x}}...{{else}}...{{/if}}  条件
+  {{! 注释 }}                     注释
+  {{ title }}                     两侧带空格的标签视为目标语言自身的插值语法（如 Vue），原样输出
+"""
+
+import os
+import re
+import sys
+import json
+import marshal
+import hashlib
+import argparse
+from typing import Callable, Dict, List, Tuple
+from pathlib import Path
+
+
+DEFAULT_CACHE_DIR = ".cache"
+
+# 编译产物格式版本，代码生成逻辑变化时需递增
+TEMPLATE_CACHE_VERSION = 1
+
+TAG_PATTERN = re.compile(r"\{\{(.*?)\}\}", re.S)
+ARG_PATTERN = re.compile(r"\"[^\"]*\"|'[^']*'|\S+")
+
+
+class TemplateError(ValueError):
+    """模板语法错误"""
+
+
+def _words(text: str) -> List[str]:
+    """把标识符拆分为小写单词（兼容 camelCase、PascalCase、snake_case、kebab-case）"""
+    text = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", text)
+    text = re.sub(r"([A-Z]+)([A-Z][a-z])", r"\1 \2", text)
+    return [w.lower() for w in re.split(r"[\s_\-]+", text) if w]
+
+
+def _to_text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+HELPERS: Dict[str, Callable] = {
+    "kebabCase": lambda v: "-".join(_words(_to_text(v))),
+    "snakeCase": lambda v: "_".join(_words(_to_text(v))),
+    "camelCase": lambda v: "".join(
+        w if i == 0 else w.capitalize() for i, w in enumerate(_words(_to_text(v)))
+    ),
+    "pascalCase": lambda v: "".join(w.capitalize() for w in _words(_to_text(v))),
+    "lowerFirst": lambda v: _to_text(v)[:1].lower() + _to_text(v)[1:],
+    "upperFirst": lambda v: _to_text(v)[:1].upper() + _to_text(v)[1:],
+    "upper": lambda v: _to_text(v).upper(),
+    "lower": lambda v: _to_text(v).lower(),
+    "join": lambda v, sep=", ": str(sep).join(str(x) for x in (v or [])),
+}
+
+
+def register_helper(name: str, func: Callable):
+    """注册自定义辅助函数"""
+    HELPERS[name] = func
+
+
+def _lookup(stack: List, path: str):
+    """从内到外在作用域栈中查找变量，支持 a.b 形式的路径"""
+    head, *rest = path.split(".")
+    for scope in reversed(stack):
+        if isinstance(scope, dict) and head in scope:
+            value = scope[head]
+            break
+    else:
+        return None
+    for key in rest:
+        if isinstance(value, dict):
+            value = value.get(key)
+        elif isinstance(value, (list, tuple)) and key.isdigit() and int(key) < len(value):
+            value = value[int(key)]
+        else:
+            return None
+    return value
+
+
+def _tokenize(source: str) -> List[Tuple[str, str]]:
+    """切分为 (类型, 内容) 序列；独占一行的块标签连同所在行一起去除"""
+    tokens = []
+    pos = 0
+    for m in TAG_PATTERN.finditer(source):
+        raw = m.group(1)
+        if raw[:1].isspace() and raw[-1:].isspace():
+            continue  # 目标语言自身的插值，留在文本中
+        text = source[pos : m.start()]
+        tag = raw.strip()
+        kind = "var"
+        if tag.startswith("!"):
+            kind = "comment"
+        elif tag.startswith("#") or tag.startswith("/") or tag == "else":
+            kind = "block"
+
+        end = m.end()
+        if kind in ("block", "comment"):
+            line_start = text.rfind("\n") + 1
+            line_end = source.find("\n", end)
+            line_end = len(source) if line_end == -1 else line_end + 1
+            before = text[line_start:]
+            after = source[end:line_end]
+            if not before.strip() and not after.strip():
+                text = text[:line_start]
+                end = line_end
+
+        if text:
+            tokens.append(("text", text))
+        tokens.append((kind, tag))
+        pos = end
+    if pos < len(source):
+        tokens.append(("text", source[pos:]))
+    return tokens
+
+
+def _generate(tokens: List[Tuple[str, str]], name: str) -> str:
+    """把标记序列生成为渲染函数的 Python 源码"""
+    lines = [
+        "def render(ctx, helpers, lookup, to_text):",
+        "    out = []",
+        "    w = out.append",
+        "    stack = [ctx]",
+    ]
+    indent = "    "
+    blocks = []  # (块类型, 循环深度)
+
+    def expr(tag: str) -> str:
+        parts = ARG_PATTERN.findall(tag)
+        if not parts:
+            raise TemplateError(f"{name}: 空标签")
+        if len(parts) > 1:
+            if parts[0] not in HELPERS:
+                raise TemplateError(f"{name}: 未知的辅助函数 {parts[0]}")
+            args = ", ".join(value_expr(p) for p in parts[1:])
+            return f"helpers[{parts[0]!r}]({args})"
+        return value_expr(parts[0])
+
+    def value_expr(token: str) -> str:
+        if token[:1] in "\"'" and token[-1:] == token[:1]:
+            return repr(token[1:-1])
+        if re.fullmatch(r"-?\d+(\.\d+)?", token):
+            return token
+        depth = sum(1 for kind, _ in blocks if kind == "each")
+        if token == "this":
+            return f"_item{depth}" if depth else "ctx"
+        if token.startswith("@"):
+            if not depth:
+                raise TemplateError(f"{name}: {token} 只能在 #each 块内使用")
+            special = {
+                "@index": f"_i{depth}",
+                "@first": f"(_i{depth} == 0)",
+                "@last": f"(_i{depth} == _n{depth} - 1)",
+            }
+            if token not in special:
+                raise TemplateError(f"{name}: 未知的特殊变量 {token}")
+            return special[token]
+        if token.startswith("this."):
+            token = token[5:]
+        return f"lookup(stack, {token!r})"
+
+    for kind, content in tokens:
+        if kind == "text":
+            lines.append(f"{indent}w({content!r})")
+        elif kind == "var":
+            lines.append(f"{indent}w(to_text({expr(content)}))")
+        elif kind == "comment":
+            continue
+        elif content.startswith("#each "):
+            depth = sum(1 for k, _ in blocks if k == "each") + 1
+            source_expr = expr(content[6:].strip())
+            blocks.append(("each", depth))
+            lines.append(f"{indent}_seq{depth} = {source_expr} or ()")
+            lines.append(f"{indent}_n{depth} = len(_seq{depth})")
+            lines.append(f"{indent}for _i{depth}, _item{depth} in enumerate(_seq{depth}):")
+            lines.append(f"{indent}    stack.append(_item{depth})")
+            indent += "    "
+        elif content.startswith("#if ") or content.startswith("#unless "):
+            keyword, _, condition = content[1:].partition(" ")
+            negate = "not " if keyword == "unless" else ""
+            lines.append(f"{indent}if {negate}{expr(condition.strip())}:")
+            blocks.append(("if", 0))
+            indent += "    "
+            lines.append(f"{indent}pass")
+        elif content == "else":
+            if not blocks or blocks[-1][0] != "if":
+                raise TemplateError(f"{name}: else 只能出现在 #if/#unless 块内")
+            lines.append(f"{indent[:-4]}else:")
+            lines.append(f"{indent}pass")
+        elif content.startswith("/"):
+            closing = content[1:].strip()
+            if not blocks:
+                raise TemplateError(f"{name}: 多余的结束标签 {{{{{content}}}}}")
+            block_kind, _ = blocks.pop()
+            if (block_kind == "each") != (closing == "each"):
+                raise TemplateError(f"{name}: 结束标签 {{{{{content}}}}} 与开始标签不匹配")
+            indent = indent[:-4]
+            if block_kind == "each":
+                lines.append(f"{indent}    stack.pop()")
+        else:
+            raise TemplateError(f"{name}: 不支持的块标签 {{{{{content}}}}}")
+
+    if blocks:
+        raise TemplateError(f"{name}: 缺少 {{{{/{blocks[-1][0]}}}}} 结束标签")
+    lines.append('    return "".join(out)')
+    return "\n".join(lines) + "\n"
+
+
+class Template:
+    """已编译的模板"""
+
+    def __init__(self, code, name: str = "<template>"):
+        self.name = name
+        self.code = code
+        namespace = {}
+        exec(code, namespace)
+        self._render = namespace["render"]
+
+    def render(self, context: Dict = None, **kwargs) -> str:
+        """用给定上下文渲染模板"""
+        ctx = dict(context or {}, **kwargs)
+        return self._render(ctx, HELPERS, _lookup, _to_text)
+
+
+def compile_source(source: str, name: str = "<template>"):
+    """把模板源码编译为代码对象"""
+    return compile(_generate(_tokenize(source), name), name, "exec")
+
+
+def compile_template(source: str, name: str = "<template>") -> Template:
+    """把模板源码编译为 Template"""
+    return Template(compile_source(source, name), name)
+
+
+_memory_cache: Dict[str, Tuple[Tuple[int, int], Template]] = {}
+
+
+def load_template(path: str, cache_dir: str = DEFAULT_CACHE_DIR) -> Template:
+    """加载模板文件，编译结果按 (mtime, size) 缓存在内存与 cache_dir 中
+
+    cache_dir 为空时只使用内存缓存。
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+
+    cached = _memory_cache.get(path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    cache_file = None
+    code = None
+    if cache_dir:
+        key = hashlib.sha256(
+            f"{TEMPLATE_CACHE_VERSION}:{sys.version_info[:2]}:{path}:{version}".encode()
+        ).hexdigest()[:16]
+        cache_file = Path(cache_dir) / "templates" / f"{key}.bin"
+        try:
+            with open(cache_file, "rb") as f:
+                code = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            code = None
+
+    if code is None:
+        with open(path, "r", encoding="utf-8") as f:
+            code = compile_source(f.read(), path)
+        if cache_file is not None:
+            os.makedirs(cache_file.parent, exist_ok=True)
+            tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_file, "wb") as f:
+                marshal.dump(code, f)
+            os.replace(tmp_file, cache_file)
+
+    template = Template(code, path)
+    _memory_cache[path] = (version, template)
+    return template
+
+
+def render_template(path: str, context: Dict, cache_dir: str = DEFAULT_CACHE_DIR) -> str:
+    """加载并渲染模板文件"""
+    return load_template(path, cache_dir).render(context)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="渲染 {{placeholder}} 风格的模板")
+    parser.add_argument("--template", "-t", required=True, help="模板文件路径")
+    parser.add_argument("--context", "-c", required=True, help="上下文JSON文件路径")
+    parser.add_argument("--output", "-o", help="输出文件路径（缺省输出到标准输出）")
+    parser.add_argument(
+        "--cache-dir", default=DEFAULT_CACHE_DIR, help="编译缓存目录（传空字符串禁用磁盘缓存）"
+    )
+
+    args = parser.parse_args()
+
+    with open(args.context, "r", encoding="utf-8") as f:
+        context = json.load(f)
+
+    try:
+        content = render_template(args.template, context, args.cache_dir)
+    except TemplateError as e:
+        parser.error(str(e))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(content)
+        print(f"模板已渲染: {args.output}")
+    else:
+        sys.stdout.write(content)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+评审/风险报告汇总分析
+批量读取需求JSON或 analyze_risk 输出的风险JSON，按列聚合生成跨报告统计：
+风险分类计数、未关闭行动项最多的负责人、截止时间分布
+"""
+
+import re
+import sys
+import json
+import argparse
+from collections import Counter
+from typing import Dict
+
+from analyze_risk import RISK_LEVELS
+from batch_items import iter_batch_items
+
+
+# analyze_risk 生成的风险描述，提取其中的风险名
+RISK_NAME_PATTERN = re.compile(r"检测到'(.+?)'风险")
+
+# 截止时间按月分桶，兼容 2024-05-01 / 2024/5/1 / 2024年5月1日
+DEADLINE_PATTERN = re.compile(r"(\d{4})\s*[-/.年]\s*(\d{1,2})")
+
+# 视为已关闭的行动项状态
+CLOSED_STATUSES = frozenset(["done", "closed", "resolved", "完成", "已完成", "关闭", "已关闭"])
+
+PRIORITY_ORDER = {"P0": 0, "P1": 1, "P2": 2, "高": 0, "中": 1, "低": 2}
+
+
+class ReportColumns:
+    """按列存放所有记录的字段，汇总时直接对整列计数"""
+
+    def __init__(self):
+        self.records = 0
+        self.failed = []
+        self.scores = []
+        self.risk_levels = []
+        self.risk_names = []
+        self.action_owners = []
+        self.action_priorities = []
+        self.action_months = []
+
+    def add(self, record: dict):
+        """把一条需求JSON或风险JSON拆分到各列
+
+        先完整解析到局部列表，整条记录通过校验后才写入各列；解析失败时抛出异常，各列保持不变。
+        """
+        if not isinstance(record, dict):
+            raise TypeError(f"记录应为 JSON 对象，实际为 {type(record).__name__}")
+        scores = []
+        risk_levels = []
+        risk_names = []
+        action_owners = []
+        action_priorities = []
+        action_months = []
+
+        # analyze_risk 输出的风险JSON
+        if isinstance(record.get("risks"), list):
+            if "score" in record:
+                scores.append(float(record["score"]))
+            for risk in record["risks"]:
+                risk_levels.append(risk.get("level", "unknown"))
+                risk_names.append(risk.get("risk", "未命名"))
+
+        # 需求/评审JSON
+        for level, field in RISK_LEVELS:
+            for risk in record.get(field, []):
+                m = RISK_NAME_PATTERN.search(str(risk))
+                risk_levels.append(level)
+                risk_names.append(m.group(1) if m else str(risk))
+
+        for action in record.get("action_items", []):
+            if str(action.get("status", "")).strip().lower() in CLOSED_STATUSES:
+                continue
+            action_owners.append(action.get("owner") or "未指定")
+            action_priorities.append(action.get("priority", "中"))
+            m = DEADLINE_PATTERN.search(str(action.get("deadline", "")))
+            action_months.append(f"{m.group(1)}-{int(m.group(2)):02d}" if m else "未指定")
+
+        self.records += 1
+        self.scores.extend(scores)
+        self.risk_levels.extend(risk_levels)
+        self.risk_names.extend(risk_names)
+        self.action_owners.extend(action_owners)
+        self.action_priorities.extend(action_priorities)
+        self.action_months.extend(action_months)
+
+    def summarize(self, top: int = 20) -> Dict:
+        """对各列计数，生成汇总结果"""
+        level_counts = Counter(self.risk_levels)
+        name_counts = Counter(zip(self.risk_levels, self.risk_names))
+        owner_counts = Counter(self.action_owners)
+        owner_urgent = Counter(
+            owner
+            for owner, priority in zip(self.action_owners, self.action_priorities)
+            if PRIORITY_ORDER.get(priority, 1) == 0
+        )
+        month_counts = Counter(self.action_months)
+
+        scores = sorted(self.scores)
+        score_stats = {}
+        if scores:
+            score_stats = {
+                "count": len(scores),
+                "mean": round(sum(scores) / len(scores), 2),
+                "p50": scores[len(scores) // 2],
+                "p90": scores[min(len(scores) - 1, int(len(scores) * 0.9))],
+                "max": scores[-1],
+            }
+
+        return {
+            "records": self.records,
+            "failed": len(self.failed),
+            "risk_levels": {level: level_counts.get(level, 0) for level, _ in RISK_LEVELS},
+            "top_risks": [
+                {"level": level, "risk": name, "count": count}
+                for (level, name), count in name_counts.most_common(top)
+            ],
+            "open_action_items": len(self.action_owners),
+            "top_owners": [
+                {"owner": owner, "open": count, "urgent": owner_urgent.get(owner, 0)}
+                for owner, count in owner_counts.most_common(top)
+            ],
+            "deadline_histogram": dict(
+                sorted(month_counts.items(), key=lambda item: (item[0] == "未指定", item[0]))
+            ),
+            "score_stats": score_stats,
+        }
+
+
+def collect_columns(source: str) -> ReportColumns:
+    """读取目录、glob、JSONL 或标准输入中的全部记录"""
+    columns = ReportColumns()
+    for name, kind, payload in iter_batch_items(source):
+        try:
+            if kind == "file":
+                with open(payload, "r", encoding="utf-8") as f:
+                    record = json.load(f)
+            else:
+                record = json.loads(payload)
+            columns.add(record)
+        except (OSError, ValueError, AttributeError, TypeError) as e:
+            columns.failed.append({"name": name, "error": str(e)})
+    return columns
+
+
+def generate_aggregate_report(summary: Dict) -> str:
+    """生成汇总分析报告"""
+
+    sections = []
+    sections.append("# 报告汇总分析\n\n")
+    sections.append(f"**记录总数**: {summary['records']}\n")
+    sections.append(f"**读取失败**: {summary['failed']}\n")
+    sections.append(f"**未关闭行动项**: {summary['open_action_items']}\n\n")
+
+    sections.append("## 风险等级分布\n")
+    sections.append("| 等级 | 数量 |\n")
+    sections.append("|------|------|\n")
+    for level, count in summary["risk_levels"].items():
+        sections.append(f"| {level} | {count} |\n")
+    sections.append("\n")
+
+    if summary["score_stats"]:
+        stats = summary["score_stats"]
+        sections.append("## 风险评分\n")
+        sections.append(
+            f"- 平均 {stats['mean']}，P50 {stats['p50']}，P90 {stats['p90']}，最高 {stats['max']}\n\n"
+        )
+
+    sections.append("## 高频风险\n")
+    sections.append("| 等级 | 风险 | 次数 |\n")
+    sections.append("|------|------|------|\n")
+    for risk in summary["top_risks"]:
+        sections.append(f"| {risk['level']} | {risk['risk']} | {risk['count']} |\n")
+    sections.append("\n")
+
+    sections.append("## 未关闭行动项最多的负责人\n")
+    sections.append("| 负责人 | 未关闭 | 其中最高优先级 |\n")
+    sections.append("|--------|--------|----------------|\n")
+    for owner in summary["top_owners"]:
+        sections.append(f"| {owner['owner']} | {owner['open']} | {owner['urgent']} |\n")
+    sections.append("\n")
+
+    sections.append("## 截止时间分布（按月）\n")
+    peak = max(summary["deadline_histogram"].values(), default=0)
+    for month, count in summary["deadline_histogram"].items():
+        bar = "█" * max(1, round(count / peak * 30)) if peak else ""
+        sections.append(f"- {month}: {count} {bar}\n")
+
+    return "".join(sections)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="跨报告汇总分析")
+    parser.add_argument(
+        "--input", "-i", required=True, help="输入：目录、glob模式、JSONL文件或 - （标准输入JSONL）"
+    )
+    parser.add_argument("--output", "-o", required=True, help="输出Markdown文件路径")
+    parser.add_argument("--json", help="同时输出汇总结果JSON的路径")
+    parser.add_argument("--top", type=int, default=20, help="排行榜条数")
+
+    args = parser.parse_args()
+
+    columns = collect_columns(args.input)
+    summary = columns.summarize(args.top)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        f.write(generate_aggregate_report(summary))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    for failure in columns.failed:
+        print(f"读取失败 {failure['name']}: {failure['error']}", file=sys.stderr)
+    print(f"汇总分析报告已生成: {args.output}（共 {summary['records']} 条记录）")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,32 @@
 根据需求描述自动识别潜在风险
 """
 
+import os
+import re
+import sys
 import json
+import math
+import pickle
+import sqlite3
+import hashlib
 import argparse
-from typing import List, Dict
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+from typing import List, Dict, Iterable, Iterator, Tuple
 from pathlib import Path
 
+import output_cache
+import risk_matcher
+from batch_items import iter_batch_items
+from output_cache import OutputCache, file_version, write_if_changed
+from risk_matcher import KeywordMatcher, KeywordTokenizer
+
+try:
+    import yaml
+except ImportError:  # PyYAML 为可选依赖，仅加载 YAML 词典时需要
+    yaml = None
+
 
 # 风险关键词库
 RISK_KEYWORDS = {
@@ -34,38 +55,497 @@ RISK_KEYWORDS = {
 }
 
 
+# 风险等级与 analyze_risk 返回字段的对应关系
+RISK_LEVELS = [("high", "high_risks"), ("medium", "medium_risks"), ("low", "low_risks")]
+
+# 风险评分权重：单个风险得分 = 等级权重 × (1 + ln(命中次数))
+RISK_LEVEL_WEIGHTS = {"high": 10.0, "medium": 4.0, "low": 1.0}
+
+
+class RiskTally:
+    """逐条累计命中，去除被更长关键词覆盖的重叠命中，并统计每个风险的命中次数
+
+    命中需按结束位置递增送入（即扫描器的输出顺序）；只缓存最近一个关键词长度窗口内的命中，
+    因此可用于流式分析。
+    """
+
+    def __init__(self, matcher: "RiskMatcher"):
+        self.matcher = matcher
+        self.max_length = matcher.matcher.max_length
+        self.hit_patterns = set()
+        self.pattern_counts = [0] * len(matcher.matcher.keywords)
+        self._pending = deque()
+
+    def add(self, start: int, end: int, pid: int):
+        """记录一次原始命中"""
+        self.hit_patterns.add(pid)
+        pending = self._pending
+
+        # 起点早于窗口的命中不会再被后续命中覆盖，可以结算
+        while pending and pending[0][0] < end - self.max_length:
+            self.pattern_counts[pending.popleft()[2]] += 1
+
+        # 同一结束位置上更长的关键词先输出，被其覆盖的命中直接丢弃
+        for s, e, _ in pending:
+            if s <= start and e >= end:
+                return
+        if pending and pending[-1][0] >= start:
+            self._pending = pending = deque(h for h in pending if h[0] < start)
+        pending.append((start, end, pid))
+
+    def extend(self, hits: List[Tuple[int, int, int]]):
+        """批量记录扫描器一次 feed 的全部命中，结果与逐条 add 相同
+
+        按起点升序、终点降序排列后，终点不超过此前最大终点的命中即被更长的命中覆盖；
+        起点不晚于“最后终点 - 最长关键词长度”的命中不会再被后续命中覆盖，直接结算。
+        """
+        if not hits:
+            return
+        self.hit_patterns.update(hit[2] for hit in hits)
+        candidates = list(self._pending)
+        candidates.extend(hits)
+        candidates.sort(key=itemgetter(1), reverse=True)
+        candidates.sort(key=itemgetter(0))
+        settled_before = hits[-1][1] - self.max_length
+        counts = self.pattern_counts
+        pending = deque()
+        max_end = -1
+        for hit in candidates:
+            if hit[1] <= max_end:
+                continue
+            max_end = hit[1]
+            if hit[0] <= settled_before:
+                counts[hit[2]] += 1
+            else:
+                pending.append(hit)
+        self._pending = pending
+
+    def merge(self, hit_patterns: Iterable[int], pattern_counts: Dict[int, int]):
+        """合并另一段文本（如缓存的段落结果）的命中统计"""
+        self.hit_patterns.update(hit_patterns)
+        for pid, count in pattern_counts.items():
+            self.pattern_counts[pid] += count
+
+    def finish(self) -> "RiskTally":
+        """结算剩余缓存的命中"""
+        while self._pending:
+            self.pattern_counts[self._pending.popleft()[2]] += 1
+        return self
+
+    @property
+    def hit_orders(self) -> set:
+        """命中的条目编号（未去重，与 analyze_risk 的输出口径一致）"""
+        orders = set()
+        for pid in self.hit_patterns:
+            orders.update(self.matcher.pattern_entries[pid])
+        return orders
+
+    def score(self) -> Dict:
+        """计算加权风险评分及每个风险的命中明细"""
+        order_counts = {}
+        for pid, count in enumerate(self.pattern_counts):
+            if count:
+                for order in self.matcher.pattern_entries[pid]:
+                    order_counts[order] = count
+        return score_risk_counts(self.matcher.entries, order_counts)
+
+
+def score_risk_counts(entries: List[Tuple[str, str, str]], order_counts: Dict[int, int]) -> Dict:
+    """根据每个关键词条目的命中次数计算加权风险评分"""
+    risks = {}
+    for order, count in order_counts.items():
+        level, risk_name, keyword = entries[order]
+        risk = risks.setdefault(
+            (level, risk_name),
+            {"level": level, "risk": risk_name, "hits": 0, "keywords": {}},
+        )
+        risk["hits"] += count
+        risk["keywords"][keyword] = risk["keywords"].get(keyword, 0) + count
+
+    for risk in risks.values():
+        weight = RISK_LEVEL_WEIGHTS.get(risk["level"], 1.0)
+        risk["score"] = round(weight * (1 + math.log(risk["hits"])), 2)
+
+    ranked = sorted(risks.values(), key=lambda r: (-r["score"], r["risk"]))
+    counts = {level: 0 for level, _ in RISK_LEVELS}
+    for risk in ranked:
+        counts[risk["level"]] += 1
+    top_level = next((level for level, _ in RISK_LEVELS if counts[level]), "none")
+
+    return {
+        "score": round(sum(r["score"] for r in ranked), 2),
+        "level": top_level,
+        "risk_counts": counts,
+        "risks": ranked,
+    }
+
+
+class RiskMatcher:
+    """由风险关键词库编译出的匹配器，一次线性扫描完成全部关键词检测"""
+
+    def __init__(self, risk_keywords: Dict = RISK_KEYWORDS):
+        # 条目按关键词库原有顺序编号，保证输出顺序与逐个检测时一致
+        self.entries = []
+        keywords = []
+        for level, _ in RISK_LEVELS:
+            for risk_name, risk_words in risk_keywords.get(level, []):
+                for keyword in risk_words:
+                    self.entries.append((level, risk_name, keyword))
+                    keywords.append(keyword)
+        self.matcher = KeywordMatcher(keywords)
+        self.pattern_entries = [[] for _ in self.matcher.keywords]
+        for order, (_, _, keyword) in enumerate(self.entries):
+            self.pattern_entries[self.matcher.index_of(keyword)].append(order)
+
+    @property
+    def fingerprint(self) -> str:
+        """关键词条目的内容指纹，用于区分不同词典下的缓存结果"""
+        if getattr(self, "_fingerprint", None) is None:
+            self._fingerprint = hashlib.sha256(repr(self.entries).encode("utf-8")).hexdigest()
+        return self._fingerprint
+
+    def dump_compiled(self) -> Tuple:
+        """导出编译结果，用于写入磁盘缓存"""
+        return (self.entries, self.pattern_entries, self.matcher.dump_tables())
+
+    @classmethod
+    def from_compiled(cls, compiled: Tuple) -> "RiskMatcher":
+        """从 dump_compiled 的结果恢复匹配器，跳过编译"""
+        risk_matcher = cls.__new__(cls)
+        risk_matcher.entries, risk_matcher.pattern_entries, tables = compiled
+        risk_matcher.matcher = KeywordMatcher.from_tables(tables)
+        return risk_matcher
+
+    def iter_hits(self, chunks: Iterable[str]) -> Iterator[Tuple[int, int, int]]:
+        """逐块扫描文本，产出 (条目编号, start, end)"""
+        scanner = self.matcher.scanner()
+        for chunk in chunks:
+            for start, end, pid in scanner.feed(chunk):
+                for order in self.pattern_entries[pid]:
+                    yield order, start, end
+
+    def iter_matches(self, chunks: Iterable[str]) -> Iterator[Dict]:
+        """逐块扫描文本，产出每次命中的等级、风险名、关键词和偏移量"""
+        for order, start, end in self.iter_hits(chunks):
+            yield self.describe_hit(order, start, end)
+
+    def describe_hit(self, order: int, start: int, end: int) -> Dict:
+        """把一次命中转换为明细记录"""
+        level, risk_name, keyword = self.entries[order]
+        return {
+            "level": level,
+            "risk": risk_name,
+            "keyword": keyword,
+            "start": start,
+            "end": end,
+        }
+
+    def find_matches(self, text: str) -> List[Dict]:
+        """返回全部命中及其偏移量"""
+        return list(self.iter_matches([text]))
+
+    def analyze(self, text: str) -> Dict[str, List[str]]:
+        """按关键词库顺序汇总命中的风险"""
+        return self.analyze_stream([text])
+
+    def analyze_stream(self, chunks: Iterable[str]) -> Dict[str, List[str]]:
+        """逐块分析文本，结果与整体分析一致，内存占用只与分块大小有关"""
+        scanner = self.matcher.scanner()
+        hit_patterns = set()
+        for chunk in chunks:
+            for _, _, pid in scanner.feed(chunk):
+                hit_patterns.add(pid)
+        hit_orders = set()
+        for pid in hit_patterns:
+            hit_orders.update(self.pattern_entries[pid])
+        return self.format_risks(hit_orders)
+
+    def tally(self, chunks: Iterable[str], on_hit=None) -> RiskTally:
+        """逐块扫描文本，同时得到原始命中与去重计数
+
+        on_hit(start, end, pid) 会在每次原始命中时被调用。
+        """
+        tally = RiskTally(self)
+        scanner = self.matcher.scanner()
+        for chunk in chunks:
+            hits = scanner.feed(chunk)
+            tally.extend(hits)
+            if on_hit is not None:
+                for start, end, pid in hits:
+                    on_hit(start, end, pid)
+        return tally.finish()
+
+    def format_risks(self, hit_orders) -> Dict[str, List[str]]:
+        """把命中的条目编号整理成 analyze_risk 的返回结构"""
+        risks = {field: [] for _, field in RISK_LEVELS}
+        fields = dict(RISK_LEVELS)
+        for order in sorted(hit_orders):
+            level, risk_name, keyword = self.entries[order]
+            risks[fields[level]].append(f"检测到'{risk_name}'风险: 包含关键词'{keyword}'")
+        return risks
+
+
+_default_matcher = None
+
+# 编译缓存格式版本，RiskMatcher/KeywordMatcher 内部结构变化时需递增
+MATCHER_CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = ".cache"
+
+
+def load_risk_dictionary(path: str) -> Dict:
+    """读取外部风险词典（JSON 或 YAML）
+
+    格式与 RISK_KEYWORDS 相同，按等级组织，每个等级可以是
+    {风险名: [关键词...]} 或 [[风险名, [关键词...]], ...]。
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if Path(path).suffix.lower() in (".yaml", ".yml"):
+            if yaml is None:
+                raise RuntimeError(f"加载 YAML 词典需要安装 PyYAML: {path}")
+            data = yaml.safe_load(f) or {}
+        else:
+            data = json.load(f)
+
+    dictionary = {}
+    for level, _ in RISK_LEVELS:
+        risks = data.get(level, [])
+        if isinstance(risks, dict):
+            risks = risks.items()
+        dictionary[level] = [(name, list(keywords)) for name, keywords in risks]
+    return dictionary
+
+
+def merge_risk_keywords(*dictionaries: Dict) -> Dict:
+    """合并多个风险词典，同一等级下同名风险的关键词去重追加"""
+    merged = {level: {} for level, _ in RISK_LEVELS}
+    for dictionary in dictionaries:
+        for level, _ in RISK_LEVELS:
+            for risk_name, keywords in dictionary.get(level, []):
+                words = merged[level].setdefault(risk_name, [])
+                words.extend(k for k in keywords if k not in words)
+    return {level: list(risks.items()) for level, risks in merged.items()}
+
+
+def load_risk_matcher(dictionaries: List[str] = (), cache_dir: str = DEFAULT_CACHE_DIR) -> RiskMatcher:
+    """编译内置关键词库与外部词典，编译结果按词典内容哈希缓存到 cache_dir
+
+    cache_dir 为空时不使用缓存。
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{MATCHER_CACHE_VERSION}:{sys.version_info[:2]}".encode())
+    digest.update(repr(RISK_KEYWORDS).encode("utf-8"))
+    for path in dictionaries:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+        digest.update(Path(path).suffix.lower().encode())
+
+    cache_file = None
+    if cache_dir:
+        cache_file = Path(cache_dir) / f"risk-matcher-{digest.hexdigest()[:16]}.pickle"
+        try:
+            with open(cache_file, "rb") as f:
+                return RiskMatcher.from_compiled(pickle.load(f))
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            pass
+
+    risk_keywords = merge_risk_keywords(
+        RISK_KEYWORDS, *(load_risk_dictionary(path) for path in dictionaries)
+    )
+    risk_matcher = RiskMatcher(risk_keywords)
+
+    if cache_file is not None:
+        # 先写临时文件再替换，避免并发进程读到写了一半的缓存
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_file, "wb") as f:
+            pickle.dump(risk_matcher.dump_compiled(), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+
+    return risk_matcher
+
+
+def configure_risk_matcher(dictionaries: List[str] = (), cache_dir: str = DEFAULT_CACHE_DIR):
+    """设置默认匹配器，使 analyze_risk 等函数同时使用外部词典"""
+    global _default_matcher
+    _default_matcher = load_risk_matcher(dictionaries, cache_dir) if dictionaries else None
+
+
+def get_risk_matcher() -> RiskMatcher:
+    """获取默认匹配器（未配置外部词典时基于内置关键词库，首次调用时编译）"""
+    global _default_matcher
+    if _default_matcher is None:
+        _default_matcher = RiskMatcher(RISK_KEYWORDS)
+    return _default_matcher
+
+
+class RiskTokenizer:
+    """分词模式的风险检测：全半角/大小写归一化、用户词典分词，并忽略被否定的关键词"""
+
+    def __init__(self, risk_matcher: RiskMatcher, user_words: Iterable[str] = ()):
+        self.risk_matcher = risk_matcher
+        entries = risk_matcher.entries
+        self.tokenizer = KeywordTokenizer((k for _, _, k in entries), user_words)
+        self.keyword_entries = [[] for _ in self.tokenizer.keywords]
+        for order, (_, _, keyword) in enumerate(entries):
+            idx = self.tokenizer.index_of(keyword)
+            if idx >= 0:
+                self.keyword_entries[idx].append(order)
+
+    def evaluate(self, text: str) -> Tuple[Dict[str, List[str]], Dict]:
+        """返回 (风险结果, 风险评分)，结构与 evaluate_risk 相同"""
+        order_counts = {}
+        for _, _, idx, negated in self.tokenizer.scan(text):
+            if negated:
+                continue
+            for order in self.keyword_entries[idx]:
+                order_counts[order] = order_counts.get(order, 0) + 1
+        return (
+            self.risk_matcher.format_risks(order_counts),
+            score_risk_counts(self.risk_matcher.entries, order_counts),
+        )
+
+
+_default_tokenizer = None
+
+
+def load_user_words(paths: List[str]) -> List[str]:
+    """读取用户词典：每行一个词，# 开头为注释"""
+    words = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                word = line.strip()
+                if word and not word.startswith("#"):
+                    words.append(word)
+    return words
+
+
+def configure_risk_tokenizer(user_dicts: List[str] = ()):
+    """设置分词模式使用的用户词典"""
+    global _default_tokenizer
+    _default_tokenizer = RiskTokenizer(get_risk_matcher(), load_user_words(user_dicts))
+
+
+def get_risk_tokenizer() -> RiskTokenizer:
+    """获取分词模式的检测器（基于当前默认匹配器的关键词）"""
+    global _default_tokenizer
+    if _default_tokenizer is None or _default_tokenizer.risk_matcher is not get_risk_matcher():
+        _default_tokenizer = RiskTokenizer(get_risk_matcher())
+    return _default_tokenizer
+
+
+def evaluate_risk_tokenized(requirements_text: str) -> Tuple[Dict[str, List[str]], Dict]:
+    """分词模式分析：处理否定词与全半角差异，结果结构与 evaluate_risk 相同"""
+    return get_risk_tokenizer().evaluate(requirements_text)
+
+
 def analyze_risk(requirements_text: str) -> Dict[str, List[str]]:
     """分析需求文本中的风险"""
+    return get_risk_matcher().analyze(requirements_text)
+
+
+def find_risk_matches(requirements_text: str) -> List[Dict]:
+    """定位需求文本中的风险关键词，返回每次命中的等级、风险名、关键词和偏移量"""
+    return get_risk_matcher().find_matches(requirements_text)
 
-    risks = {"high_risks": [], "medium_risks": [], "low_risks": []}
 
-    text_lower = requirements_text.lower()
+def score_risk(requirements_text: str) -> Dict:
+    """计算需求文本的加权风险评分，重叠关键词只计最长的一个"""
+    return get_risk_matcher().tally([requirements_text]).score()
 
-    # 检测高风险
-    for risk_name, keywords in RISK_KEYWORDS["high"]:
-        for keyword in keywords:
-            if keyword.lower() in text_lower:
-                risks["high_risks"].append(
-                    f"检测到'{risk_name}'风险: 包含关键词'{keyword}'"
-                )
 
-    # 检测中风险
-    for risk_name, keywords in RISK_KEYWORDS["medium"]:
-        for keyword in keywords:
-            if keyword.lower() in text_lower:
-                risks["medium_risks"].append(
-                    f"检测到'{risk_name}'风险: 包含关键词'{keyword}'"
-                )
+def evaluate_risk(requirements_text: str) -> Tuple[Dict[str, List[str]], Dict]:
+    """一次扫描同时得到 analyze_risk 的结果和风险评分"""
+    matcher = get_risk_matcher()
+    tally = matcher.tally([requirements_text])
+    return matcher.format_risks(tally.hit_orders), tally.score()
 
-    # 检测低风险
-    for risk_name, keywords in RISK_KEYWORDS["low"]:
-        for keyword in keywords:
-            if keyword.lower() in text_lower:
-                risks["low_risks"].append(
-                    f"检测到'{risk_name}'风险: 包含关键词'{keyword}'"
-                )
 
-    return risks
+# 段落分隔：一个或多个空行
+PARAGRAPH_SEPARATOR = re.compile(r"\n[ \t]*\n")
+
+
+class ParagraphCache:
+    """按段落哈希缓存扫描结果的 sqlite 存储"""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS paragraphs ("
+            " matcher TEXT NOT NULL,"
+            " hash TEXT NOT NULL,"
+            " result TEXT NOT NULL,"
+            " PRIMARY KEY (matcher, hash))"
+        )
+
+    def get_many(self, fingerprint: str, hashes: Iterable[str]) -> Dict[str, Tuple]:
+        """批量查询段落结果，返回 {hash: (hit_patterns, pattern_counts)}"""
+        hashes = list(hashes)
+        found = {}
+        for i in range(0, len(hashes), 500):
+            batch = hashes[i : i + 500]
+            rows = self.conn.execute(
+                "SELECT hash, result FROM paragraphs WHERE matcher = ? AND hash IN (%s)"
+                % ",".join("?" * len(batch)),
+                [fingerprint, *batch],
+            )
+            for key, result in rows:
+                hits, counts = json.loads(result)
+                found[key] = (hits, {int(pid): n for pid, n in counts.items()})
+        return found
+
+    def put_many(self, fingerprint: str, results: Dict[str, Tuple]):
+        """批量写入段落结果"""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO paragraphs (matcher, hash, result) VALUES (?, ?, ?)",
+                [
+                    (fingerprint, key, json.dumps([hits, counts]))
+                    for key, (hits, counts) in results.items()
+                ],
+            )
+
+    def close(self):
+        self.conn.close()
+
+
+def analyze_risk_incremental(
+    requirements_text: str, cache: ParagraphCache
+) -> Tuple[Dict[str, List[str]], Dict, Dict]:
+    """增量分析：按段落哈希复用缓存结果，只重新扫描变化的段落
+
+    返回 (风险结果, 风险评分, 统计信息)，前两项与 evaluate_risk 一致
+    （关键词不含换行，因此不会跨段落命中）。
+    """
+    matcher = get_risk_matcher()
+    paragraphs = PARAGRAPH_SEPARATOR.split(requirements_text)
+    keys = [
+        hashlib.blake2b(p.encode("utf-8"), digest_size=16).hexdigest() for p in paragraphs
+    ]
+
+    results = cache.get_many(matcher.fingerprint, set(keys))
+    fresh = {}
+    for key, paragraph in zip(keys, paragraphs):
+        if key in results or key in fresh:
+            continue
+        tally = matcher.tally([paragraph])
+        counts = {pid: n for pid, n in enumerate(tally.pattern_counts) if n}
+        fresh[key] = (sorted(tally.hit_patterns), counts)
+    if fresh:
+        cache.put_many(matcher.fingerprint, fresh)
+        results.update(fresh)
+
+    tally = RiskTally(matcher)
+    for key in keys:
+        tally.merge(*results[key])
+    stats = {"paragraphs": len(paragraphs), "rescanned": len(fresh)}
+    return matcher.format_risks(tally.hit_orders), tally.score(), stats
+
+
+def generate_risk_json(score: Dict, requirements: dict) -> Dict:
+    """生成机器可读的风险评分结果"""
+    return {"name": requirements.get("name", "未命名"), **score}
 
 
 def generate_risk_report(risks: Dict, requirements: dict) -> str:
@@ -122,29 +602,337 @@ def generate_risk_report(risks: Dict, requirements: dict) -> str:
     return "".join(sections)
 
 
+# 批量模式在输出目录中写出的汇总文件名（不含扩展名），逐条报告的条目名会避开它
+BATCH_SUMMARY = "summary"
+
+
+def analyze_batch_item(item: Tuple[str, str, str], output_dir: str) -> Dict:
+    """分析单个批量条目并写出报告，返回汇总记录"""
+    name, kind, payload = item
+    try:
+        if kind == "file":
+            with open(payload, "r", encoding="utf-8") as f:
+                requirements = json.load(f)
+        else:
+            requirements = json.loads(payload)
+        risks, score = evaluate_risk(requirements.get("description", ""))
+        output = os.path.join(output_dir, f"{name}.md")
+        write_risk_outputs(risks, score, requirements, output)
+    except (OSError, ValueError, AttributeError) as e:
+        return {"name": name, "error": str(e)}
+
+    return {
+        "name": name,
+        "requirement": requirements.get("name", "未命名"),
+        "output": output,
+        "score": score["score"],
+        "high": len(risks["high_risks"]),
+        "medium": len(risks["medium_risks"]),
+        "low": len(risks["low_risks"]),
+    }
+
+
+def _analyze_batch_chunk(args: Tuple[List[Tuple[str, str, str]], str]) -> List[Dict]:
+    """进程池任务：分析一组条目（每个进程只编译一次匹配器）"""
+    items, output_dir = args
+    return [analyze_batch_item(item, output_dir) for item in items]
+
+
+def analyze_batch(
+    source: str,
+    output_dir: str,
+    workers: int = 0,
+    dictionaries: List[str] = (),
+    cache_dir: str = DEFAULT_CACHE_DIR,
+) -> List[Dict]:
+    """批量分析需求并在 output_dir 下写出逐条报告，返回汇总记录列表"""
+    configure_risk_matcher(dictionaries, cache_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    items = list(iter_batch_items(source, reserved=[BATCH_SUMMARY]))
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(items) <= 1:
+        return [analyze_batch_item(item, output_dir) for item in items]
+
+    # 按块分发，减少进程间通信次数
+    chunk_size = max(1, len(items) // (workers * 4))
+    chunks = [
+        (items[i : i + chunk_size], output_dir)
+        for i in range(0, len(items), chunk_size)
+    ]
+    results = []
+    # 工作进程从磁盘缓存加载编译好的匹配器
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=configure_risk_matcher,
+        initargs=(list(dictionaries), cache_dir),
+    ) as executor:
+        for chunk_result in executor.map(_analyze_batch_chunk, chunks):
+            results.extend(chunk_result)
+    return results
+
+
+def generate_batch_summary(results: List[Dict]) -> str:
+    """生成批量分析汇总报告"""
+
+    succeeded = [r for r in results if "error" not in r]
+    failed = [r for r in results if "error" in r]
+
+    sections = []
+    sections.append("# 批量风险分析汇总\n\n")
+    sections.append(f"**分析总数**: {len(results)}\n")
+    sections.append(f"**成功**: {len(succeeded)}\n")
+    sections.append(f"**失败**: {len(failed)}\n")
+    sections.append(
+        f"**含高风险需求数**: {sum(1 for r in succeeded if r['high'])}\n\n"
+    )
+
+    sections.append("## 风险分布\n")
+    sections.append("| 条目 | 需求名称 | 风险评分 | 高风险 | 中风险 | 低风险 |\n")
+    sections.append("|------|----------|----------|--------|--------|--------|\n")
+    ranked = sorted(succeeded, key=lambda r: (-r["score"], -r["high"], r["name"]))
+    for r in ranked:
+        sections.append(
+            f"| {r['name']} | {r['requirement']} | {r['score']} | {r['high']} | {r['medium']} | {r['low']} |\n"
+        )
+    sections.append("\n")
+
+    if failed:
+        sections.append("## 分析失败\n")
+        for r in failed:
+            sections.append(f"- {r['name']}: {r['error']}\n")
+
+    return "".join(sections)
+
+
+# 流式读取的分块大小（字符数）
+STREAM_CHUNK_SIZE = 1 << 16
+
+
+def iter_text_chunks(stream, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[str]:
+    """按固定大小分块读取纯文本流"""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_ndjson_chunks(stream, field: str = "description") -> Iterator[str]:
+    """逐行读取 NDJSON，产出每条记录中的文本字段
+
+    记录之间插入换行，避免关键词跨记录拼接误报。
+    """
+    for line in stream:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        text = record.get(field, "") if isinstance(record, dict) else str(record)
+        if text:
+            yield text
+            yield "\n"
+
+
+class _HeadCapture:
+    """透传文本分块，同时保留开头若干字符用于报告摘要"""
+
+    def __init__(self, chunks: Iterable[str], limit: int = 200):
+        self.chunks = chunks
+        self.limit = limit
+        self.head = ""
+
+    def __iter__(self) -> Iterator[str]:
+        for chunk in self.chunks:
+            if len(self.head) < self.limit:
+                self.head += chunk[: self.limit - len(self.head)]
+            yield chunk
+
+
+def analyze_risk_stream(
+    stream, fmt: str = "text", field: str = "description", matches_output=None
+) -> Tuple[Dict[str, List[str]], Dict, str]:
+    """流式分析文本流中的风险，返回 (风险结果, 风险评分, 文本开头摘要)
+
+    fmt 为 "text" 时按块读取纯文本，为 "ndjson" 时逐行读取记录中的 field 字段。
+    传入 matches_output 时，命中明细以 NDJSON 形式逐条写出。
+    """
+    chunks = iter_text_chunks(stream) if fmt == "text" else iter_ndjson_chunks(stream, field)
+    capture = _HeadCapture(chunks)
+    matcher = get_risk_matcher()
+
+    def write_matches(start: int, end: int, pid: int):
+        for order in matcher.pattern_entries[pid]:
+            match = matcher.describe_hit(order, start, end)
+            matches_output.write(json.dumps(match, ensure_ascii=False) + "\n")
+
+    tally = matcher.tally(capture, write_matches if matches_output is not None else None)
+    return matcher.format_risks(tally.hit_orders), tally.score(), capture.head
+
+
+def write_risk_outputs(risks: Dict, score: Dict, requirements: dict, output: str) -> str:
+    """写出 Markdown 报告及同名的 JSON 评分结果（内容未变化的文件不重写），返回 JSON 路径"""
+    write_if_changed(output, generate_risk_report(risks, requirements).encode("utf-8"))
+    json_output = str(Path(output).with_suffix(".json"))
+    score_json = json.dumps(generate_risk_json(score, requirements), ensure_ascii=False, indent=2)
+    write_if_changed(json_output, score_json.encode("utf-8"))
+    return json_output
+
+
 def main():
     parser = argparse.ArgumentParser(description="分析需求风险")
-    parser.add_argument("--input", "-i", required=True, help="输入JSON文件路径")
-    parser.add_argument("--output", "-o", required=True, help="输出Markdown文件路径")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--input", "-i", help="输入JSON文件路径（流式模式下为文本文件，缺省读标准输入）")
+    group.add_argument(
+        "--batch", "-b", help="批量输入：目录、glob模式、JSONL文件或 - （标准输入JSONL）"
+    )
+    parser.add_argument(
+        "--stream",
+        "-s",
+        choices=["text", "ndjson"],
+        help="流式模式：按块读取纯文本或逐行读取NDJSON，内存占用有界",
+    )
+    parser.add_argument("--field", default="description", help="NDJSON 记录中的文本字段")
+    parser.add_argument("--name", default="流式输入", help="流式模式下报告中的需求名称")
+    parser.add_argument(
+        "--output", "-o", required=True, help="输出Markdown文件路径（批量模式下为输出目录）"
+    )
+    parser.add_argument(
+        "--matches", help="输出关键词命中明细（含偏移量）的JSON文件路径（流式模式下为NDJSON）"
+    )
+    parser.add_argument(
+        "--workers", "-w", type=int, default=0, help="批量模式的进程数（默认CPU核数）"
+    )
+    parser.add_argument(
+        "--dict",
+        "-d",
+        action="append",
+        default=[],
+        help="额外的风险词典文件（JSON/YAML，可多次指定）",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=DEFAULT_CACHE_DIR,
+        help="词典编译、段落结果及输出缓存目录（传空字符串禁用缓存）",
+    )
+    parser.add_argument(
+        "--tokenize",
+        "-t",
+        action="store_true",
+        help="分词模式：归一化全半角与大小写，忽略被否定的关键词（如“不紧急”）",
+    )
+    parser.add_argument(
+        "--user-dict",
+        action="append",
+        default=[],
+        help="分词模式的用户词典（每行一个词，可多次指定）",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="增量模式：按段落哈希缓存结果，只重新扫描变化的段落",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="禁用输出缓存，总是重新分析并生成报告"
+    )
 
     args = parser.parse_args()
+    if not (args.input or args.batch or args.stream):
+        parser.error("需要指定 --input、--batch 或 --stream")
+    if args.batch and args.stream:
+        parser.error("--batch 与 --stream 不能同时使用")
+    if args.tokenize and (args.batch or args.stream or args.incremental):
+        parser.error("--tokenize 仅用于单文件分析")
+
+    configure_risk_matcher(args.dict, args.cache_dir)
+
+    if args.stream:
+        stream = open(args.input, "r", encoding="utf-8") if args.input else sys.stdin
+        matches_output = open(args.matches, "w", encoding="utf-8") if args.matches else None
+        try:
+            risks, score, head = analyze_risk_stream(
+                stream, args.stream, args.field, matches_output
+            )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if matches_output:
+                matches_output.close()
+        requirements = {"name": args.name, "description": head}
+        json_output = write_risk_outputs(risks, score, requirements, args.output)
+        print(f"风险分析报告已生成: {args.output}")
+        print(f"风险评分已生成: {json_output} (score={score['score']})")
+        if args.matches:
+            print(f"关键词命中明细（NDJSON）已生成: {args.matches}")
+        return
+
+    if args.batch:
+        results = analyze_batch(
+            args.batch, args.output, args.workers, args.dict, args.cache_dir
+        )
+        summary = os.path.join(args.output, BATCH_SUMMARY)
+        with open(f"{summary}.json", "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        with open(f"{summary}.md", "w", encoding="utf-8") as f:
+            f.write(generate_batch_summary(results))
+        failed = sum(1 for r in results if "error" in r)
+        print(f"批量风险分析完成: {len(results) - failed} 成功, {failed} 失败, 输出目录: {args.output}")
+        return
 
     # 读取输入
     with open(args.input, "r", encoding="utf-8") as f:
         requirements = json.load(f)
 
-    # 分析风险
+    # 分析风险并生成报告；输入、词典与分析模式都未变化时直接复用缓存的输出
     requirements_text = requirements.get("description", "")
-    risks = analyze_risk(requirements_text)
 
-    # 生成报告
-    report = generate_risk_report(risks, requirements)
+    def render() -> Dict[str, str]:
+        if args.incremental and args.cache_dir:
+            cache = ParagraphCache(os.path.join(args.cache_dir, "paragraphs.sqlite3"))
+            try:
+                risks, score, stats = analyze_risk_incremental(requirements_text, cache)
+            finally:
+                cache.close()
+            print(f"增量分析: 共 {stats['paragraphs']} 段, 重新扫描 {stats['rescanned']} 段")
+        elif args.tokenize:
+            configure_risk_tokenizer(args.user_dict)
+            risks, score = evaluate_risk_tokenized(requirements_text)
+        else:
+            risks, score = evaluate_risk(requirements_text)
+        return {
+            "md": generate_risk_report(risks, requirements),
+            "json": json.dumps(
+                generate_risk_json(score, requirements), ensure_ascii=False, indent=2
+            ),
+        }
 
-    # 输出报告
-    with open(args.output, "w", encoding="utf-8") as f:
-        f.write(report)
+    json_output = str(Path(args.output).with_suffix(".json"))
+    cache = OutputCache(args.cache_dir, enabled=not args.no_cache)
+    key = cache.key(
+        "analyze_risk",
+        file_version(__file__, risk_matcher.__file__, output_cache.__file__),
+        requirements,
+        get_risk_matcher().fingerprint,
+        load_user_words(args.user_dict) if args.tokenize else None,
+    )
+    status = cache.write_outputs(
+        key, {"md": args.output, "json": json_output}, render
+    )
+
+    with open(json_output, "r", encoding="utf-8") as f:
+        score = json.load(f)
+    if status == "unchanged":
+        print(f"风险分析报告已是最新，跳过生成: {args.output}")
+    else:
+        print(f"风险分析报告已生成: {args.output}")
+    print(f"风险评分已生成: {json_output} (score={score['score']})")
 
-    print(f"风险分析报告已生成: {args.output}")
+    # 输出命中明细
+    if args.matches:
+        with open(args.matches, "w", encoding="utf-8") as f:
+            json.dump(
+                find_risk_matches(requirements_text), f, ensure_ascii=False, indent=2
+            )
+        print(f"关键词命中明细已生成: {args.matches}")
 
 
 if __name__ == "__main__":
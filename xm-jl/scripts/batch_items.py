@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+批量输入展开
+把目录、glob 模式、JSONL 文件或标准输入展开为带唯一条目名的输入序列，供各脚本的批量模式使用
+"""
+
+import sys
+import glob
+from typing import Iterable, Iterator, Tuple
+from pathlib import Path
+
+
+def iter_batch_items(source: str, reserved: Iterable[str] = ()) -> Iterator[Tuple[str, str, str]]:
+    """展开批量输入源，产出 (条目名, 类型, 内容)
+
+    source 可以是目录（读取其中的 *.json）、glob 模式、JSONL 文件或 "-"（从标准输入读取 JSONL）。
+    类型为 "file" 时内容是文件路径，为 "json" 时内容是一行 JSON 文本。
+    条目名互不重复，也不会与 reserved 中的名字（如调用方自己的汇总文件名）相同，重名时追加序号。
+    """
+    path = Path(source)
+    used_names = {name: 1 for name in reserved}
+
+    def unique(name: str) -> str:
+        count = used_names.get(name, 0)
+        used_names[name] = count + 1
+        if count == 0:
+            return name
+        # 追加序号后仍可能与已有条目重名（如 a 与 a-1），继续递增直到不重复
+        return unique(f"{name}-{count}")
+
+    if source == "-" or path.suffix == ".jsonl":
+        stem = "stdin" if source == "-" else path.stem
+        stream = sys.stdin if source == "-" else open(path, "r", encoding="utf-8")
+        try:
+            for lineno, line in enumerate(stream, 1):
+                if line.strip():
+                    yield unique(f"{stem}-{lineno:05d}"), "json", line
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        return
+
+    files = sorted(path.glob("*.json")) if path.is_dir() else sorted(
+        Path(p) for p in glob.glob(source, recursive=True)
+    )
+    for file in files:
+        yield unique(file.stem), "file", str(file)
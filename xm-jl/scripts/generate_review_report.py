@@ -4,92 +4,249 @@
 根据用户输入的需求信息，生成结构化的评审报告
 """
 
+import os
+import sys
 import json
+import time
+import filecmp
 import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from typing import Dict, Iterator, List, TextIO, Tuple
 from pathlib import Path
 
+import output_cache
+from output_cache import DEFAULT_CACHE_DIR, OutputCache, file_version, resolve_timestamp
 
-def generate_review_report(requirements: dict) -> str:
-    """生成需求评审报告"""
 
-    sections = []
+def iter_review_report(requirements: dict, generated_at: datetime = None) -> Iterator[str]:
+    """逐段生成需求评审报告，不在内存中拼接完整文本
+
+    generated_at 缺省时依次取输入中的 generated_at、SOURCE_DATE_EPOCH，都没有时使用当前时间。
+    """
+    generated_at = generated_at or resolve_timestamp(requirements) or datetime.now()
 
     # 1. 需求概述
-    sections.append("# 需求评审报告\n")
-    sections.append(f"**生成时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-    sections.append(f"**需求名称**: {requirements.get('name', '未命名需求')}\n")
-    sections.append(f"**需求来源**: {requirements.get('source', '未指定')}\n\n")
+    yield "# 需求评审报告\n"
+    yield f"**生成时间**: {generated_at.strftime('%Y-%m-%d %H:%M:%S')}\n"
+    yield f"**需求名称**: {requirements.get('name', '未命名需求')}\n"
+    yield f"**需求来源**: {requirements.get('source', '未指定')}\n\n"
 
     # 2. 核心问题清单（根据五维度框架）
-    sections.append("## 核心问题清单\n")
-    sections.append("### 技术维度\n")
+    yield "## 核心问题清单\n"
+    yield "### 技术维度\n"
     for q in requirements.get("technical_questions", []):
-        sections.append(f"- [ ] {q}\n")
-    sections.append("\n### 商业维度\n")
+        yield f"- [ ] {q}\n"
+    yield "\n### 商业维度\n"
     for q in requirements.get("business_questions", []):
-        sections.append(f"- [ ] {q}\n")
-    sections.append("\n### 用户维度\n")
+        yield f"- [ ] {q}\n"
+    yield "\n### 用户维度\n"
     for q in requirements.get("user_questions", []):
-        sections.append(f"- [ ] {q}\n")
-    sections.append("\n### 团队维度\n")
+        yield f"- [ ] {q}\n"
+    yield "\n### 团队维度\n"
     for q in requirements.get("team_questions", []):
-        sections.append(f"- [ ] {q}\n")
-    sections.append("\n### 时间线维度\n")
+        yield f"- [ ] {q}\n"
+    yield "\n### 时间线维度\n"
     for q in requirements.get("timeline_questions", []):
-        sections.append(f"- [ ] {q}\n")
+        yield f"- [ ] {q}\n"
 
     # 3. 风险评估
-    sections.append("\n## 风险评估\n")
-    sections.append("### 高风险（需立即处理）\n")
+    yield "\n## 风险评估\n"
+    yield "### 高风险（需立即处理）\n"
     for risk in requirements.get("high_risks", []):
-        sections.append(f"- [ ] {risk}\n")
-    sections.append("\n### 中风险（需规划应对）\n")
+        yield f"- [ ] {risk}\n"
+    yield "\n### 中风险（需规划应对）\n"
     for risk in requirements.get("medium_risks", []):
-        sections.append(f"- [ ] {risk}\n")
-    sections.append("\n### 低风险（持续关注）\n")
+        yield f"- [ ] {risk}\n"
+    yield "\n### 低风险（持续关注）\n"
     for risk in requirements.get("low_risks", []):
-        sections.append(f"- [ ] {risk}\n")
+        yield f"- [ ] {risk}\n"
 
     # 4. 建议行动项
-    sections.append("\n## 建议行动项\n")
-    sections.append("| 优先级 | 行动项 | 负责方 | 截止时间 |\n")
-    sections.append("|--------|--------|--------|----------|\n")
+    yield "\n## 建议行动项\n"
+    yield "| 优先级 | 行动项 | 负责方 | 截止时间 |\n"
+    yield "|--------|--------|--------|----------|\n"
     for action in requirements.get("action_items", []):
-        sections.append(
+        yield (
             f"| {action.get('priority', '中')} | {action.get('item', '')} | {action.get('owner', '')} | {action.get('deadline', '')} |\n"
         )
 
     # 5. 结论
-    sections.append("\n## 评审结论\n")
+    yield "\n## 评审结论\n"
     conclusion = requirements.get("conclusion", "待定")
-    sections.append(f"**总体评估**: {conclusion}\n\n")
-    sections.append("**下一步建议**:\n")
+    yield f"**总体评估**: {conclusion}\n\n"
+    yield "**下一步建议**:\n"
     for next_step in requirements.get("next_steps", []):
-        sections.append(f"- {next_step}\n")
+        yield f"- {next_step}\n"
+
 
-    return "".join(sections)
+def write_review_report(
+    requirements: dict, stream: TextIO, generated_at: datetime = None
+) -> int:
+    """把评审报告流式写入文件对象，返回写入的字符数"""
+    written = 0
+    for section in iter_review_report(requirements, generated_at):
+        stream.write(section)
+        written += len(section)
+    return written
+
+
+def generate_review_report(requirements: dict, generated_at: datetime = None) -> str:
+    """生成需求评审报告"""
+    return "".join(iter_review_report(requirements, generated_at))
+
+
+def write_report_atomic(requirements: dict, output: str) -> int:
+    """先写临时文件再原子替换，避免中断时留下半截报告；返回文件字节数"""
+    tmp_output = f"{output}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_output, "w", encoding="utf-8") as f:
+            write_review_report(requirements, f)
+        size = os.path.getsize(tmp_output)
+        # 内容与现有文件相同时保留原文件，不改变其修改时间
+        if os.path.exists(output) and filecmp.cmp(tmp_output, output, shallow=False):
+            os.remove(tmp_output)
+        else:
+            os.replace(tmp_output, output)
+    except BaseException:
+        if os.path.exists(tmp_output):
+            os.remove(tmp_output)
+        raise
+    return size
+
+
+def _render_bulk_chunk(args: Tuple[List[Tuple[str, str]], str]) -> List[Dict]:
+    """进程池任务：渲染一组 JSONL 记录"""
+    items, output_dir = args
+    results = []
+    for name, line in items:
+        output = os.path.join(output_dir, f"{name}.md")
+        try:
+            size = write_report_atomic(json.loads(line), output)
+        except (OSError, ValueError, AttributeError) as e:
+            results.append({"name": name, "error": str(e)})
+        else:
+            results.append({"name": name, "output": output, "bytes": size})
+    return results
+
+
+def iter_bulk_chunks(stream, stem: str, output_dir: str, chunk_size: int):
+    """把 JSONL 流切分为进程池任务，每块 chunk_size 条"""
+    chunk = []
+    for lineno, line in enumerate(stream, 1):
+        if line.strip():
+            chunk.append((f"{stem}-{lineno:05d}", line))
+            if len(chunk) >= chunk_size:
+                yield chunk, output_dir
+                chunk = []
+    if chunk:
+        yield chunk, output_dir
+
+
+def generate_bulk_reports(
+    source: str, output_dir: str, workers: int = 0, chunk_size: int = 64
+) -> Tuple[List[Dict], float]:
+    """从 JSONL 文件（- 表示标准输入）批量生成评审报告，返回 (逐条结果, 耗时秒数)"""
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    stem = "stdin" if source == "-" else Path(source).stem
+    stream = sys.stdin if source == "-" else open(source, "r", encoding="utf-8")
+
+    started = time.perf_counter()
+    results = []
+    try:
+        chunks = iter_bulk_chunks(stream, stem, output_dir, chunk_size)
+        if workers == 1:
+            for chunk in chunks:
+                results.extend(_render_bulk_chunk(chunk))
+        else:
+            # executor.map 会先把整个输入切块提交，这里最多保留 workers×2 个未完成的块，
+            # 按提交顺序取回结果后再读取后续输入，内存占用与输入规模无关
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                pending = deque()
+                for chunk in chunks:
+                    if len(pending) >= workers * 2:
+                        results.extend(pending.popleft().result())
+                    pending.append(executor.submit(_render_bulk_chunk, chunk))
+                while pending:
+                    results.extend(pending.popleft().result())
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    return results, time.perf_counter() - started
 
 
 def main():
     parser = argparse.ArgumentParser(description="生成需求评审报告")
-    parser.add_argument("--input", "-i", required=True, help="输入JSON文件路径")
-    parser.add_argument("--output", "-o", required=True, help="输出Markdown文件路径")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--input", "-i", help="输入JSON文件路径")
+    group.add_argument("--bulk", "-b", help="批量模式：JSONL文件路径（- 表示标准输入）")
+    parser.add_argument(
+        "--output",
+        "-o",
+        required=True,
+        help="输出Markdown文件路径（- 表示标准输出；批量模式下为输出目录）",
+    )
+    parser.add_argument(
+        "--workers", "-w", type=int, default=0, help="批量模式的进程数（默认CPU核数）"
+    )
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="输出缓存目录")
+    parser.add_argument("--no-cache", action="store_true", help="禁用输出缓存，总是重新生成")
+    parser.add_argument(
+        "--deterministic",
+        action="store_true",
+        help="可复现模式：输入与 SOURCE_DATE_EPOCH 均未给出生成时间时，取输入文件的修改时间",
+    )
 
     args = parser.parse_args()
 
+    if args.bulk:
+        results, elapsed = generate_bulk_reports(args.bulk, args.output, args.workers)
+        failed = [r for r in results if "error" in r]
+        total_bytes = sum(r.get("bytes", 0) for r in results)
+        elapsed = max(elapsed, 1e-9)
+        for r in failed:
+            print(f"生成失败 {r['name']}: {r['error']}", file=sys.stderr)
+        print(
+            f"批量报告已生成: {len(results) - len(failed)} 成功, {len(failed)} 失败, "
+            f"耗时 {elapsed:.2f}s, {len(results) / elapsed:.1f} 份/s, "
+            f"{total_bytes / elapsed / 1024 / 1024:.2f} MB/s, 输出目录: {args.output}"
+        )
+        return
+
     # 读取输入
     with open(args.input, "r", encoding="utf-8") as f:
         requirements = json.load(f)
 
-    # 生成报告
-    report = generate_review_report(requirements)
-
-    # 输出报告
-    with open(args.output, "w", encoding="utf-8") as f:
-        f.write(report)
-
-    print(f"报告已生成: {args.output}")
+    try:
+        generated_at = resolve_timestamp(
+            requirements, fallback_paths=[args.input] if args.deterministic else ()
+        )
+    except ValueError as e:
+        parser.error(f"无效的生成时间: {e}")
+
+    # 生成并流式输出报告
+    if args.output == "-":
+        write_review_report(requirements, sys.stdout, generated_at)
+        return
+
+    # 生成时间取当前时间时每次输出都不同，不使用缓存
+    cache = OutputCache(args.cache_dir, enabled=not args.no_cache and generated_at is not None)
+    key = cache.key(
+        "generate_review_report",
+        file_version(__file__, output_cache.__file__),
+        requirements,
+        generated_at.isoformat() if generated_at else None,
+    )
+    status = cache.write_stream(
+        key, args.output, lambda stream: write_review_report(requirements, stream, generated_at)
+    )
+
+    if status == "unchanged":
+        print(f"报告已是最新，跳过生成: {args.output}")
+    else:
+        print(f"报告已生成: {args.output}")
 
 
 if __name__ == "__main__":
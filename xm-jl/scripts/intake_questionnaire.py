@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+需求调研问卷录入工具
+把 questionnaire.json 编译为校验器，流式校验批量填写的问卷，
+并转换为 generate_review_report 所需的输入结构
+"""
+
+import os
+import sys
+import json
+import argparse
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+from pathlib import Path
+
+from analyze_risk import evaluate_risk
+from batch_items import iter_batch_items
+from generate_review_report import write_report_atomic
+
+
+DEFAULT_QUESTIONNAIRE = (
+    Path(__file__).resolve().parent.parent / "assets" / "templates" / "questionnaire.json"
+)
+
+# 问卷章节 -> 评审报告中的问题维度
+SECTION_FIELDS = {
+    "技术维度": "technical_questions",
+    "商业维度": "business_questions",
+    "用户维度": "user_questions",
+    "团队维度": "team_questions",
+    "时间线": "timeline_questions",
+}
+
+# 选择题中提示风险的选项 -> 风险等级字段
+RISK_OPTIONS = {
+    "未验证": "high_risks",
+    "有初步验证": "medium_risks",
+}
+
+
+def _coerce_text(value) -> str:
+    if isinstance(value, (dict, list)):
+        raise ValueError("应为文本")
+    return str(value).strip()
+
+
+def _coerce_number(value) -> float:
+    if isinstance(value, bool):
+        raise ValueError("应为数字")
+    number = float(str(value).strip())
+    return int(number) if number.is_integer() else number
+
+
+def _coerce_date(value) -> str:
+    text = str(value).strip()
+    for fmt in ("%Y-%m-%d", "%Y/%m/%d", "%Y年%m月%d日", "%Y.%m.%d"):
+        try:
+            return datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return date.fromisoformat(text).isoformat()
+
+
+COERCERS: Dict[str, Callable] = {
+    "text": _coerce_text,
+    "textarea": _coerce_text,
+    "select": _coerce_text,
+    "number": _coerce_number,
+    "date": _coerce_date,
+}
+
+
+class QuestionnaireValidator:
+    """由问卷定义编译出的校验器，编译后可反复用于大批量校验"""
+
+    def __init__(self, questionnaire: dict):
+        self.name = questionnaire.get("name", "问卷")
+        # (id, 题目, 转换函数, 是否必填, 可选项, 所属维度字段)
+        self.questions: List[Tuple[str, str, Callable, bool, frozenset, str]] = []
+        for section in questionnaire.get("sections", []):
+            field = SECTION_FIELDS.get(section.get("name"))
+            for question in section.get("questions", []):
+                self.questions.append(
+                    (
+                        question["id"],
+                        question.get("text", question["id"]),
+                        COERCERS.get(question.get("type"), _coerce_text),
+                        bool(question.get("required")),
+                        frozenset(question.get("options", ())),
+                        field,
+                    )
+                )
+        self.question_ids = frozenset(q[0] for q in self.questions)
+
+    @classmethod
+    def from_file(cls, path: str) -> "QuestionnaireValidator":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def validate(self, answers: dict) -> Tuple[Dict, List[str]]:
+        """校验并转换一份答卷，返回 (转换后的答案, 错误列表)"""
+        if isinstance(answers.get("answers"), dict):
+            answers = answers["answers"]
+
+        values = {}
+        errors = []
+        for qid, text, coerce, required, options, _ in self.questions:
+            raw = answers.get(qid)
+            if raw is None or (isinstance(raw, str) and not raw.strip()):
+                if required:
+                    errors.append(f"{qid} 必填: {text}")
+                continue
+            try:
+                value = coerce(raw)
+            except (TypeError, ValueError) as e:
+                errors.append(f"{qid} 格式错误（{e}）: {text}")
+                continue
+            if options and value not in options:
+                errors.append(f"{qid} 选项无效 '{value}'，可选: {'/'.join(sorted(options))}")
+                continue
+            values[qid] = value
+
+        unknown = set(answers) - self.question_ids
+        if unknown:
+            errors.append(f"未知题目: {', '.join(sorted(unknown))}")
+        return values, errors
+
+    def to_review_input(self, values: Dict) -> dict:
+        """把校验后的答案映射为 generate_review_report 的输入"""
+        review = {field: [] for field in SECTION_FIELDS.values()}
+        review.update({"high_risks": [], "medium_risks": [], "low_risks": []})
+        next_steps = []
+        free_text = []
+
+        for qid, text, coerce, _, options, field in self.questions:
+            value = values.get(qid)
+            if value is None:
+                if field:
+                    review[field].append(f"{text}（未填写）")
+                next_steps.append(f"补充信息: {text}")
+                continue
+            if coerce is _coerce_text and not options:
+                free_text.append(str(value))
+            if field:
+                review[field].append(f"{text}（答: {value}）")
+            if value in RISK_OPTIONS:
+                review[RISK_OPTIONS[value]].append(f"{text} 回答为'{value}'")
+
+        # 自由文本交给风险关键词检测
+        risks, _ = evaluate_risk("\n".join(free_text))
+        for field, items in risks.items():
+            review[field].extend(items)
+
+        review["name"] = values.get("q1", "未命名需求")
+        review["source"] = values.get("q3", "未指定")
+        if review["high_risks"]:
+            review["conclusion"] = "存在高风险，需澄清后再评审"
+        elif review["medium_risks"]:
+            review["conclusion"] = "有条件通过，需制定风险应对计划"
+        else:
+            review["conclusion"] = "可进入评审"
+        review["next_steps"] = next_steps
+        review["action_items"] = []
+        return review
+
+
+def iter_intake(
+    validator: QuestionnaireValidator, items: Iterable[Tuple[str, str, str]]
+) -> Iterator[Tuple[str, Dict, List[str]]]:
+    """逐条读取并校验答卷，产出 (条目名, 评审输入或 None, 错误列表)"""
+    for name, kind, payload in items:
+        try:
+            if kind == "file":
+                with open(payload, "r", encoding="utf-8") as f:
+                    answers = json.load(f)
+            else:
+                answers = json.loads(payload)
+            if not isinstance(answers, dict):
+                raise ValueError("答卷应为JSON对象")
+        except (OSError, ValueError) as e:
+            yield name, None, [f"无法读取: {e}"]
+            continue
+
+        values, errors = validator.validate(answers)
+        yield name, (None if errors else validator.to_review_input(values)), errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="需求调研问卷校验与转换")
+    parser.add_argument(
+        "--input", "-i", required=True, help="答卷：目录、glob模式、JSONL文件或 - （标准输入JSONL）"
+    )
+    parser.add_argument("--output", "-o", required=True, help="输出目录")
+    parser.add_argument(
+        "--questionnaire", "-q", default=str(DEFAULT_QUESTIONNAIRE), help="问卷定义JSON路径"
+    )
+    parser.add_argument("--render", action="store_true", help="同时生成评审报告Markdown")
+
+    args = parser.parse_args()
+
+    validator = QuestionnaireValidator.from_file(args.questionnaire)
+    os.makedirs(args.output, exist_ok=True)
+
+    accepted = rejected = 0
+    for name, review, errors in iter_intake(validator, iter_batch_items(args.input)):
+        if errors:
+            rejected += 1
+            for error in errors:
+                print(f"{name}: {error}", file=sys.stderr)
+            continue
+        accepted += 1
+        with open(os.path.join(args.output, f"{name}.json"), "w", encoding="utf-8") as f:
+            json.dump(review, f, ensure_ascii=False, indent=2)
+        if args.render:
+            write_report_atomic(review, os.path.join(args.output, f"{name}.md"))
+
+    print(f"问卷处理完成: {accepted} 通过, {rejected} 未通过校验, 输出目录: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+关键词多模式匹配器
+基于 Aho-Corasick 自动机，一次线性扫描找出文本中的全部关键词；
+另提供带全半角归一化、用户词典分词和否定词处理的分词匹配器
+"""
+
+import re
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+
+# 关键词不超过该数量时，逐个关键词用 str.find 扫描（在 C 层完成）比逐字符走自动机更快
+SUBSTRING_SCAN_LIMIT = 128
+
+
+class KeywordMatcher:
+    """预编译的 Aho-Corasick 匹配器（大小写不敏感）"""
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: List[str] = []
+        self._index: Dict[str, int] = {}
+        for keyword in keywords:
+            normalized = keyword.lower()
+            if normalized and normalized not in self._index:
+                self._index[normalized] = len(self.keywords)
+                self.keywords.append(normalized)
+        self.max_length = max((len(k) for k in self.keywords), default=0)
+        self._build()
+
+    def _build(self):
+        """构建 goto / fail / output 三张表
+
+        按层插入关键词：第 d 层只为长度大于 d 的关键词各延伸一个字符，新节点的失配指针
+        只依赖更浅的节点，可在创建时直接算出，省去建完 trie 后再做一遍广度优先遍历。
+        """
+        goto: List[Dict[str, int]] = [{}]
+        fail: List[int] = [0]
+        output: List[Tuple[int, ...]] = [()]
+
+        # 按长度降序排列，第 d 层只需处理前 n 个关键词
+        keywords = self.keywords
+        order = sorted(range(len(keywords)), key=lambda pid: len(keywords[pid]), reverse=True)
+        words = [keywords[pid] for pid in order]
+        states = [0] * len(words)
+        n = len(words)
+        depth = 0
+        while n:
+            for i in range(n):
+                ch = words[i][depth]
+                state = states[i]
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = goto[state][ch] = len(goto)
+                    goto.append({})
+                    # 根的子节点失配到根，其余沿父节点的失配链查找
+                    f = fail[state]
+                    while f and ch not in goto[f]:
+                        f = fail[f]
+                    target = goto[f].get(ch, 0) if state else 0
+                    fail.append(target)
+                    output.append(output[target])
+                states[i] = nxt
+            depth += 1
+            # 长度恰为 depth 的关键词在本层结束，其输出排在失配链合并来的输出之前
+            end = n
+            while n and len(words[n - 1]) == depth:
+                n -= 1
+            for i in range(n, end):
+                output[states[i]] = (order[i],) + output[states[i]]
+
+        self._goto = goto
+        self._fail = fail
+        self._output = output
+
+    def dump_tables(self) -> Tuple:
+        """导出编译结果（仅含内置类型，可直接序列化缓存）"""
+        return (self.keywords, self._goto, self._fail, self._output)
+
+    @classmethod
+    def from_tables(cls, tables: Tuple) -> "KeywordMatcher":
+        """从 dump_tables 的结果恢复匹配器，跳过编译"""
+        matcher = cls.__new__(cls)
+        matcher.keywords, matcher._goto, matcher._fail, matcher._output = tables
+        matcher._index = {k: i for i, k in enumerate(matcher.keywords)}
+        matcher.max_length = max((len(k) for k in matcher.keywords), default=0)
+        return matcher
+
+    def index_of(self, keyword: str) -> int:
+        """返回关键词的模式编号，不存在时返回 -1"""
+        return self._index.get(keyword.lower(), -1)
+
+    def scanner(self) -> "KeywordScanner":
+        """创建一个可分块喂入文本的扫描器"""
+        return KeywordScanner(self)
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """遍历全部命中，产出 (start, end, pattern_id)"""
+        yield from self.scanner().feed(text)
+
+    def findall(self, text: str) -> List[Tuple[int, int, int]]:
+        """返回全部命中 (start, end, pattern_id) 列表"""
+        return list(self.finditer(text))
+
+
+class KeywordScanner:
+    """保存自动机状态的扫描器，跨分块边界的关键词同样能被识别
+
+    偏移量基于小写化后的文本；对中文与 ASCII 文本与原文偏移一致。关键词不超过
+    SUBSTRING_SCAN_LIMIT 个时改为逐个关键词查找子串，命中及其顺序与自动机相同。
+    """
+
+    def __init__(self, matcher: KeywordMatcher):
+        self.matcher = matcher
+        self.state = 0
+        self.position = 0
+        self._substring = len(matcher.keywords) <= SUBSTRING_SCAN_LIMIT
+        self._tail = ""  # 子串模式下上一段末尾可能构成跨段关键词的文本
+
+    def feed(self, chunk: str) -> List[Tuple[int, int, int]]:
+        """喂入一段文本，返回该段内结束的命中 (start, end, pattern_id)"""
+        if self._substring:
+            return self._feed_substrings(chunk)
+        goto = self.matcher._goto
+        fail = self.matcher._fail
+        output = self.matcher._output
+        keywords = self.matcher.keywords
+        state = self.state
+        base = self.position
+        hits = []
+
+        text = chunk.lower()
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                end = base + i + 1
+                for pid in output[state]:
+                    hits.append((end - len(keywords[pid]), end, pid))
+
+        self.state = state
+        self.position = base + len(text)
+        return hits
+
+    def _feed_substrings(self, chunk: str) -> List[Tuple[int, int, int]]:
+        """子串模式的 feed：命中按结束位置递增，同一结束位置上长的关键词在前"""
+        text = chunk.lower()
+        window = self._tail + text
+        base = self.position - len(self._tail)
+        boundary = len(self._tail)
+        hits = []
+        append = hits.append
+        find = window.find
+        for pid, keyword in enumerate(self.matcher.keywords):
+            length = len(keyword)
+            # 从能结束在本段内的最早位置开始找，上一段已报告过的命中不再重复
+            i = find(keyword, max(0, boundary - length + 1))
+            while i >= 0:
+                append((base + i, base + i + length, pid))
+                i = find(keyword, i + 1)
+        hits.sort(key=itemgetter(1, 0))
+
+        keep = self.matcher.max_length - 1
+        self._tail = window[max(0, len(window) - keep) :] if keep > 0 else ""
+        self.position += len(text)
+        return hits
+
+
+# 全角字符（含全角空格）到半角字符的映射
+_WIDTH_TABLE = {0x3000: 0x20, **{c: c - 0xFEE0 for c in range(0xFF01, 0xFF5F)}}
+
+# 否定词：出现在关键词前的窗口内且未被标点隔开时，视为否定该关键词
+NEGATION_WORDS = ("不", "没", "没有", "无", "无需", "无须", "不用", "不必", "不是", "并非", "别", "未必")
+
+# 以否定字开头但不表示否定的常用词，分词时整体切出
+NEUTRAL_WORDS = ("非常", "不断", "不仅", "不但", "不得不", "不少", "无论", "没想到", "别人")
+
+# 子句分隔符，否定词的作用范围不跨越这些字符
+CLAUSE_DELIMITERS = "，。；！？、：,.;!?:\n"
+
+# 否定词结束位置到关键词起始位置之间允许的最大字符数
+NEGATION_WINDOW = 3
+
+_KEYWORD, _NEGATION, _NEUTRAL = 0, 1, 2
+
+
+def normalize_text(text: str) -> str:
+    """全角转半角并转为小写，不改变文本长度"""
+    return text.translate(_WIDTH_TABLE).lower()
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isascii() and (ch.isalnum() or ch == "_")
+
+
+class KeywordTokenizer:
+    """基于词典的正向最大匹配分词器，识别关键词并处理否定
+
+    关键词、否定词和用户词典共同组成分词词典；英文关键词要求完整单词匹配，
+    且去除首尾空白（" deadline" 与行首的 "Deadline:" 同样能识别）。
+    """
+
+    def __init__(
+        self,
+        keywords: Iterable[str],
+        user_words: Iterable[str] = (),
+        negations: Iterable[str] = NEGATION_WORDS,
+        window: int = NEGATION_WINDOW,
+    ):
+        self.window = window
+        self.keywords: List[str] = []
+        self._index: Dict[str, int] = {}
+        for keyword in keywords:
+            normalized = normalize_text(keyword).strip()
+            if normalized and normalized not in self._index:
+                self._index[normalized] = len(self.keywords)
+                self.keywords.append(normalized)
+
+        # 同一个词同时出现在多处时，关键词优先
+        self._trie: Dict = {}
+        for words, kind in (
+            (NEUTRAL_WORDS, _NEUTRAL),
+            (user_words, _NEUTRAL),
+            (negations, _NEGATION),
+        ):
+            for word in words:
+                self._insert(normalize_text(word).strip(), (kind, -1))
+        for idx, keyword in enumerate(self.keywords):
+            self._insert(keyword, (_KEYWORD, idx))
+
+        # 只在可能开始一个词或分隔子句的位置停下，其余字符由正则在 C 层跳过
+        starts = set(k for k in self._trie if k is not None) | set(CLAUSE_DELIMITERS)
+        self._starts = re.compile("[" + "".join(re.escape(c) for c in sorted(starts)) + "]")
+
+    def _insert(self, word: str, value: Tuple[int, int]):
+        if not word:
+            return
+        node = self._trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[None] = value
+
+    def index_of(self, keyword: str) -> int:
+        """返回关键词编号，不存在时返回 -1"""
+        return self._index.get(normalize_text(keyword).strip(), -1)
+
+    def scan(self, text: str) -> List[Tuple[int, int, int, bool]]:
+        """单次线性扫描，返回关键词命中 (start, end, keyword_id, negated)"""
+        text = normalize_text(text)
+        n = len(text)
+        trie = self._trie
+        search = self._starts.search
+        window = self.window
+        hits = []
+        negation_end = -window - 1
+        pos = 0
+
+        while True:
+            m = search(text, pos)
+            if m is None:
+                break
+            i = m.start()
+            ch = text[i]
+            pos = i + 1
+            if ch in CLAUSE_DELIMITERS and ch not in trie:
+                negation_end = -window - 1
+                continue
+            if i and _is_word_char(ch) and _is_word_char(text[i - 1]):
+                continue
+
+            # 取从 i 开始的最长词
+            node = trie
+            best = None
+            j = i
+            while j < n:
+                node = node.get(text[j])
+                if node is None:
+                    break
+                j += 1
+                value = node.get(None)
+                if value is not None and not (
+                    j < n and _is_word_char(text[j - 1]) and _is_word_char(text[j])
+                ):
+                    best = (j, value)
+            if best is None:
+                continue
+
+            end, (kind, idx) = best
+            if kind == _KEYWORD:
+                hits.append((i, end, idx, i - negation_end <= window))
+            elif kind == _NEGATION:
+                negation_end = end
+            pos = end
+
+        return hits